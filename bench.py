@@ -0,0 +1,91 @@
+# pyright: reportMissingImports=false
+from typing import Callable, List
+import tracemalloc
+
+from game import Game
+from hibernate import PLAYED
+from item import Item, ItemAttrs
+from room import Room
+from gametypes import *
+import globals
+
+"""
+Rough benchmarks for the engine - run this file directly.
+
+    python bench.py
+
+"""
+
+# how many objects to make for each measurement, the result is averaged over them
+N = 2000
+
+# what bytesPer() gave for a room and an item before Room, Item, Command etc. had __slots__ (each Room had a __dict__ and a dict
+# of 8 Path namedtuples, and each Item built its command tables right away), on CPython 3.11 - printed next to the numbers now
+BASELINE = {
+    'room': 1407,
+    'item': 6133,
+}
+
+def bytesPer(make: Callable[[int], object], n: int = N) -> float:
+
+    """
+    Makes n objects with make(i) and returns how many bytes each one took on average (everything allocated while making them
+    and still alive afterwards, so shared things like cached patterns are only counted if they're new).
+    """
+
+    keep: List[object] = []
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    for i in range(n):
+        keep.append(make(i))
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return (after - before) / n
+
+def _makeRoom(i: int) -> Room:
+    return Room(f'Room {i}')
+
+def _makeItem(i: int) -> Item:
+    name = ItemName(f'Rock {i}')
+    return Item(name, aliases=fr'rock {i}', repr=f'a rock',
+        attrs = ItemAttrs(
+            canCarry = True,
+            canUse = False,
+            alwaysUsable = False
+        ), messages = globals.Collection(), onCalls = {
+            'use': lambda g: None,
+            'take': lambda g: None,
+            'drop': lambda g: None,
+            'inspect': lambda g: None,
+            'invalid': lambda g: None,
+        }
+    )
+
+def _makeItemWithCommands(i: int) -> Item:
+    item = _makeItem(i)
+    item.commands
+    return item
+
+def _makeGame(i: int) -> Game:
+    return Game(start=False)
+
+# a game after a few turns of moving things around and talking, closer to what a server holds (see hibernate.measureSessionBytes)
+def _makePlayedGame(i: int) -> Game:
+    g = Game(start=False)
+    for text in PLAYED:
+        g.step(text)
+    return g
+
+def benchMemory() -> None:
+    print('memory                                   now     before')
+    print(f'  bytes per room:                  {bytesPer(_makeRoom):10.0f} {BASELINE["room"]:10}')
+    print(f'  bytes per item:                  {bytesPer(_makeItem):10.0f} {BASELINE["item"]:10}  (commands were always built)')
+    globals.PATTERNS.clear()
+    print(f'  bytes per item (commands built): {bytesPer(_makeItemWithCommands):10.0f} {BASELINE["item"]:10}')
+    # the shared World is built by the first one
+    _makeGame(0)
+    print(f'  bytes per game session:          {bytesPer(_makeGame):10.0f}')
+    print(f'  bytes per played game session:   {bytesPer(_makePlayedGame):10.0f}')
+
+if __name__ == '__main__':
+    benchMemory()
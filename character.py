@@ -1,7 +1,8 @@
 from __future__ import annotations
+import copy
 import re
 from pprint import pprint
-from typing import Any, Callable, Dict, List, NoReturn, Set
+from typing import Any, Callable, Dict, List, NoReturn, Set, Tuple
 
 from command import Command
 from gametypes import *
@@ -14,6 +15,10 @@ class GoodbyeException(Exception):
     """
 
     pass
+# what a DialogOption does by default - a function and not a lambda so options can be pickled (see level.py)
+def doNothing(game) -> int:
+    return 0
+
 class DialogOption:
 
     """
@@ -23,7 +28,9 @@ class DialogOption:
 
     MATCH_ALL: RegexStr = r'.*'
 
-    DO_NOTHING: Callable = lambda: 0
+    DO_NOTHING: Callable = doNothing
+
+    __slots__ = ('name', 'hidden', 'unchanged', 'repr', 'pattern', 'response', 'newOptions', 'onCall')
 
     def __init__(self, name, *,
             hidden: bool = False,
@@ -32,7 +39,7 @@ class DialogOption:
             pattern: RegexStr,
             response: str,
             newOptions: List[DialogOptionName],
-            onCall: Callable = lambda: DialogOption.DO_NOTHING) -> None:
+            onCall: Callable = DO_NOTHING) -> None:
         
         self.name: str = name
         self.hidden: bool = hidden
@@ -43,10 +50,40 @@ class DialogOption:
         self.newOptions: List[DialogOptionName] = newOptions
         self.onCall: Callable = onCall
 
+class DialogState:
+
+    """
+    One set of dialogue options a character can be in (ex. ('Greeting', 'Location', 'Shop')), compiled once by the Character.
+
+    pattern - one pattern matching every option and then every failsafe, in order, so the first one that matches still wins
+    choices - the DialogOptions in the same order as the pattern, with transitions[n] being the state choices[n] leads to (None = stay)
+    rendered - the option list the player sees, see Character.listOptions
+    """
+
+    __slots__ = ('optionNames', 'choices', 'pattern', 'groupIndex', 'transitions', 'rendered')
+
+    def __init__(self, optionNames: Tuple[DialogOptionName, ...], options: List[DialogOption], failsafes: List[DialogOption]) -> None:
+        self.optionNames: Tuple[DialogOptionName, ...] = optionNames
+        self.choices: List[DialogOption] = options + failsafes
+        # each choice's pattern goes in its own named group, the name of the group that matched is the index of the choice
+        self.pattern: RegexPattern = globals.compile('|'.join(f'(?P<_{n}>{c.pattern.pattern})' for n, c in enumerate(self.choices)))
+        self.groupIndex: Dict[str, int] = {f'_{n}': n for n in range(len(self.choices))}
+        self.transitions: List[DialogState] = []
+        self.rendered: str = f'[ {globals.FORMATTING.bold}' + f'{globals.FORMATTING.normal} / {globals.FORMATTING.bold}'.join(
+            [o.repr for o in options if not o.hidden]) + f'{globals.FORMATTING.normal} ]'
+
+# every character has these attrs
+CharacterAttrs = globals.schema('CharacterAttrs',
+    talkedTo = False
+)
+
 class Character:
 
     """
     A game NPC, with which the player can interact with by talking to them or by trading items with them
+
+    A Character never changes during a game and is shared by every game in the process - attrs and itemsForSale are what every
+    game starts with. Each game gets its own CharacterState (see newState) for the parts that do change.
     """
 
     exampleMessages = globals.Collection(
@@ -57,15 +94,18 @@ class Character:
     )
 
     exampleCommands = [
-        Command('Talk to Sadim', pattern=r'hi sadim', onCall=lambda: talkTo('Sadim')),
-        Command('Buy from Sadim', pattern=r'what\'s for sale?', onCall=lambda: listWares()),
+        Command('Talk to Sadim', pattern=r'hi sadim', onCall=lambda g: g.talkToCharacter('Sadim')),
+        Command('Buy from Sadim', pattern=r'what\'s for sale?', onCall=lambda g: g.npcState('Sadim').listWares()),
         ...
     ]
 
-    exampleAttrs = globals.Collection(
+    exampleAttrs = CharacterAttrs(
         talkedTo = False
     )
 
+    __slots__ = ('name', 'messages', 'attrs', 'options', 'failsafes', 'startingOptions', 'states', 'startState', 'commands',
+        'itemsForSale', 'originalItemsForSale')
+
     def sayGoodbye() -> NoReturn:
 
         """ Raises GoodbyeException """
@@ -86,41 +126,74 @@ class Character:
         self.attrs: globals.Collection[Any] = attrs
         self.options: Dict[DialogOptionName, DialogOption] = {d.name: d for d in options}
         self.failsafes = failsafes
-        self.currentOptions: List[DialogOptionName] = list(startingOptions)
         self.startingOptions: List[DialogOptionName] = list(startingOptions)
+        # option names => compiled state, every state reachable from the starting options is compiled up front
+        self.states: Dict[Tuple[DialogOptionName, ...], DialogState] = dict()
+        self.startState: DialogState = self.getState(self.startingOptions)
         self.commands: List[Command] = commands
         self.itemsForSale: Dict[ItemName, ItemName] = dict(itemsForSale) or dict()
         self.originalItemsForSale: Dict[ItemName, ItemName] = dict(itemsForSale) or dict()
 
-    # returns the string to be printed
-    def talkTo(self, message: str, debug=False) -> str:
-        for optionName in self.currentOptions:
-            optionObj = self.options[optionName]
-            if debug:
-                print(optionName)
-            if optionObj.pattern.fullmatch(message.strip()):
-                if debug:
-                    print(f'option chosen: {optionName}')
-                optionObj.onCall()
-                if not optionObj.unchanged:
-                    self.currentOptions = list(optionObj.newOptions)
-                return optionObj.response
-
-        # failsafes come last 
-
-        for failsafeOption in self.failsafes:
-            if debug:
-                print(failsafeOption.name)
-            if failsafeOption.pattern.fullmatch(message.strip()):
-                if debug:
-                    print(f'failsafe chosen: {failsafeOption.name}')
-                self.currentOptions = list(failsafeOption.newOptions)
-                return failsafeOption.response
+    # compiles the state for the given option names along with every state it can lead to, or returns it if that's already done
+    def getState(self, optionNames: List[DialogOptionName]) -> DialogState:
+        key = tuple(optionNames)
+        if (state := self.states.get(key)):
+            return state
+        state = self.states[key] = DialogState(key, [self.options[o] for o in key], list(self.failsafes))
+        # failsafes always change the options, normal options only if they're not marked unchanged
+        state.transitions = [
+            None if (n < len(key) and c.unchanged) else self.getState(c.newOptions) for n, c in enumerate(state.choices)
+        ]
+        return state
+
+    def newState(self) -> CharacterState:
+        return CharacterState(self)
+
+class CharacterState:
+
+    """
+    The parts of a Character that change during a game: its attrs, where the conversation is, and what's still for sale.
+    Made the first time a game needs it, see Game.npcState.
+    """
 
+    __slots__ = ('character', 'attrs', 'state', 'itemsForSale')
+
+    def __init__(self, character: Character) -> None:
+        self.character: Character = character
+        self.attrs: globals.Collection[Any] = copy.copy(character.attrs)
+        self.state: DialogState = character.startState
+        self.itemsForSale: Dict[ItemName, ItemName] = dict(character.itemsForSale)
+
+    @property
+    def currentOptions(self) -> Tuple[DialogOptionName, ...]:
+        return self.state.optionNames
+
+    @currentOptions.setter
+    def currentOptions(self, optionNames: List[DialogOptionName]) -> None:
+        self.state = self.character.getState(optionNames)
+
+    # returns the string to be printed
+    def talkTo(self, message: str, game, debug=False) -> str:
+        if not (m := self.state.pattern.fullmatch(message.strip())):
+            return None
+        n = self.state.groupIndex[m.lastgroup]
+        choice = self.state.choices[n]
+        isFailsafe = n >= len(self.state.optionNames)
+        if debug:
+            print(f'{"failsafe" if isFailsafe else "option"} chosen: {choice.name}')
+        if not isFailsafe:
+            choice.onCall(game)
+        if (newState := self.state.transitions[n]):
+            self.state = newState
+        if game.output.discards:
+            return None
+        # responses can be in a MessageCatalog (see messages.useCatalogForCharacters)
+        if (r := choice.response) is None or r.__class__ is str:
+            return r
+        return r.render()
 
     def listOptions(self):
-        return f'[ {globals.FORMATTING.bold}' + f'{globals.FORMATTING.normal} / {globals.FORMATTING.bold}'.join(
-            [self.options[o].repr for o in self.currentOptions if not self.options[o].hidden]) + f'{globals.FORMATTING.normal} ]'
+        return self.state.rendered
 
     def listWares(self):
         return '\n'.join(f' {k} -> {v}' for k, v in self.itemsForSale.items())
@@ -128,5 +201,4 @@ class Character:
     # for debugging
 
     def printCurrOptions(self):
-        pprint({o: self.options[o].pattern for o in self.currentOptions}, sort_dicts=False)
-
+        pprint({o: self.character.options[o].pattern for o in self.currentOptions}, sort_dicts=False)
@@ -1,4 +1,4 @@
-from typing import Callable, List
+from typing import Callable, Dict, FrozenSet, Iterable, List, Set
 import re
 
 import globals
@@ -10,14 +10,60 @@ class Command:
     A game command. A list of these is iterated through and matched every time the user inputs something. If the regex pattern is matched,
     the onCall method will run. 
     
-    Note: wrap onCall functions that take arguments inside of lambdas, because they are called with no arguments.
+    Note: onCall is called with the Game as its only argument, so wrap methods in lambdas (ex. lambda g: g.takeItem('Dull Rock')).
+    Commands are shared by every game in the process (see world.World), so onCall should never hold on to a Game itself.
+
+    keys - the names of the keywords (ex. 'TakeItem') or directions (ex. 'North') the pattern starts with, see globals.parse.
+    Leave it out if the pattern can start with anything, and the command will be tried for every input.
+
+    target - for "use X on Y" commands, the name of Y (the command only works if Y is in the inventory or the current room)
+
+    passesTime - whether running it takes a turn (see Game.clock), False for commands that don't act in the world (ex. help,
+    checking the inventory, or input the game doesn't understand)
     """
 
     MATCH_ALL: RegexStr = r'.*'
 
-    def __init__(self, name: CommandName, *, pattern: RegexStr, onCall: Callable):
+    __slots__ = ('name', 'pattern', 'onCall', 'keys', 'target', 'passesTime')
+
+    def __init__(self, name: CommandName, *, pattern: RegexStr, onCall: Callable, keys: Iterable[str] = None, target: ItemName = None, passesTime: bool = True):
         self.name: CommandName = name
         self.pattern: RegexPattern = globals.compile(pattern)
         self.onCall: Callable = onCall
+        self.keys: FrozenSet[str] = frozenset(keys) if keys else None
+        self.target: ItemName = target
+        self.passesTime: bool = passesTime
+
+    __str__ = __repr__ = lambda s, f='short': f'Command: {s.name}' + (f', /{s.pattern}/, onCall={repr(s.onCall)}' if f != 'short' else '')
+
+class CommandIndex:
+
+    """
+    Groups commands by the keys they start with, so that only the commands that can possibly match an input get tried.
+
+    Commands without keys go in every group. The order the commands were given in is kept, so the first match still wins.
+
+    candidates(keys) - the commands to try for an input starting with the given keys (Intent.keys from globals.parse)
+    """
+
+    __slots__ = ('commands', 'position', 'unkeyed', 'groups')
+
+    def __init__(self, commands: Iterable[Command]) -> None:
+        self.commands: List[Command] = list(commands)
+        self.position: Dict[Command, int] = {c: n for n, c in enumerate(self.commands)}
+        # tried when the input doesn't start with any key
+        self.unkeyed: List[Command] = [c for c in self.commands if c.keys is None]
+        allKeys: Set[str] = {k for c in self.commands if c.keys for k in c.keys}
+        self.groups: Dict[str, List[Command]] = {k: [] for k in allKeys}
+        for c in self.commands:
+            for k in (allKeys if c.keys is None else c.keys):
+                self.groups[k].append(c)
 
-    __str__ = __repr__ = lambda s, f='short': f'Command: {s.name}' + (f', /{s.pattern}/, onCall={repr(s.onCall)}' if f != 'short' else '')
\ No newline at end of file
+    def candidates(self, keys: Set[str]) -> List[Command]:
+        if not keys:
+            return self.unkeyed
+        if len(keys) == 1:
+            return self.groups.get(next(iter(keys)), self.unkeyed)
+        # input like 'look at rock' starts with more than one keyword, so the groups have to be merged back in order
+        found = {c for k in keys for c in self.groups.get(k, self.unkeyed)}
+        return sorted(found, key=self.position.__getitem__)
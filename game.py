@@ -1,17 +1,29 @@
 # pyright: reportMissingImports=false
 from globals import Collection
-from enum import auto
-from typing import Any, Iterable, List, Dict
+from enum import Enum, auto
+from typing import Any, Callable, Iterable, List, Dict, Set, Tuple
 from pprint import pprint
 import textwrap
 import random
+import copy
+import warnings
 import os
+import re
 import sys
+import time
 
-from command import Command
+from command import Command, CommandIndex
 from item import Item
 from room import Room
-from character import Character, DialogOption, GoodbyeException
+from routes import RoutePlanner, WAIT
+from messages import ItemMessages
+import savefile
+import journal
+import level
+from journal import FSYNC_EVERY, Journal
+from output import NullOutput, Output, StringOutput, TerminalOutput
+from world import Overlay, World
+from character import Character, CharacterState, GoodbyeException
 from gametypes import *
 import globals
 
@@ -19,130 +31,170 @@ import globals
 DEBUGGING = False
 # or just this to skip the intro
 SKIP_INTRO = True
+# the level that's played, see level.py
+LEVEL_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'levels', 'The Uneven Tides.json')
+# every message compiled into one file, see messages.MessageCatalog - build it with `python game.py --build-catalog`
+# if it's there and up to date the game reads its messages from it, otherwise they stay in memory like before
+CATALOG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'levels', 'The Uneven Tides.catalog')
+
+# used for other game state stuff like "should i show the message on look next time around?"
+# every flag is reset to False at the start of each turn
+GameFlags = globals.schema('GameFlags', resetValue=False,
+    showMsgonStay = True
+    # etc
+)
+
+# what Game.step() does with the next input
+class Mode(Enum):
+    TITLE = auto()      # the title screen, waiting for start/exit/settings
+    PLAY = auto()       # normal turns, see checkInput
+    TALK = auto()       # talking to Game.talkingTo until they say goodbye
+    SETTINGS = auto()   # the settings menu, goes back to the mode it was opened from (see Game.modeStack)
+    EXIT = auto()       # asking if the player really wants to exit, goes back to the mode before if they don't
+    ENDED = auto()      # the game is over, step() does nothing
 
 class Game:
         
-    def __init__(self) -> None:
+    # these never change, so every Game shares them
+
+    # used for standard global game messages
+    messages: globals.Collection[str] = globals.Collection(
+        playerDidNothing = 'You did nothing.'
+    )
+
+    # used to indicate that the player did something wrong/not allowed
+    errors: globals.Collection[str] = globals.Collection(
+        # when the direction was not recognized
+        UNKNOWN_DIR = 'Which way do you want to go?',
+        # when a character's name is not recognized
+        UNKNOWN_NPC = 'Who?',
+        # when a place in "way to <place>" is not recognized
+        UNKNOWN_PLACE = 'Where?',
+        # when an item is not recognized
+        UNKNOWN_ITEM = 'You can\'t do that.',
+        # when the user tries to use an item on an invalid target
+        INVALID_ITEM_USE = 'You can\'t use it that way.',
+        # when an item cannot be used because of the flags
+        CANNOT_USE_ITEM = 'You can\'t seem to use that.',
+        # when an item trying to be dropped is not in the inventory
+        CANNOT_DROP_ITEM = 'You can\'t drop that! It\'s not in your inventory.',
+        # when an item trying to be taken is not in the current room
+        CANNOT_TAKE_ITEM = 'I don\'t see that in here.',
+        # when an item cannot be picked up - set in Item.attrs
+        CANNOT_CARRY_ITEM = 'You can\'t carry that!',
+        # when an item is already in the inventory and the user tries to pick it up
+        ITEM_ALREADY_IN_INV = 'You\'re already carrying that!',
+        # when an item is in the current room and the user tries to drop it
+        ITEM_NOT_IN_INV = 'You\'re not carrying that item.',
+        # when the user input makes no sense whatsoever
+        UNKNOWN_CMD = 'Command not recognized.'
+    )
+
+    # do not modify the way this string looks in the program - will fuck up the format of it in the game
+    INTRO_TEXT = 'You wake up staring at a blue sky, hearing the sound of seagulls overhead. As you sit up, you notice that you\'re on a beach - what looks to be a remote island with no land in sight.'
+    # same goes for this
+    titleText = \
+        """
+      ________            __  __                              _______     __         
+     /_  __/ /_  ___     / / / /___  ___ _   _____  ____     /_  __(_)___/ /__  _____
+      / / / __ \/ _ \   / / / / __ \/ _ \ | / / _ \/ __ \     / / / / __  / _ \/ ___/
+     / / / / / /  __/  / /_/ / / / /  __/ |/ /  __/ / / /    / / / / /_/ /  __(__  ) 
+    /_/ /_/ /_/\___/   \____/_/ /_/\___/|___/\___/_/ /_/    /_/ /_/\__,_/\___/____/  
+                                                                                 
+                                                                                       
+        """
+
+    # start=False only sets the game up without running it - drive it with step() instead
+    # output is where all the text goes, the terminal by default or a StringOutput for a game that isn't started (see output.py)
+    # world is what the game is played in, the one shared by the whole process by default (see sharedWorld)
+    # journal (only with start=True) gets every input played, see journal.py
+    def __init__(self, start: bool = True, output: Output = None, world: World = None, journal: Journal = None) -> None:
 
         # MAIN VARS
 
-        # these are actually initialized in setup
+        # everything written in a turn is buffered here and flushed once at the end of it
+        self.output: Output = output if output is not None else TerminalOutput() if start else StringOutput()
+
+        # see Mode and step()
+        self.mode: Mode = Mode.PLAY
+        # the modes settings and exit go back to, last one on top
+        self.modeStack: List[Mode] = []
+        # the character the player is talking to in Mode.TALK
+        self.talkingTo: CharacterState = None
+
+        # everything that doesn't change during the game, shared with every other Game - see world.World
+        # the attrs below only hold what this game changed on top of it, so a new Game costs next to nothing
+        self.world: World = world if world is not None else sharedWorld()
+        self.rooms: Dict[RoomName, Room] = self.world.rooms # room ID => room obj
+        self.items: Dict[ItemName, Item] = self.world.items # item ID => item obj
+        self.characters: Dict[CharName, Character] = self.world.characters # character ID => character obj
+        self.commands: Dict[CommandName, Command] = self.world.commands
+        self.commandIndex: CommandIndex = self.world.commandIndex
+        # (item ID, message) => text, see messages.ItemMessages
+        self.itemMessages: ItemMessages = self.world.itemMessages
+
+        # initialized in setup
         self.currentRoom: Room = None
-        self.rooms: Dict[RoomName, Room] = dict() # room ID => room obj
-        self.items: Dict[ItemName, Item] = dict() # item ID => item obj
-        self.characters: Dict[CharName, Character] = dict() # character ID => character obj
         self.inventory: Dict[ItemName, Item] = dict() # item ID => item obj
-
-        self.time = globals.TIME.START
+        # where every placed item is right now - the room item dicts and the inventory are kept in sync with this by _placeItem()
+        self.itemLocations: Overlay[ItemName, Location] = Overlay(self.world.itemLocations) # item ID => location
+        # room name => item ID => item obj for the items in that room right now (see _itemsAt)
+        self.roomItems: Overlay[RoomName, Dict[ItemName, Item]] = Overlay(self.world.roomItems)
+        # room name => flags, see roomFlagsOf
+        self.roomFlags: Overlay[RoomName, Any] = Overlay(self.world.roomFlags)
+        # character ID => what changed about that character in this game, see npcState
+        self.npcs: Dict[CharName, CharacterState] = dict()
+        # shortest routes between rooms at every time of day - the World's, until this game opens or closes an exit (see _ownRoutes)
+        self.routes: RoutePlanner = self.world.routes
+        # room name => the 8 rooms its exits lead to right now (None if closed) - swapped for another snapshot when the time changes
+        self.exits: Dict[RoomName, List[Room]] = None
+        # the indexed inventory and current room commands, built by activeCommands() and thrown away by commandsChanged()
+        self._activeCommands: Tuple[CommandIndex, CommandIndex] = None
 
         # used for game settings like verbose mode which used to be here but was removed
         self.config: globals.Collection[Any] = globals.Collection(
-            LINE_WRAP = 100
-        )
-
-        # used for other game state stuff like "should i show the message on look next time around?"
-        self.flags: globals.Collection[Any] = globals.Collection(
-            resetValue=False,
-            showMsgonStay=True
-            # etc
-        )
-        
-        # used for standard global game messages
-        self.messages: globals.Collection[str] = globals.Collection(
-            playerDidNothing = 'You did nothing.'
+            LINE_WRAP = 100,
+            # how many turns each time of day lasts
+            TURNS_PER_TIME = globals.TURNS_PER_TIME
         )
 
-        # used to indicate that the player did something wrong/not allowed
-        self.errors: globals.Collection[str] = globals.Collection(
-            # when the direction was not recognized
-            UNKNOWN_DIR = 'Which way do you want to go?',
-            # when a character's name is not recognized
-            UNKNOWN_NPC = 'Who?',
-            # when an item is not recognized
-            UNKNOWN_ITEM = 'You can\'t do that.',
-            # when the user tries to use an item on an invalid target
-            INVALID_ITEM_USE = 'You can\'t use it that way.',
-            # when an item cannot be used because of the flags
-            CANNOT_USE_ITEM = 'You can\'t seem to use that.',
-            # when an item trying to be dropped is not in the inventory
-            CANNOT_DROP_ITEM = 'You can\'t drop that! It\'s not in your inventory.',
-            # when an item trying to be taken is not in the current room
-            CANNOT_TAKE_ITEM = 'I don\'t see that in here.',
-            # when an item cannot be picked up - set in Item.attrs
-            CANNOT_CARRY_ITEM = 'You can\'t carry that!',
-            # when an item is already in the inventory and the user tries to pick it up
-            ITEM_ALREADY_IN_INV = 'You\'re already carrying that!',
-            # when an item is in the current room and the user tries to drop it
-            ITEM_NOT_IN_INV = 'You\'re not carrying that item.',
-            # when the user input makes no sense whatsoever
-            UNKNOWN_CMD = 'Command not recognized.'
-        )
+        # every command that acts in the world is a turn (see Command.passesTime and self.time)
+        self.clock: globals.TideClock = globals.TideClock(globals.TIME.START, turnsPerTime=self.config.TURNS_PER_TIME)
 
-        self.commands: Dict[CommandName, Command] = {
-            c.name: c for c in (
-
-                # Game Commands
-                # NOTE none of these lambdas should have tuples in them, define a function if you're doing that
-            [   
-                Command('Help', pattern=r'help( me)?', onCall=lambda: self.help()),
-                Command('Look Around', pattern=fr'{globals.KEYWORDS.LookAround}', onCall=lambda: self.lookAround()),
-                Command('Do Nothing', pattern=fr'{globals.KEYWORDS.DoNothing}', onCall=lambda: self.doNothing()),
-                Command('Exit Game', pattern=fr'{globals.KEYWORDS.Exit}( (the )?game)?', onCall=lambda: self.exit()),
-                Command('Check Inventory', pattern=r'(check (the)?)?(inventory|inv|bag|backpack)', onCall=lambda: self.showInventory()),
-                Command('Open Settings', pattern=r'(open (the)?)?(game )?settings', onCall=lambda: self.settings()),
-            ] + 
-                # Direction Commands
-            [
-                Command(f'Move {d.name}', pattern=d.pattern, onCall=lambda d=d: self.move(d)) for d in globals.DIRS.values() if d is not None
-            ] +
-                # Failsafes
-            [
-                Command('Unknown Direction', pattern=fr'{globals.KEYWORDS.Move}.*', onCall=lambda: self.writeline(self.errors.UNKNOWN_DIR)),
-                Command('Unknown Item', pattern=globals.collect(
-                        globals.KEYWORDS.UseItem,
-                        globals.KEYWORDS.TakeItem,
-                        globals.KEYWORDS.DropItem
-                    ) + r'.*', onCall=lambda: self.writeline(self.errors.UNKNOWN_ITEM)),
-                Command('Unknown Character', pattern=fr'{globals.KEYWORDS.TalkTo}.*', onCall=lambda: self.writeline(self.errors.UNKNOWN_NPC)),
-                Command('Unknown Command', pattern=Command.MATCH_ALL, onCall=lambda: self.writeline(self.errors.UNKNOWN_CMD))
-            ]
-        )}
-
-        # do not modify the way this string looks in the program - will fuck up the format of it in the game
-        self.INTRO_TEXT = 'You wake up staring at a blue sky, hearing the sound of seagulls overhead. As you sit up, you notice that you\'re on a beach - what looks to be a remote island with no land in sight.'
-        # same goes for this
-        self.titleText = \
-            """
-      ________            __  __                              _______     __         
-     /_  __/ /_  ___     / / / /___  ___ _   _____  ____     /_  __(_)___/ /__  _____
-      / / / __ \/ _ \   / / / / __ \/ _ \ | / / _ \/ __ \     / / / / __  / _ \/ ___/
-     / / / / / /  __/  / /_/ / / / /  __/ |/ /  __/ / / /    / / / / /_/ /  __(__  ) 
-    /_/ /_/ /_/\___/   \____/_/ /_/\___/|___/\___/_/ /_/    /_/ /_/\__,_/\___/____/  
-                                                                                 
-                                                                                       
-        """
+        # see GameFlags
+        self.flags: GameFlags = GameFlags()
 
         self.setup()
+        if not start:
+            return
+        self.clearTerminal()
         if not (DEBUGGING or SKIP_INTRO):
             self.title()
-            self.intro()
-        self.run()
-        self.exit()
+        if journal:
+            journal.start(self)
+        self.run(journal)
+
+    # the current time of day, worked out from the turn number by self.clock
+    @property
+    def time(self) -> globals.TimeState:
+        return self.clock.time
 
     # ------- IO METHODS ------- #
 
-    def input(self, prompt: str = '') -> str:
-        return input(f'\n  {prompt}\n\n> ')
+    # flushes whatever's been written so far before waiting for input
+    def readline(self, prompt: str = '\n> ') -> str:
+        self.output.flush()
+        return input(prompt)
 
     # same as writeline but without the preceding newline
     def write(self, text: str) -> None:
-        print(f'  {text}')
+        self.output.write(f'  {text}\n')
 
     def writeline(self, text: str = '', end='\n') -> None:
-        print(f'\n  {text}', end=end)
+        self.output.write(f'\n  {text}{end}')
 
     def clearTerminal(self):
-        os.system('printf "\ec\r                        \r"')
+        self.output.clear()
 
     def reprItemList(self, i: Iterable[Item], c=False) -> str:
         ret = ''
@@ -161,10 +213,10 @@ class Game:
     # turn DEBUGGING to true at the top of the file and all these run every game loop
 
     def _printCurrentRoomDirs(self):
-        print(f'CURRENT ROOM DIRS: {self.currentRoom.dirs}')
+        print(f'CURRENT ROOM DIRS: {self.routes.dirs[self.currentRoom.name]}')
     
     def _printcurrentRoomItems(self):
-        print(f'CURRENT ROOM ITEMS: {self.currentRoom.items}')
+        print(f'CURRENT ROOM ITEMS: {self.roomItems[self.currentRoom.name]}')
 
     def _printInventory(self):
         print(f'INVENTORY: {self.inventory}')
@@ -174,16 +226,67 @@ class Game:
         self._printcurrentRoomItems()
         self._printInventory()
 
+    # ------- GAME STATE ------- #
+
+    # the state of a room, character or the exits, for this game only - the World's is shared, so it's copied the first time
+    # this game changes it
+
+    # a room's flags - pass write=True before changing them
+    def roomFlagsOf(self, roomName: RoomName, write: bool = False) -> Any:
+        if write and not self.roomFlags.owns(roomName):
+            self.roomFlags[roomName] = copy.copy(self.roomFlags[roomName])
+        return self.roomFlags[roomName]
+
+    # what's changed about a character in this game (attrs, dialogue, what's for sale)
+    def npcState(self, charName: CharName) -> CharacterState:
+        if (npc := self.npcs.get(charName)) is None:
+            npc = self.npcs[charName] = self.characters[charName].newState()
+        return npc
+
+    # call before opening or closing an exit, the World's routes (and exits) are shared
+    def _ownRoutes(self) -> None:
+        if self.routes is self.world.routes:
+            self.routes = self.routes.copy()
+            self.exits = self.routes.snapshots[self.time.ordinal]
+
+    # ------- ITEM LOCATIONS ------- #
+
+    # the dict an item is kept in at the given location - characters don't keep one, they only show up in self.itemLocations
+    # a room's dict is copied from the World's before this game changes it
+    def _itemsAt(self, location: Location) -> Dict[ItemName, Item]:
+        if location.kind == 'room':
+            if not self.roomItems.owns(location.name):
+                self.roomItems[location.name] = dict(self.roomItems[location.name])
+            return self.roomItems[location.name]
+        if location.kind == 'inventory':
+            return self.inventory
+        return None
+
+    # every item that moves goes through here so that self.itemLocations, the room item dicts and the inventory always agree
+    # location=None takes the item out of the game
+    def _placeItem(self, itemName: ItemName, location: Location) -> None:
+        here = (Location('inventory'), Location('room', self.currentRoom.name) if self.currentRoom else None)
+        if (old := self.itemLocations.pop(itemName, None)):
+            if (items := self._itemsAt(old)) is not None:
+                items.pop(itemName)
+        if location:
+            if (items := self._itemsAt(location)) is not None:
+                items[itemName] = self.items[itemName]
+            self.itemLocations[itemName] = location
+        if old in here or location in here:
+            self.commandsChanged()
+
     # ------- GAMEPLAY METHODS ------- #
 
     # moves a player around once in a direction by changing the currentRoom to currentRoom.dirs[dir]
     def move(self, dir: globals.Direction) -> None:
-        if (d := self.currentRoom.dirs[dir].room):
+        if (d := self.exits[self.currentRoom.name][dir.ordinal]):
             self.writeline(self.getRoomMessage(self.currentRoom.name, f'playerWent{dir.name}'))
             self.currentRoom = d
+            self.commandsChanged()
             # this method handles flags.playerHasVisited
             self.writeline(self.getRoomMessage(self.currentRoom.name, 'onEnter'))
-            self.currentRoom.flags.playerHasVisited = True
+            self.roomFlagsOf(self.currentRoom.name, write=True).playerHasVisited = True
             self.flags.showMsgonStay = False
         else:
             # if currentRoom[dir] is None
@@ -194,42 +297,47 @@ class Game:
         itemObj: Item = self.items[itemName]
         if not itemObj.attrs.canCarry:
             self.writeline(self.errors.CANNOT_CARRY_ITEM)
-        elif itemObj in self.inventory.values():
+        elif self.itemLocations.get(itemName) == Location('inventory'):
             self.writeline(self.errors.ITEM_ALREADY_IN_INV)
         else:
-            self.inventory.update({itemObj.name: itemObj})
-            self.currentRoom.items.remove(itemObj)
+            self._placeItem(itemName, Location('inventory'))
             self.writeline(self.getItemMessage(itemName, 'onTake'))
             # if you're looking here ^ chances are you got an attribute error so always make sure to include messages.onTake and onDrop if the item is carryable
 
     # does the reverse of the above, adding it to the current room's item list
     def dropItem(self, itemName: ItemName) -> None:
-        itemObj: Item = self.items[itemName]
-        if itemObj not in self.inventory.values():
-            self.writeline(self.errors.ITEM_NOT_IN_INV if itemObj in self.currentRoom.items.values() else self.errors.UNKNOWN_ITEM)
+        location = self.itemLocations.get(itemName)
+        if location != Location('inventory'):
+            self.writeline(self.errors.ITEM_NOT_IN_INV if location == Location('room', self.currentRoom.name) else self.errors.UNKNOWN_ITEM)
         else:
-            self.inventory.pop(itemObj.name)
-            self.currentRoom.items.append(itemObj)
+            self._placeItem(itemName, Location('room', self.currentRoom.name))
             self.writeline(self.getItemMessage(itemName, 'onDrop'))
     
+    # starts a conversation, every input after this goes to _talkStep until the character says goodbye
     def talkToCharacter(self, charName: CharName):
-        charObj = self.characters[charName]
-        if charObj.attrs.talkedTo:
-            self.writeline(charObj.messages.onTalk)
+        npc = self.npcState(charName)
+        if npc.attrs.talkedTo:
+            self.writeline(npc.character.messages.onTalk)
         else:
-            self.writeline(charObj.messages.onFirstTalk)
-            charObj.attrs.talkedTo = True
-        self.writeline(charObj.listOptions(), end='')
-        while True:
-            try:
-                if DEBUGGING:
-                    charObj.printCurrOptions()
-                if (resp := charObj.talkTo(self.input(), debug=DEBUGGING)):
-                    self.writeline(resp)
-            except GoodbyeException:
-                self.writeline(charObj.messages.onLeave)
-                break
-            self.writeline(charObj.listOptions(), end='')
+            self.writeline(npc.character.messages.onFirstTalk)
+            npc.attrs.talkedTo = True
+        self.writeline(npc.listOptions(), end='')
+        self.talkingTo = npc
+        self.mode = Mode.TALK
+
+    def _talkStep(self, text: str) -> None:
+        npc = self.talkingTo
+        try:
+            if DEBUGGING:
+                npc.printCurrOptions()
+            if (resp := npc.talkTo(text, self, debug=DEBUGGING)):
+                self.writeline(resp)
+        except GoodbyeException:
+            self.writeline(npc.character.messages.onLeave)
+            self.talkingTo = None
+            self.mode = Mode.PLAY
+            return
+        self.writeline(npc.listOptions(), end='')
             
     
     # ------- MISC GAME METHODS ------- #
@@ -240,7 +348,7 @@ class Game:
 
     # looks around in the current room
     def lookAround(self) -> None:
-        self.flags.showMsgOnStay = False
+        self.flags.showMsgonStay = False
         self.writeline(self.getRoomMessage(self.currentRoom.name, 'onLook'))
 
     # displays the inventory contents
@@ -256,28 +364,61 @@ class Game:
 
     # brings up the help message
     def help(self) -> None:
-        helpMsg = f'This is the help message. To play the game, type commands to interact with your surroundings. Here are some suggestions:\n look around\n go ' + \
-        random.choice([d for d, r in self.currentRoom.dirs.items() if r is not None]).name.lower()
-        if (validCarryableItemsInCurrentRoom := [x for x in self.currentRoom.items if x.attrs.canCarry]):
+        helpMsg = f'This is the help message. To play the game, type commands to interact with your surroundings. Here are some suggestions:\n look around'
+        if (openDirs := self.routes.openDirs[self.time.ordinal][self.currentRoom.name]):
+            helpMsg += f'\n go {random.choice(openDirs).name.lower()}'
+        if (validCarryableItemsInCurrentRoom := [x for x in self.roomItems[self.currentRoom.name].values() if x.attrs.canCarry]):
             helpMsg += f'\n take {random.choice(validCarryableItemsInCurrentRoom).name.lower()}'
         elif (validCarryableItemsInInventory := [x for x in self.inventory.values()]):
             helpMsg += f'\n drop {random.choice(validCarryableItemsInInventory).name.lower()}'
+        helpMsg += '\n way to <somewhere you\'ve been>'
         self.writeline(helpMsg)
+
+    # tells the player how to get back to a room they've been to, waiting for the tide if they have to (see RoutePlanner)
+    # a run of waits is one step - "wait 3 times" - since every wait is a turn
+    def showWay(self, roomName: RoomName) -> None:
+        if not self.roomFlagsOf(roomName).playerHasVisited:
+            self.writeline('You haven\'t been there yet.')
+            return
+        steps = self.routes.steps(self.currentRoom.name, roomName, self.clock)
+        if steps is None:
+            self.writeline('You can\'t get there from here anymore.')
+            return
+        if not steps:
+            self.writeline('You\'re already there.')
+            return
+        parts, waits = [], 0
+        for n, step in enumerate(steps):
+            if step != WAIT:
+                parts.append(f'go {step.name.lower()}')
+                continue
+            waits += 1
+            if n + 1 == len(steps) or steps[n + 1] != WAIT:
+                parts.append('wait once' if waits == 1 else f'wait {waits} times')
+                waits = 0
+        self.writeline(', then '.join(parts).capitalize() + '.')
     
-    # opens the settings menu
+    # opens the settings menu, every input after this goes to _settingsStep until the player returns
     def settings(self) -> None:
         self.flags.showMsgonStay = False
-        showSettings = lambda: self.writeline(f'\n\t"settings" - show this message again\n\n\t"return" to the game')
-        showSettings()
-        while True:
-            i = input('\n> ').lower().partition(' ')
-            if i[0] == 'settings':
-                showSettings()
-            elif i[0] == 'return':
-                self.flags.showMsgonStay = True
-                return
-            else:
-                self.writeline('Sorry, I don\'t understand.')
+        self._showSettings()
+        self.modeStack.append(self.mode)
+        self.mode = Mode.SETTINGS
+
+    def _showSettings(self) -> None:
+        self.writeline(f'\n\t"settings" - show this message again\n\n\t"return" to the game')
+
+    def _settingsStep(self, text: str) -> None:
+        i = text.lower().partition(' ')
+        if i[0] == 'settings':
+            self._showSettings()
+        elif i[0] == 'return':
+            self.flags.showMsgonStay = True
+            self.mode = self.modeStack.pop()
+            if self.mode is Mode.TITLE:
+                self._showTitleOptions()
+        else:
+            self.writeline('Sorry, I don\'t understand.')
             
 
     # ------- METHODS TO BE PASSED IN TO ITEMS ------- #
@@ -286,48 +427,57 @@ class Game:
     # They should be passed into the Item constructor in onCalls (a dict).
 
     # used to connect two rooms during the game, not before it starts - happens to be the same as linkRooms()
+    # only changes this game's exits (self.routes.dirs), not the Rooms themselves
     def _openDirOfRoom(self, room1Name: RoomName, dir: globals.Direction, room2Name: RoomName, bothways=True) -> None:
+            self._ownRoutes()
             room1, room2 = self.rooms[room1Name], self.rooms[room2Name]
-            room1.dirs.update({dir: room2})
+            self.routes.dirs[room1Name][dir.ordinal] = Path(room2, globals.timeMask(globals.TIME.All))
+            self.routes.roomChanged(room1Name)
             if bothways:
-                room2.dirs.update({dir.reverse: room1})
+                self.routes.dirs[room2Name][dir.reverse.ordinal] = Path(room1, globals.timeMask(globals.TIME.All))
+                self.routes.roomChanged(room2Name)
 
     # opposite of the above                
     # if bothways is False, turns A <=> B into A <= B where B is A.dirs[dir]
     # if it's true, disconnects the rooms completely
     def _closeDirOfRoom(self, roomName: RoomName, dir: globals.Direction, bothways=True) -> None:
-            roomObj = self.rooms[roomName]
-            if bothways:
-                roomObj.dirs[dir].update({dir.reverse: None})
-            roomObj.dirs.update({dir: None})
+            self._ownRoutes()
+            if bothways and (other := self.routes.dirs[roomName][dir.ordinal].room):
+                self.routes.dirs[other.name][dir.reverse.ordinal] = Room.NO_EXIT
+                self.routes.roomChanged(other.name)
+            self.routes.dirs[roomName][dir.ordinal] = Room.NO_EXIT
+            self.routes.roomChanged(roomName)
     
     # exact same method as in setup
     def _addItemToRoom(self, itemName: ItemName, roomName: RoomName) -> None:
-            self.rooms[roomName].items.append(self.items[itemName])
+            self._placeItem(itemName, Location('room', roomName))
     
     def _movePlayerToRoom(self, roomName: RoomName, textOnMove: str) -> None:
         self.currentRoom = self.rooms[roomName]
-        self.currentRoom.flags.playerHasVisited = True
+        self.commandsChanged()
+        self.roomFlagsOf(roomName, write=True).playerHasVisited = True
         self.writeline(textOnMove)
 
     # opposite of the above
     def _removeItemFromRoom(self, itemName: ItemName, roomName: RoomName) -> None:
-            self.rooms[roomName].items.remove(self.items[itemName])
+            if self.itemLocations.get(itemName) == Location('room', roomName):
+                self._placeItem(itemName, None)
     
     def _addItemToInventory(self, itemName: ItemName):
-        self.inventory.update({itemName: self.items[itemName]})
+        self._placeItem(itemName, Location('inventory'))
 
     # for consumable items - removes itself from inv when used and DOES NOT GO BACK INTO CURRENT ROOM
     def _removeItemFromInventory(self, itemName: ItemName) -> None:
-        self.inventory.pop(itemName)
+        if self.itemLocations.get(itemName) == Location('inventory'):
+            self._placeItem(itemName, None)
 
     # ------- SPECIFIC ROOM/ITEM/NPC METHODS ------- #
 
     def _giveItemToCharacter(self, itemName: ItemName, charName: CharName) -> None:
-        charObj = self.characters[charName]
-        if itemName not in self.inventory.keys():
+        charObj, npc = self.characters[charName], self.npcState(charName)
+        if self.itemLocations.get(itemName) != Location('inventory'):
             # if out of stock
-            if itemName in charObj.originalItemsForSale.keys() and not itemName in charObj.itemsForSale.keys():
+            if itemName in charObj.originalItemsForSale.keys() and not itemName in npc.itemsForSale.keys():
                 self.writeline(charObj.messages.outOfStock)
                 return
             self.writeline(charObj.messages.onFailedSale)
@@ -338,14 +488,14 @@ class Game:
         # if it is/was a legit item
         else:
             # if out of stock
-            if not itemName in charObj.itemsForSale.keys():
+            if not itemName in npc.itemsForSale.keys():
                 self.writeline(charObj.messages.outOfStock)
                 return
             # if in stock
-            self.inventory.pop(itemName)
-            newItemID = charObj.itemsForSale[itemName]
-            self.inventory.update({newItemID: self.items[newItemID]})
-            charObj.itemsForSale.pop(itemName)
+            newItemID = npc.itemsForSale[itemName]
+            self._placeItem(itemName, Location('character', charName))
+            self._placeItem(newItemID, Location('inventory'))
+            npc.itemsForSale.pop(itemName)
             self.writeline(f'You received {self.items[newItemID].repr} in exchange for {self.items[itemName].repr}.')
     
 
@@ -353,12 +503,25 @@ class Game:
 
     # this method ensures that a command in the form "use object on target" has the target in either the inventory or currentRoom
     # returns false if this is not "valid"
-    def evalTargetCommand(self, cmd: str) -> bool:
-        if not cmd.startswith('Use'):
+    def evalTargetCommand(self, cmd: Command) -> bool:
+        if cmd.target is None:
             return True
-        _items = cmd.replace('Use ', '').split(' on ')
-        targetObj = self.items[_items[1]]
-        return targetObj in self.inventory.items() or targetObj in self.currentRoom.items
+        return self.itemLocations.get(cmd.target) in (Location('inventory'), Location('room', self.currentRoom.name))
+
+    # call this whenever something changes which commands are available (an item or the player moving, an item's attrs changing)
+    # opening/closing room directions doesn't count, the direction commands are global
+    def commandsChanged(self) -> None:
+        self._activeCommands = None
+
+    # the inventory and current room commands, only rebuilt after commandsChanged() so turns where nothing happened are free
+    def activeCommands(self) -> Tuple[CommandIndex, CommandIndex]:
+        if self._activeCommands is None:
+            self._activeCommands = (CommandIndex(self.getInvCommands().values()), CommandIndex(self.getCurrRoomCommands().values()))
+        return self._activeCommands
+
+    # the items this game matches commands against - the ones in the inventory and the current room
+    def visibleItems(self) -> Set[ItemName]:
+        return {*self.inventory, *self.roomItems[self.currentRoom.name]}
 
     def getInvCommands(self) -> Dict[CommandName, Command]:
         d: Dict[CommandName, Command] = dict()
@@ -369,7 +532,7 @@ class Game:
             if i.attrs.canUse:
                 d.update(i.useCommands)
             d.update(i.carryCommands)
-            d.update({k: v for k, v in i.targetCommands.items() if self.evalTargetCommand(v.name)})
+            d.update({k: v for k, v in i.targetCommands.items() if self.evalTargetCommand(v)})
             d.update(i.failsafeCommands)
         return d
     
@@ -378,20 +541,20 @@ class Game:
     - always get commands
     - get useCommands if they can be used
     - always get carryCommands
-    - d.update({k: v for k, v in i.targetCommands.items() if self.evalTargetCommand(v.name)})
+    - d.update({k: v for k, v in i.targetCommands.items() if self.evalTargetCommand(v)})
     - always get failsafes
 
     curr room items (below):
     - always get commands
     - get useCommands if they can be used but not carried, or if they are always usable
     - get carryCommands if they can be carried
-    - d.update({k: v for k, v in i.targetCommands.items() if self.evalTargetCommand(v.name)})
+    - d.update({k: v for k, v in i.targetCommands.items() if self.evalTargetCommand(v)})
     - always get failsafes
     """
 
     def getCurrRoomCommands(self) -> Dict[CommandName, Command]:
         d: Dict[CommandName, Command] = dict()
-        for i in self.currentRoom.items:
+        for i in self.roomItems[self.currentRoom.name].values():
             # all non-carryable items can be used without picking them up
             # possible BUG here later?
             d.update(i.commands)
@@ -399,7 +562,7 @@ class Game:
                 d.update(i.useCommands)
             if i.attrs.canCarry:
                 d.update(i.carryCommands)
-            d.update({k: v for k, v in i.targetCommands.items() if self.evalTargetCommand(v.name)})
+            d.update({k: v for k, v in i.targetCommands.items() if self.evalTargetCommand(v)})
             d.update(i.failsafeCommands)
 
         d.update({c.name: c for c in self.currentRoom.specialCommands})
@@ -411,606 +574,397 @@ class Game:
     # ------- OTHER IMPORTANT METHODS ------- #
     
     def checkInput(self, text: str) -> None:
+        self.flags.reset()
+        if (c := self.matchCommand(globals.parse(text.strip()))):
+            self.runCommand(c)
+
+    # the command an input runs in this game right now, None if nothing matches
+    def matchCommand(self, intent: Intent) -> Command:
         # the order really matters here so that Unknown Command is last
         # inventory items should get "use" and "drop" commands
         # current room commands should get "take" commands
-        self.flags.reset()
-        allCommands = dict()
-        allCommands.update(self.getInvCommands())
-        allCommands.update(self.getCurrRoomCommands())
-        allCommands.update(self.commands)
-        for _, c in allCommands.items():
-            if DEBUGGING:
-                print(c.__repr__(f='long'))
-                #print(c)
-            if (m := c.pattern.fullmatch(text.strip())):
+        # only the commands starting with the same keyword as the input are tried, see CommandIndex
+        for index in (*self.activeCommands(), self.commandIndex):
+            for c in index.candidates(intent.keys):
                 if DEBUGGING:
-                    print(f'[{c}]: {m}')
-                c.onCall()
-                return
+                    print(c.__repr__(f='long'))
+                    #print(c)
+                if (m := c.pattern.fullmatch(intent.text)):
+                    if DEBUGGING:
+                        print(f'[{c}]: {m}')
+                    return c
+        return None
+
+    # everything matchCommand() depends on besides the input - games with the same signature match every input to the same command
+    # (the commands come from the current room, the items in it and the inventory, in that order, see activeCommands)
+    def commandSignature(self) -> Tuple[RoomName, Tuple[ItemName, ...], Tuple[ItemName, ...]]:
+        return (self.currentRoom.name, tuple(self.inventory), tuple(self.roomItems[self.currentRoom.name]))
+
+    # runs a matched command as this turn
+    def runCommand(self, c: Command) -> None:
+        c.onCall(self)
+        if c.passesTime:
+            self.clock.advance()
+        # swap in the exits for the time of day it is now
+        self.exits = self.routes.snapshots[self.time.ordinal]
+        self.output.flush()
     
     # ------- PROBABLY THE LONGEST METHODS WE'RE GONNA HAVE TBH ------- #
 
-    # REMEMBER TO ADD PLACES FOR ALL CARRYABLE ITEMS TO BE DROPPED, IN EACH ROOM
-    # ...yeah this is gonna suck when we have hundreds of items
-    # but worth the effort for sure and there are shortcuts we can take
-
-    # message can be 'onEnter', 'onLook', or 'onStay'
-    # THIS METHOD HANDLES ONFIRSTENTER by checking room.flags.playerHasVisited
+    # message can be 'onEnter', 'onLook', 'onStay', 'playerWent<Direction>' or 'playerTried<Direction>'
+    # the messages themselves are in the level file (see level.py)
     def getRoomMessage(self, roomName: RoomName, message: str) -> str:
-
-        # helper methods - make use of these and self.reprItemList to create the shit
-
-        def itemInRoom(itemName: ItemName, roomName: RoomName) -> bool:
-            return self.items[itemName] in self.rooms[roomName].items
-        
-        # filters the list given and the return value can be evaluated as a bool btw
-        def anyInRoom(itemList: List[ItemName], roomName: RoomName) -> List[Item]:
-            return [self.items[i] for i in itemList if self.items[i] in self.rooms[roomName].items]
-
-        def playerVisitedRoom(roomName: RoomName) -> bool:
-            return self.rooms[roomName].flags.playerHasVisited
-
-        s = ''
-        roomObj = self.rooms[roomName]
-        
-        match roomName:
-
-        # ------- NE COAST ------- #
-        
-            case 'Northeast Coast':
-
-                match message:
-                    
-                    case m if m in (options := {
-                        'playerWentNorth': None,
-                        'playerWentSouth': None,
-                        'playerWentEast': None,
-                        'playerWentWest': None,
-                        'playerWentNortheast': None,
-                        'playerWentNorthwest': None,
-                        'playerWentSoutheast': None,
-                        'playerWentSouthwest': None,
-                    }).keys():
-                        return options[m] or f'You went {m.replace("playerWent", "").lower()}.'
-                
-                    case m if m in (options := {
-                        'playerTriedNorth': None,
-                        'playerTriedSouth': None,
-                        'playerTriedEast': None,
-                        'playerTriedWest': None,
-                        'playerTriedNortheast': None,
-                        'playerTriedNorthwest': None,
-                        'playerTriedSoutheast': None,
-                        'playerTriedSouthwest': None,
-                    }).keys():
-                            return options[m] or 'You can\'t go that way.'
-
-                    
-                return {
-                    'onEnter': 'You reached the northeast coast. ',
-                    'onLook': 'Nothing here but sand and your footprints. ',
-                    'onStay': 'You are on the beach. '
-                }[message]
-
-        # ------- N COAST ------- #
-        
-            case 'Northern Coast':
-
-                match message:
-                    
-                    case m if m in (options := {
-                        'playerWentNorth': None,
-                        'playerWentSouth': None,
-                        'playerWentEast': None,
-                        'playerWentWest': None,
-                        'playerWentNortheast': None,
-                        'playerWentNorthwest': None,
-                        'playerWentSoutheast': None,
-                        'playerWentSouthwest': None,
-                    }).keys():
-                        return options[m] or f'You went {m.replace("playerWent", "").lower()}.'
-                
-                    case m if m in (options := {
-                        'playerTriedNorth': None,
-                        'playerTriedSouth': None,
-                        'playerTriedEast': None,
-                        'playerTriedWest': None,
-                        'playerTriedNortheast': None,
-                        'playerTriedNorthwest': None,
-                        'playerTriedSoutheast': None,
-                        'playerTriedSouthwest': None,
-                    }).keys():
-                            return options[m] or 'You can\'t go that way.'
-
-                return {
-                    'onEnter': 'You reached the northernmost coast. ' if roomObj.flags.playerHasVisited else 'You reached the north coast of the island. ',
-                    'onLook': 'The beach stretches as far as the eye can see to the southwest and southeast. ',
-                    'onStay': 'You are on the northern coast. '
-                }[message]
-
-        # ------- NW COAST ------- #
-        
-            case 'Northwest Coast':
-
-                match message:
-                    
-                    case m if m in (options := {
-                        'playerWentNorth': None,
-                        'playerWentSouth': None,
-                        'playerWentEast': None,
-                        'playerWentWest': None,
-                        'playerWentNortheast': None,
-                        'playerWentNorthwest': None,
-                        'playerWentSoutheast': None,
-                        'playerWentSouthwest': None,
-                    }).keys():
-                        return options[m] or f'You went {m.replace("playerWent", "").lower()}.'
-                
-                    case m if m in (options := {
-                        'playerTriedNorth': None,
-                        'playerTriedSouth': None,
-                        'playerTriedEast': None,
-                        'playerTriedWest': None,
-                        'playerTriedNortheast': None,
-                        'playerTriedNorthwest': None,
-                        'playerTriedSoutheast': None,
-                        'playerTriedSouthwest': None,
-                    }).keys():
-                            return options[m] or 'You can\'t go that way.'
-
-                    
-                return {
-                    'onEnter': 'You reached the northwest coast. ' if roomObj.flags.playerHasVisited else 'You reached the northwest coast of the island. ',
-                    'onLook': 'To the southwest, you can barely make out a dark shape sticking out of the sand, and the beach stretches northeast. ',
-                    'onStay': 'You are on the northwest coast. '
-                }[message]
-
-        # ------- SHIPWRECK ------- #
-        
-            case 'Shipwreck':
-
-                match message:
-                    
-                    case m if m in (options := {
-                        'playerWentNorth': None,
-                        'playerWentSouth': None,
-                        'playerWentEast': None,
-                        'playerWentWest': None,
-                        'playerWentNortheast': None,
-                        'playerWentNorthwest': None,
-                        'playerWentSoutheast': None,
-                        'playerWentSouthwest': None,
-                    }).keys():
-                        return options[m] or f'You went {m.replace("playerWent", "").lower()}.'
-                
-                    case m if m in (options := {
-                        'playerTriedNorth': None,
-                        'playerTriedSouth': None,
-                        'playerTriedEast': None,
-                        'playerTriedWest': None,
-                        'playerTriedNortheast': None,
-                        'playerTriedNorthwest': None,
-                        'playerTriedSoutheast': None,
-                        'playerTriedSouthwest': None,
-                    }).keys():
-                            return options[m] or 'You can\'t go that way.'
-
-                # TODO
-                # - make sandbar text tide-dependent ("underwater")
-                # - review boat name
-                # - supply crate is open/closed
-                return {
-                    'onEnter': 'You reached the shipwreck. ' if roomObj.flags.playerHasVisited else 'Ahead of you, half-buried in the sand, lies a broken fiberglass boat. ',
-                    'onLook': 'You are at the shipwreck on the western side of the island. The boat is still in fair condition, aside from the fact that it\'s been cracked open like an egg. ' +
-                                'Walking around to the back, you notice a faded inscription: "King of the Blue Tides". A small supply crate lies next to the wreck. ' +
-                                'An underwater sandbar extends to the west, ' +
-                                'the beach extends far to the northeast and southeast, and there is an open field to the east. ',
-                    'onStay': 'You are on the northwest coast. '
-                }[message]
-
-        # ------- W COAST ------- #
-        
-            case 'Western Coast':
-
-                match message:
-                    
-                    case m if m in (options := {
-                        'playerWentNorth': None,
-                        'playerWentSouth': None,
-                        'playerWentEast': None,
-                        'playerWentWest': None,
-                        'playerWentNortheast': None,
-                        'playerWentNorthwest': None,
-                        'playerWentSoutheast': None,
-                        'playerWentSouthwest': None,
-                    }).keys():
-                        return options[m] or f'You went {m.replace("playerWent", "").lower()}.'
-                
-                    case m if m in (options := {
-                        'playerTriedNorth': None,
-                        'playerTriedSouth': None,
-                        'playerTriedEast': None,
-                        'playerTriedWest': None,
-                        'playerTriedNortheast': None,
-                        'playerTriedNorthwest': None,
-                        'playerTriedSoutheast': None,
-                        'playerTriedSouthwest': None,
-                    }).keys():
-                            return options[m] or 'You can\'t go that way.'
-
-                # TODO
-                # lights at night coming from the west
-                # underwater sandbar conditional
-                return {
-                    'onEnter': 'You reached the western coast. ' if roomObj.flags.playerHasVisited else 'You reached the western coast of the island. ',
-                    'onLook': 'There is an underwater sandbar to the east, and nothing but the ocean to the west. ',
-                    'onStay': 'You are on the western coast. '
-                }[message]
-        
-        # ------- SW COAST ------- #
-        
-            case 'Southwest Coast':
-
-                match message:
-                    
-                    case m if m in (options := {
-                        'playerWentNorth': None,
-                        'playerWentSouth': None,
-                        'playerWentEast': None,
-                        'playerWentWest': None,
-                        'playerWentNortheast': None,
-                        'playerWentNorthwest': None,
-                        'playerWentSoutheast': None,
-                        'playerWentSouthwest': None,
-                    }).keys():
-                        return options[m] or f'You went {m.replace("playerWent", "").lower()}.'
-                
-                    case m if m in (options := {
-                        'playerTriedNorth': None,
-                        'playerTriedSouth': None,
-                        'playerTriedEast': None,
-                        'playerTriedWest': None,
-                        'playerTriedNortheast': None,
-                        'playerTriedNorthwest': None,
-                        'playerTriedSoutheast': None,
-                        'playerTriedSouthwest': None,
-                    }).keys():
-                            return options[m] or 'You can\'t go that way.'
-
-                # TODO
-                # lights at night coming from the west
-                # underwater sandbar conditional
-                return {
-                    'onEnter': 'You reached the southwest coast. ' if roomObj.flags.playerHasVisited else 'You reached the southwestern coast of the island. ',
-                    'onLook': 'You are on the southwest coast. There is an underwater sandbar to the east. ',
-                    'onStay': 'You are on the southwest coast. '
-                }[message]
-
-        return s
+        if self.output.discards:
+            return ''
+        return self.world.roomMessages.get(self, roomName, message)
     
     def getItemMessage(self, itemName: ItemName, message: str) -> str:
         
         """
         message should be one of the following: onTake, onDrop, onInspect, onUse, invalidUse
+
+        The messages themselves are passed into each Item, see messages.ItemMessages.
         """
 
+        if self.output.discards:
+            return ''
+        return self.itemMessages.get(itemName, message)
+
+    # ------- SNAPSHOTS ------- #
+
+    # everything this game changed on top of the World, as plain data (dicts, lists, tuples, strings, ints, bools, None)
+    # so it can be pickled and picked back up by restore() in another process
+    # take it between turns, the output buffer isn't part of it
+    def snapshot(self) -> Dict[str, Any]:
+        worldDirs = self.world.routes.dirs
         return {
-            'Dull Rock': {
-                'onTake': 'You picked up the dull rock.',
-                'onDrop': 'You dropped the dull rock.',
-                'onInspect': 'This rock is very dull and has some grains of sand stuck to it.',
-                'onUse': 'You used the dull rock.',
-                'invalidUse': 'You can\'t use the dull rock that way.'
+            'turn': self.clock.turn,
+            'room': self.currentRoom.name,
+            'mode': self.mode.name,
+            'modeStack': [m.name for m in self.modeStack],
+            'talkingTo': self.talkingTo.character.name if self.talkingTo else None,
+            'flags': dict(self.flags.items()),
+            # in order, it's the order they're listed in
+            'inventory': list(self.inventory),
+            'itemLocations': {i: None if l is Overlay.REMOVED else tuple(l) for i, l in self.itemLocations.changes.items()},
+            'roomItems': {r: list(items) for r, items in self.roomItems.changes.items()},
+            'roomFlags': {r: dict(f.items()) for r, f in self.roomFlags.changes.items()},
+            'npcs': {
+                name: {'attrs': dict(npc.attrs.items()), 'options': list(npc.currentOptions), 'itemsForSale': dict(npc.itemsForSale)}
+                for name, npc in self.npcs.items()
             },
-            'Shiny Rock': {
-                'onTake': 'You picked up the shiny rock.',
-                'onDrop': 'You dropped the shiny rock.',
-                'onInspect': 'This rock is very shiny. You bought it from the old man.',
-                'onUse': 'You used the shiny rock.',
-                'invalidUse': 'You can\'t use the shiny rock that way.'
-            }
-        }[itemName][message]
+            # only the rooms whose exits were opened or closed
+            'dirs': {
+                r: [(p.room.name if p.room else None, p.accessMask) for p in d]
+                for r, d in self.routes.dirs.items() if d != worldDirs[r]
+            } if self.routes is not self.world.routes else {}
+        }
+
+    # a Game in the state snapshot() was taken in, in the same World (or one built from the same level)
+    @classmethod
+    def restore(cls, state: Dict[str, Any], output: Output = None, world: World = None) -> 'Game':
+        g = cls(start=False, output=output, world=world)
+        g.clock.turn = state['turn']
+        g.currentRoom = g.rooms[state['room']]
+        g.mode = Mode[state['mode']]
+        g.modeStack = [Mode[m] for m in state['modeStack']]
+        for k, v in state['flags'].items():
+            setattr(g.flags, k, v)
+        for i, l in state['itemLocations'].items():
+            g.itemLocations.changes[i] = Location(*l) if l else Overlay.REMOVED
+        for r, names in state['roomItems'].items():
+            g.roomItems[r] = {i: g.items[i] for i in names}
+        g.inventory = {i: g.items[i] for i in state['inventory']}
+        for r, flags in state['roomFlags'].items():
+            f = g.roomFlagsOf(r, write=True)
+            for k, v in flags.items():
+                setattr(f, k, v)
+        for name, s in state['npcs'].items():
+            npc = g.npcState(name)
+            for k, v in s['attrs'].items():
+                setattr(npc.attrs, k, v)
+            npc.currentOptions = s['options']
+            npc.itemsForSale = dict(s['itemsForSale'])
+        if state['talkingTo']:
+            g.talkingTo = g.npcState(state['talkingTo'])
+        if state['dirs']:
+            g._ownRoutes()
+            for r, d in state['dirs'].items():
+                g.routes.dirs[r][:] = [Path(g.rooms[n], mask) if n else Room.NO_EXIT for n, mask in d]
+                g.routes.roomChanged(r)
+        g.exits = g.routes.snapshots[g.time.ordinal]
+        g.commandsChanged()
+        return g
+
+    # writes snapshot() to a save file, see savefile.py
+    def save(self, path: str) -> None:
+        savefile.write(path, self.snapshot())
+
+    @classmethod
+    def load(cls, path: str, output: Output = None, world: World = None) -> 'Game':
+        return cls.restore(savefile.read(path), output, world)
+
+    # picks a game back up from its journal: the last snapshot in it, then every input played after that (see journal.py)
+    @classmethod
+    def recover(cls, path: str, output: Output = None, world: World = None) -> 'Game':
+        state, inputs = journal.read(path)
+        g = cls.restore(state, output, world)
+        g.replay(inputs)
+        return g
 
     # ------- GAME SEQUENCE METHODS ------- #
 
+    # starts the game from the beginning of the world
     def setup(self) -> None:
+        self.currentRoom = self.rooms[self.world.startRoom]
+        self.exits = self.routes.snapshots[self.time.ordinal]
+        self.commandsChanged()
 
-        # methods used to connect rooms and items together
-        def linkRooms(room1Name: RoomName, dir: globals.Direction, room2Name: RoomName, bothways=True, accessTimes: List[globals.TimeState] = None) -> None:
-            _accessTimes = accessTimes if accessTimes else globals.TIME.All
-            room_a, room_b = self.rooms[room1Name], self.rooms[room2Name]
-            room_a.dirs.update({dir: Path(room_b, _accessTimes)})
-            if bothways:
-                room_b.dirs.update({dir.reverse: Path(room_a, _accessTimes)})
-
-        def addItemToRoom(itemName: ItemName, roomName: RoomName) -> None:
-            if DEBUGGING:
-                print(f'{self.items[itemName].name} => {self.rooms[roomName]}')
-            self.rooms[roomName].items.append(self.items[itemName])
-
-        def addCharacterToRoom(charName: CharName, roomName: RoomName) -> None:
-            if DEBUGGING:
-                print(f'{self.characters[charName].name} => {self.rooms[roomName]}')
-            self.rooms[roomName].characters.append(self.characters[charName])
-
-        # constructing room, item, and character dictionaries 
-        self.rooms.update({
-            r.name: r for r in [
-                Room('Northeast Coast'), # where the player starts
-                Room('Cliff Top'),
-                Room('Cliff Coast'),
-                Room('Saltwater Pond'),
-                Room('Southeast Coast'),
-                Room('Southeast Island'),
-                Room('Cove'),
-                Room('Hermit Cave'),
-                Room('Southern Coast'),
-                Room('Southwest Coast'),
-                Room('Abandoned Dock'),
-                Room('Field'),
-                Room('Shipwreck'),
-                Room('Western Coast'),
-                Room('Northwest Coast'),
-                Room('North Coast'),
-                Room('Woods 1'),
-                Room('Woods 2'),
-                Room('Clearing'),
-                Room('Mountain South'),
-                Room('Mountain East'),
-                Room('Mountain Trail'),
-                Room('Mountain Summit')
-            ]
-        })
-
-        # linking rooms together
-
-        [
-            linkRooms(*a) for a in [
-                # remember bothways=True
-                ('Northeast Coast', globals.DIRS.SOUTHEAST, 'Cliff Coast'),
-                ('Northeast Coast', globals.DIRS.SOUTH, 'Cliff Top'),
-                ('Northeast Coast', globals.DIRS.NORTHWEST, 'North Coast'),
-                ('Cliff Coast', globals.DIRS.SOUTHWEST, 'Saltwater Pond'),
-                ('Cliff Top', globals.DIRS.EAST, 'Mountain East'),
-                ('Cliff Top', globals.DIRS.SOUTH, 'Saltwater Pond'),
-                ('North Coast', globals.DIRS.SOUTHWEST, 'Northwest Coast'),
-                ('Saltwater Pond', globals.DIRS.NORTHWEST, 'Mountain East'),
-                ('Saltwater Pond', globals.DIRS.SOUTHEAST, 'Southeast Coast'),
-                ('Mountain East', globals.DIRS.NORTHWEST, 'Mountain Trail'),
-                ('Northwest Coast', globals.DIRS.SOUTHWEST, 'Shipwreck'),
-                ('Northwest Coast', globals.DIRS.SOUTHEAST, 'Woods 2'),
-                ('Southeast Coast', globals.DIRS.SOUTHEAST, 'Southeast Island', globals.TIME.LowTide),    # low tide
-                ('Southeast Coast', globals.DIRS.WEST, 'Cove'),
-                ('Mountain Trail', globals.DIRS.NORTH, 'Mountain Summit'),
-                ('Mountain Trail', globals.DIRS.SOUTH, 'Mountain South'),
-                ('Shipwreck', globals.DIRS.WEST, 'Western Coast', globals.TIME.LowTide),                  # low tide
-                ('Shipwreck', globals.DIRS.EAST, 'Field'),
-                ('Shipwreck', globals.DIRS.SOUTHEAST, 'Southwest Coast'),
-                ('Woods 2', globals.DIRS.NORTHEAST, 'Mountain South'),
-                ('Woods 2', globals.DIRS.SOUTHWEST, 'Woods 1'),
-                ('Woods 2', globals.DIRS.SOUTHEAST, 'Clearing'),
-                ('Cove', globals.DIRS.NORTH, 'Hermit Cave', globals.TIME.LowTide),                        # low tide
-                ('Cove', globals.DIRS.SOUTH, 'Southern Coast'),
-                ('Field', globals.DIRS.SOUTHEAST, 'Woods 1'),
-                ('Woods 1', globals.DIRS.EAST, 'Clearing'),
-                ('Woods 1', globals.DIRS.SOUTH, 'Southwest Coast'),
-                ('Southwest Coast', globals.DIRS.SOUTHEAST, 'Southern Coast'),
-                ('Southwest Coast', globals.DIRS.SOUTHWEST, 'Abandoned Dock', globals.TIME.HighTide),     # high tide
-            ]
-        ]
-
-        self.items.update({
-            i.name: i for i in [
-
-                # targets = ['Name|Alias1|Alias2...', 'Name', 'Name|Alias'...]
-                # inspect is now implicitly added to onCalls - just prints out messages.onInspect or onInspectVerbose
-
-                # NOTE if an item is not carryable, the onCalls should contain 
-                # {
-                #   'take': lambda: self.writeline(self.errors.CANNOT_CARRY_ITEM),
-                #   'drop': lambda: self.writeline(self.errors.ITEM_NOT_IN_INV)                 
-                # }
-                
-                Item('Dull Rock', aliases=r'dull rock', repr='a dull rock',
-                    attrs = globals.Collection(
-                        canCarry = True,
-                        canUse = False,
-                        alwaysUsable = False # if false, must be picked up before using
-                    ), messages = globals.Collection(), onCalls = {
-                        'use': lambda: self.writeline('You can\'t use that'),
-                        'take': lambda: self.takeItem('Dull Rock'),
-                        'drop': lambda: self.dropItem('Dull Rock'),
-                        'inspect': lambda: self.writeline(self.getItemMessage('Dull Rock', 'onInspect')),
-                        'invalid': lambda: self.writeline(self.getItemMessage('Dull Rock', 'invalidUse')),
-                    }
-                ),
-                Item('Shiny Rock', aliases=r'shiny rock', repr='a shiny rock',
-                    attrs = globals.Collection(
-                        canCarry = True,
-                        canUse = False,
-                        alwaysUsable = False # if false, must be picked up before using
-                    ), messages = globals.Collection(), onCalls = {
-                        'use': lambda: self.writeline('You can\'t use that'),
-                        'take': lambda: self.takeItem('Shiny Rock'),
-                        'drop': lambda: self.dropItem('Shiny Rock'),
-                        'inspect': lambda: self.writeline(self.getItemMessage('Shiny Rock', 'onInspect')),
-                        'invalid': lambda: self.writeline(self.getItemMessage('Shiny Rock', 'invalidUse')),
-                    }
-                ),
-
-            ]
-        })
-
-        
-
-        # adding items to rooms
-
-        [
-            addItemToRoom(*a) for a in [
-                ('Dull Rock', 'Northeast Coast')
-            ]
-        ]
-
-        self.characters.update({
-            c.name: c for c in [
-                Character('Old Man', messages = globals.Collection(
-                    onFirstTalk = 'Hello, I am Sadim. How are you doing my friend?',
-                    onTalk = 'Hello again habibi, how you doing today?',
-                    displayShopItems = 'Here is what is for sale today my friend:',
-                    onFailedSale = 'My brother are you bull shitting?? You don\'t have that one habibi so nothing for you.',
-                    unknownItem = 'You so crazy you not making sense habibi. Don\'t know what that one is.',
-                    outOfStock = 'No longer for sale my brother.',
-                    onLeave = 'My brother have a good day!'
-                ), attrs = globals.Collection(
-                    talkedTo = False
-                ), options = [
-                    
-                    DialogOption('Greeting',
-                        repr='How are you doing?',
-                        pattern=r'(how are you doing)(\?)?',
-                        response='I am good.',
-                        newOptions=['Greeting', 'Location', 'Shop', 'Goodbye', 'Dull Rock -> Shiny Rock']),
-                    DialogOption('Location',
-                        repr='Where am I?',
-                        pattern=r'(where (am i)|(are we))(\?)?',
-                        response='We are on the beach my friend.',
-                        newOptions=['Greeting', 'Location', 'Beach Location', 'Shop', 'Goodbye', 'Dull Rock -> Shiny Rock']),
-                    DialogOption('Beach Location',
-                        repr='Where is the beach?',
-                        pattern=r'where is the beach',
-                        response='Beach is on the island.',
-                        newOptions=['Greeting', 'Location', 'Shop', 'Goodbye', 'Dull Rock -> Shiny Rock']),
-                    DialogOption('Shop',
-                        repr='What\'s for sale?',
-                        pattern=r"(what's for sale)(\?)?",
-                        response=None,
-                        newOptions=['Greeting', 'Location', 'Shop', 'Goodbye', 'Dull Rock -> Shiny Rock'],
-                        onCall=lambda: self.writeline(
-                                f'Here is what I have today my friend:\n {self.characters["Old Man"].listWares()}'
-                            if self.characters['Old Man'].itemsForSale else
-                                f'Nothing for sale today habibi :(')),
-                    DialogOption('Goodbye',
-                        repr='Goodbye.',
-                        pattern=r'(good)?bye',
-                        response='See you later my friend!',
-                        newOptions=['Greeting', 'Location', 'Shop', 'Goodbye', 'Dull Rock -> Shiny Rock'],
-                        onCall=lambda: Character.sayGoodbye()),
-
-                    # shop cmds
-
-                    DialogOption('Dull Rock -> Shiny Rock',
-                        hidden=True,
-                        repr='Buy Shiny Rock',
-                        pattern=globals.collect(
-                            fr'{globals.KEYWORDS.SellItem} (dull )?rock( to old man)?',
-                            fr'{globals.KEYWORDS.BuyItem} shiny rock( from old man)?'
-                        ),
-                        response=None,
-                        newOptions=['Greeting', 'Location', 'Shop', 'Goodbye', 'Dull Rock -> Shiny Rock'],
-                        onCall=lambda: self._giveItemToCharacter('Dull Rock', 'Old Man')),
-
-                    # FAILSAFES COME LAST ALWAYS :)
-
-                ], failsafes=[
-                    DialogOption('Buy/Sell Unknown Item',
-                        hidden=True,
-                        repr='Buy Shiny Rock',
-                        pattern=globals.collect(
-                            fr'{globals.KEYWORDS.SellItem}.*( to old man)?',
-                            fr'{globals.KEYWORDS.BuyItem}.*( from old man)?'
-                        ),
-                        response='Not for sale habibi.',
-                        newOptions=['Greeting', 'Location', 'Shop', 'Goodbye', 'Dull Rock -> Shiny Rock']),
-                    DialogOption('Unknown',
-                        repr='you should not be seeing this',
-                        pattern=DialogOption.MATCH_ALL,
-                        response = 'You not making sense.',
-                        newOptions=['Greeting', 'Location', 'Shop', 'Goodbye', 'Dull Rock -> Shiny Rock']),
-                ], 
-                startingOptions=[
-                    'Greeting',
-                    'Location',
-                    'Shop',
-                    'Goodbye',
-                    'Dull Rock -> Shiny Rock'
-                ], commands=[
-                    Command('Talk to Old Man', pattern=fr'{globals.KEYWORDS.TalkTo} old man', onCall=lambda: self.talkToCharacter('Old Man')),
-                    Command('Sell Dull Rock to Old Man', pattern=globals.collect(
-                        fr'{globals.KEYWORDS.SellItem} (dull )?rock( to old man)?',
-                        fr'{globals.KEYWORDS.BuyItem} shiny rock( from old man)?'
-                    ), onCall=lambda: self._giveItemToCharacter('Dull Rock', 'Old Man')),
-                    Command('Sell Unknown Item to Old Man', pattern=globals.collect(
-                        fr'{globals.KEYWORDS.SellItem}.*( to old man)?',
-                        fr'{globals.KEYWORDS.BuyItem}.*( from old man)?'
-                    ), onCall=lambda: self.writeline('Not for sale habibi.'))
-                ], itemsForSale={
-                    'Dull Rock': 'Shiny Rock'
-                })
-            ]
-        })
-
-        # adding characters to rooms
-        [
-            addCharacterToRoom(*a) for a in [
-                ('Old Man', 'Northeast Coast')
-            ]
-        ]
+    # shows the title screen, every input after this goes to _titleStep until the player starts the game
+    def title(self) -> None:
+        self.output.write(f'{self.titleText}\n')
+        self._showTitleOptions()
+        self.mode = Mode.TITLE
 
-        self.currentRoom = self.rooms['Northeast Coast']
-        self.currentRoom.flags.playerHasVisited = True
+    def _showTitleOptions(self) -> None:
+        self.writeline('Type "start", "exit", or "settings".')
 
-        self.clearTerminal()
-        
-        # END OF GAME SETUP
-
-    def title(self) -> None:
-        print(self.titleText)
-        while True:
-            self.writeline('Type "start", "exit", or "settings".')
-            i = self.input().lower()
-            if i == 'start':
-                return
-            elif i == 'exit':
-                self.exit(auto=True)
-            elif i == 'settings':
-                self.settings()
+    def _titleStep(self, text: str) -> None:
+        i = text.lower()
+        if i == 'start':
+            self.mode = Mode.PLAY
+            self.intro()
+            return
+        elif i == 'exit':
+            self.exit(auto=True)
+            return
+        elif i == 'settings':
+            self.settings()
+            return
+        self._showTitleOptions()
 
     # displays the intro text
     def intro(self) -> None:
         self.writeline()
         self.writeline(self.INTRO_TEXT)
 
-    def run(self) -> None:
-
-        while True:
+    # the current prompt, what's shown before waiting for the next input
+    def prompt(self) -> str:
+        if self.mode is Mode.PLAY and self.flags.showMsgonStay:
+            return f'\n  {self.getRoomMessage(self.currentRoom.name, "onStay")}\n\n> '
+        if self.mode in (Mode.TITLE, Mode.TALK):
+            return '\n  \n\n> '
+        return '\n> '
+
+    # runs one input through whatever mode the game is in and returns the text it wrote (see Output.take)
+    def step(self, text: str) -> str:
+        Game._MODE_STEPS[self.mode](self, text)
+        self.output.flush()
+        return self.output.take()
+
+    # steps through inputs without rendering or keeping any of the text they write, ex. to catch a game up from its journal
+    # the same input in the same situation (see commandSignature) is only parsed and matched once, the way stepMany does it
+    def replay(self, inputs: Iterable[str]) -> None:
+        output, self.output = self.output, NullOutput()
+        matched: Dict[Tuple, Command] = dict()
+        try:
+            for text in inputs:
+                if self.mode is not Mode.PLAY:
+                    Game._MODE_STEPS[self.mode](self, text)
+                    continue
+                if (c := matched.get(key := (text, self.commandSignature()), self)) is self:
+                    c = matched[key] = self.matchCommand(globals.parse(text.strip()))
+                self.flags.reset()
+                if c:
+                    self.runCommand(c)
+        finally:
+            self.output = output
+
+    # the terminal client - reads inputs and steps the game until it's over
+    # every input goes to the journal if there is one, which is written out every FSYNC_EVERY seconds or so
+    def run(self, journal: Journal = None) -> None:
+        written = time.monotonic()
+        while self.mode is not Mode.ENDED:
             try:
-                if DEBUGGING:
+                if DEBUGGING and self.mode is Mode.PLAY:
                     self._printAllInfo()
-                if self.flags.showMsgonStay:
-                    message = self.getRoomMessage(self.currentRoom.name, 'onStay')
-                    self.checkInput(self.input(message))
-                else:
-                    self.checkInput(input('\n> '))
+                text = self.readline(self.prompt())
+                self.step(text)
+                if journal:
+                    journal.record(self, text)
             except KeyboardInterrupt:
                 self.exit()
+                if journal:
+                    # exit() isn't an input, so there's nothing to replay - start over from where it left the game instead
+                    journal.start(self)
+            if journal and time.monotonic() - written >= FSYNC_EVERY:
+                journal.flush()
+                written = time.monotonic()
+        self.output.flush()
+        if journal:
+            # it's over, there's nothing to pick back up
+            journal.close(remove=True)
+        sys.exit()
 
+    # asks if the player really wants to exit (the next input goes to _exitStep), or ends the game right away if auto is True
     def exit(self, auto=False) -> None:
-        if not auto:
-            self.flags.showMsgonStay = False
-            self.writeline('Are you sure you want to exit? y/n')
-            while True:
-                i = input('\n> ').lower()
-                if i in ('y', 'yes'):
-                    self.writeline('Thanks for playing!')
-                    break
-                elif i in ('n', 'no'):
-                    self.flags.showMsgonStay = True
-                    return
-                else:
-                    # TODO make this an error in self.errors? fine either way tbh
-                    self.writeline('Sorry, I don\'t understand.')
-        sys.exit()
-        
+        if auto:
+            self.mode = Mode.ENDED
+            return
+        self.flags.showMsgonStay = False
+        self.writeline('Are you sure you want to exit? y/n')
+        if self.mode is not Mode.EXIT:
+            self.modeStack.append(self.mode)
+            self.mode = Mode.EXIT
+
+    def _exitStep(self, text: str) -> None:
+        i = text.lower()
+        if i in ('y', 'yes'):
+            self.writeline('Thanks for playing!')
+            self.mode = Mode.ENDED
+        elif i in ('n', 'no'):
+            self.flags.showMsgonStay = True
+            self.mode = self.modeStack.pop()
+        else:
+            # TODO make this an error in self.errors? fine either way tbh
+            self.writeline('Sorry, I don\'t understand.')
+
+    # what step() runs for each Mode
+    _MODE_STEPS: Dict[Mode, Callable[['Game', str], None]] = {
+        Mode.TITLE: _titleStep,
+        Mode.PLAY: checkInput,
+        Mode.TALK: _talkStep,
+        Mode.SETTINGS: _settingsStep,
+        Mode.EXIT: _exitStep,
+        Mode.ENDED: lambda self, text: None
+    }
+
+# steps many games at once - gives the same outputs as [g.step(text) for g, text in inputs], but every input is only parsed and
+# matched once for all the games that would match it the same way (same normalized text, same Game.commandSignature())
+# a game can be in there more than once, its inputs are stepped in order
+# with returnExceptions=True an input that raises gets the exception as its output instead of stopping the rest (like asyncio.gather)
+def stepMany(inputs: List[Tuple[Game, str]], returnExceptions: bool = False) -> List[str]:
+    outputs: List[Any] = [None] * len(inputs)
+    pending = range(len(inputs))
+    while pending:
+        # one input per game at a time, the next one can depend on what this one did
+        wave, later, seen = [], [], set()
+        for n in pending:
+            g = inputs[n][0]
+            (later if id(g) in seen else wave).append(n)
+            seen.add(id(g))
+        pending = later
+        # match each group's input once, before anything runs (games don't change each other)
+        matched: Dict[Tuple, Command] = dict()
+        commands: Dict[int, Command] = dict()
+        for n in wave:
+            g, text = inputs[n]
+            if g.mode is not Mode.PLAY or DEBUGGING:
+                continue
+            stripped = text.strip()
+            # the patterns ignore case (lower() is only safe to group by for ascii, some other letters change length)
+            key = (stripped.lower() if stripped.isascii() else stripped, g.commandSignature())
+            try:
+                if key not in matched:
+                    matched[key] = g.matchCommand(globals.parse(stripped))
+            except Exception as e:
+                if not returnExceptions:
+                    raise
+                matched[key] = e
+            commands[n] = matched[key]
+        # then run them in the order they came in, same as stepping them one by one
+        for n in wave:
+            g, text = inputs[n]
+            try:
+                if n not in commands:
+                    outputs[n] = g.step(text)
+                    continue
+                if isinstance(c := commands[n], Exception):
+                    raise c
+                g.flags.reset()
+                if c:
+                    g.runCommand(c)
+                g.output.flush()
+                outputs[n] = g.output.take()
+            except Exception as e:
+                if not returnExceptions:
+                    raise
+                outputs[n] = e
+    return outputs
+
+# builds the world every Game is played in - see World
+# the commands are called with the Game they're run in (g), so the same ones work for every game
+# the level's World (see level.py) with the game's own commands added
+def buildWorld(levelPath: str = LEVEL_PATH) -> World:
+
+    world = level.load(levelPath)
+
+    world.setCommands(
+
+            # Game Commands
+            # NOTE none of these lambdas should have tuples in them, define a function if you're doing that
+        [   
+            Command('Help', pattern=r'help( me)?', onCall=lambda g: g.help(), passesTime=False),
+            Command('Look Around', pattern=fr'{globals.KEYWORDS.LookAround}', onCall=lambda g: g.lookAround(), keys=['LookAround'], passesTime=False),
+            Command('Do Nothing', pattern=fr'{globals.KEYWORDS.DoNothing}', onCall=lambda g: g.doNothing(), keys=['DoNothing']),
+            Command('Exit Game', pattern=fr'{globals.KEYWORDS.Exit}( (the )?game)?', onCall=lambda g: g.exit(), keys=['Exit'], passesTime=False),
+            Command('Check Inventory', pattern=r'(check (the)?)?(inventory|inv|bag|backpack)', onCall=lambda g: g.showInventory(), passesTime=False),
+            Command('Open Settings', pattern=r'(open (the)?)?(game )?settings', onCall=lambda g: g.settings(), passesTime=False),
+        ] + 
+            # Direction Commands
+        [
+            Command(f'Move {d.name}', pattern=d.pattern, onCall=lambda g, d=d: g.move(d), keys=[d.name]) for d in globals.DIRS.values() if d is not None
+        ] +
+            # Hints
+        [
+            Command(f'Way to {name}', pattern=fr'{globals.KEYWORDS.WayTo} (the )?{re.escape(name.lower())}', onCall=lambda g, name=name: g.showWay(name), keys=['WayTo'], passesTime=False)
+            for name in world.rooms
+        ] +
+            # Failsafes
+        [
+            Command('Unknown Direction', pattern=fr'{globals.KEYWORDS.Move}.*', onCall=lambda g: g.writeline(g.errors.UNKNOWN_DIR), keys=['Move'], passesTime=False),
+            Command('Unknown Item', pattern=globals.collect(
+                    globals.KEYWORDS.UseItem,
+                    globals.KEYWORDS.TakeItem,
+                    globals.KEYWORDS.DropItem
+                ) + r'.*', onCall=lambda g: g.writeline(g.errors.UNKNOWN_ITEM), keys=['UseItem', 'TakeItem', 'DropItem'], passesTime=False),
+            Command('Unknown Character', pattern=fr'{globals.KEYWORDS.TalkTo}.*', onCall=lambda g: g.writeline(g.errors.UNKNOWN_NPC), keys=['TalkTo'], passesTime=False),
+            Command('Unknown Place', pattern=fr'{globals.KEYWORDS.WayTo}.*', onCall=lambda g: g.writeline(g.errors.UNKNOWN_PLACE), keys=['WayTo'], passesTime=False),
+            Command('Unknown Command', pattern=Command.MATCH_ALL, onCall=lambda g: g.writeline(g.errors.UNKNOWN_CMD), passesTime=False)
+        ]
+    )
+
+    if os.path.exists(CATALOG_PATH) and not world.loadCatalog(CATALOG_PATH):
+        warnings.warn(f'{CATALOG_PATH} is out of date, run `python game.py --build-catalog` to rebuild it')
+
+    # END OF WORLD SETUP
+
+    return world
+
+_world: World = None
+
+# the World built the first time it's needed and then shared by every Game in the process
+def sharedWorld() -> World:
+    global _world
+    if _world is None:
+        _world = buildWorld()
+    return _world
+
 if __name__ == '__main__':
-    Game()
+    if '--build-catalog' in sys.argv[1:]:
+        sharedWorld().buildCatalog(CATALOG_PATH)
+        print(f'wrote {CATALOG_PATH}')
+    elif '--journal' in sys.argv[1:]:
+        # python game.py --journal PATH - picks the game in PATH back up if there is one
+        path = sys.argv[sys.argv.index('--journal') + 1]
+        if os.path.exists(path):
+            g = Game.recover(path, TerminalOutput())
+            g.clearTerminal()
+            g.writeline(f'Picked your game back up from {path}.')
+            j = Journal(path)
+            j.start(g)
+            g.run(j)
+        else:
+            Game(journal=Journal(path))
+    else:
+        Game()
@@ -14,5 +14,14 @@ RegexPattern = NewType('RegexPattern', re.Pattern)
 TideLevel = NewType('TideLevel', int)
 
 # room: Room
-# times: List[TimeState] | TIME.All
-Path = namedtuple('Path', ['room', 'accessTimes'], defaults=[None, []])
\ No newline at end of file
+# accessMask: the TimeStates the path is open at, as bits (see globals.timeMask) - 0 means never
+Path = namedtuple('Path', ['room', 'accessMask'], defaults=[None, 0])
+
+# where an item is right now
+# kind: 'room' | 'inventory' | 'character'
+# name: RoomName | CharName | None for the inventory
+Location = namedtuple('Location', ['kind', 'name'], defaults=[None])
+
+# the player's input, broken up by globals.parse
+# keys: names of every keyword/direction the text starts with (see Command.keys)
+Intent = namedtuple('Intent', ['text', 'keys'])
\ No newline at end of file
@@ -1,8 +1,14 @@
 # pyright: reportMissingImports=false
 from __future__ import annotations
 from pprint import pprint
-from typing import Any, Callable, Dict, Generator, Generic, ItemsView, Iterable, KeysView, List, Set, TypeVar, ValuesView, Iterator
+from typing import Any, BinaryIO, Callable, Dict, Generator, Generic, ItemsView, Iterable, KeysView, List, Set, Tuple, TypeVar, ValuesView, Iterator
+from collections import OrderedDict
+from contextlib import contextmanager
 from blessed import Terminal
+import os
+import re
+import sys
+import tempfile
 
 from gametypes import *
 
@@ -28,7 +34,7 @@ class Collection(Generic[T]):
         self.resetValue = resetValue
 
     def __getitem__(self, item: T) -> T:
-        return self.__dict__.__getitem(item)
+        return self.__dict__.__getitem__(item)
     
     def __setitem__(self, k: str, new: T) -> None:
         self.__dict__.__setitem__(k, new)
@@ -50,6 +56,99 @@ class Collection(Generic[T]):
     
     def reset(self) -> None:
         self.__dict__.update({k: self.resetValue for k in self.__dict__.keys()})
+
+class SchemaCollection(Generic[T]):
+
+    """
+    Base class for the Collections made by schema() - same API as a Collection, but the fields are fixed when the class is made.
+
+    Boolean fields are packed as bits into one int and everything else gets a slot, so instances are tiny and reset() is one
+    int assignment (plus one per non-boolean field). Setting a field that isn't in the schema raises AttributeError.
+    """
+
+    __slots__ = ('_bits',)
+
+    # these are filled in by schema()
+    resetValue: Any = None
+    _fields: Tuple[str, ...] = ()
+    _defaultBits: int = 0
+    _defaultOthers: Tuple[Tuple[str, Any], ...] = ()
+    _resetBits: int = 0
+    _resetOthers: Tuple[Tuple[str, Any], ...] = ()
+
+    def __init__(self, **attrs) -> None:
+        self._bits = self._defaultBits
+        for k, v in self._defaultOthers:
+            setattr(self, k, v)
+        for k, v in attrs.items():
+            setattr(self, k, v)
+
+    def __getitem__(self, item: str) -> T:
+        if item not in self._fields:
+            raise KeyError(item)
+        return getattr(self, item)
+
+    def __setitem__(self, k: str, new: T) -> None:
+        if k not in self._fields:
+            raise KeyError(k)
+        setattr(self, k, new)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._fields)
+
+    def keys(self) -> Tuple[str, ...]:
+        return self._fields
+
+    def values(self) -> List[T]:
+        return [getattr(self, k) for k in self._fields]
+
+    def items(self) -> List[Tuple[str, T]]:
+        return [(k, getattr(self, k)) for k in self._fields]
+
+    def reset(self) -> None:
+        self._bits = self._resetBits
+        for k, v in self._resetOthers:
+            setattr(self, k, v)
+
+    __str__ = __repr__ = lambda s: f'{type(s).__name__}(' + ', '.join(f'{k}={v!r}' for k, v in s.items()) + ')'
+
+def _bitField(bit: int) -> property:
+    mask = 1 << bit
+    def get(self: SchemaCollection) -> bool:
+        return bool(self._bits & mask)
+    def set(self: SchemaCollection, new: bool) -> None:
+        self._bits = self._bits | mask if new else self._bits & ~mask
+    return property(get, set)
+
+def schema(typeName: str, *, resetValue: Any = None, **defaults: Any) -> type:
+
+    """
+    Makes a SchemaCollection class with the given fields and default values, for small Collections that every room/item/etc. has.
+
+    ex. ItemAttrs = schema('ItemAttrs', canCarry=True, canUse=True) -> ItemAttrs(canUse=False).canCarry == True
+
+    reset() puts every field back to its default, or to resetValue if one is given (like Collection.reset).
+
+    Fields with bool defaults can only hold True/False.
+    """
+
+    bools = [k for k, v in defaults.items() if isinstance(v, bool)]
+    others = [k for k in defaults if k not in bools]
+    bitsFor = lambda values: sum(1 << n for n, k in enumerate(bools) if values[k])
+    resets = defaults if resetValue is None else dict.fromkeys(defaults, resetValue)
+    namespace = {
+        '__slots__': tuple(others),
+        # lets pickle find the class, same as namedtuple does
+        '__module__': sys._getframe(1).f_globals.get('__name__', '__main__'),
+        'resetValue': resetValue,
+        '_fields': tuple(defaults),
+        '_defaultBits': bitsFor(defaults),
+        '_defaultOthers': tuple((k, defaults[k]) for k in others),
+        '_resetBits': bitsFor(resets),
+        '_resetOthers': tuple((k, resets[k]) for k in others),
+    }
+    namespace.update({k: _bitField(n) for n, k in enumerate(bools)})
+    return type(typeName, (SchemaCollection,), namespace)
  
 class CycleGen(Generic[T]):
 
@@ -83,32 +182,50 @@ class Direction:
     Represents a direction the player can move in, and the options are defined in globals.Collection (sort of like an enum)
     """
 
-    def __init__(self, name, *, pattern: str, reverse: Direction = None):
+    __slots__ = ('name', 'aliases', 'pattern', 'reverse', 'ordinal')
+
+    def __init__(self, name, *, aliases: Tuple[str, ...], pattern: str = None, reverse: Direction = None):
         self.name = name
-        self.pattern = pattern
+        # the words that mean this direction, ex. ('n', 'north')
+        self.aliases = aliases
+        self.pattern = pattern or fr'(go )?({"|".join(aliases)})'
         self.reverse = reverse
+        # index in DIR_LIST and Room.dirs, set below
+        self.ordinal: int = None
     
     __str__ = __repr__ = lambda s, f='short': f'Dir({s.name})'
     
     def __hash__(self) -> int:
         return self.name.__hash__()
 
+    # there's only ever one of each direction, pickling one just refers to it
+    def __reduce__(self):
+        return (direction, (self.ordinal,))
+
     def __eq__(self, o: object) -> bool:
         return self.name == o.name if isinstance(o, Direction) else NotImplemented
 
 # the patterns will be compiled through the command constructor in the actual game
 # for now they are just strings
 DIRS: Collection[Direction] = Collection(
-    NORTH = Direction('North', pattern=r'(go )?(n|north)'),
-    SOUTH = Direction('South', pattern=r'(go )?(s|south)'),
-    EAST = Direction('East', pattern=r'(go )?(e|east)'),
-    WEST = Direction('West', pattern=r'(go )?(w|west)'),
-    NORTHEAST = Direction('Northeast', pattern=r'(go )?(ne|northeast)'),
-    NORTHWEST = Direction('Northwest', pattern=r'(go )?(nw|northwest)'),
-    SOUTHEAST = Direction('Southeast', pattern=r'(go )?(se|southeast)'),
-    SOUTHWEST = Direction('Southwest', pattern=r'(go )?(sw|southwest)'),
+    NORTH = Direction('North', aliases=('n', 'north')),
+    SOUTH = Direction('South', aliases=('s', 'south')),
+    EAST = Direction('East', aliases=('e', 'east')),
+    WEST = Direction('West', aliases=('w', 'west')),
+    NORTHEAST = Direction('Northeast', aliases=('ne', 'northeast')),
+    NORTHWEST = Direction('Northwest', aliases=('nw', 'northwest')),
+    SOUTHEAST = Direction('Southeast', aliases=('se', 'southeast')),
+    SOUTHWEST = Direction('Southwest', aliases=('sw', 'southwest')),
 )
 
+# the directions in a fixed order - Direction.ordinal is the index in here, and in every Room.dirs
+DIR_LIST: List[Direction] = [d for d in DIRS.values() if d is not None]
+for _n, _dir in enumerate(DIR_LIST):
+    _dir.ordinal = _n
+
+def direction(ordinal: int) -> Direction:
+    return DIR_LIST[ordinal]
+
 # potential source of bugs later on
 def _dirs_iter(self) -> Direction:
     yield from [
@@ -191,6 +308,12 @@ STR_KEYWORDS: Collection[Set[str]] = Collection(
         'quit',
         'exit',
         'leave'
+    },
+    WayTo = {
+        'way to',
+        'way back to',
+        'how do i get to',
+        'how do i get back to'
     }
 )
 
@@ -203,6 +326,9 @@ class TimeState:
         self.name = name
         self.repr = repr
         self.tideLevel = tideLevel
+        # index in TIME.All, and the bit for this time in a time mask (1 << ordinal) - set below
+        self.ordinal: int = None
+        self.bit: int = None
     
     __str__ = __repr__ = lambda s, _='': f'{s.name} time ({s.repr})'
 
@@ -228,12 +354,96 @@ TIME.All = [
     TIME.Noon
 ]
 
-TIME.advance = CycleGen(TIME.All)
-
 # more constants
 TIME.START = TIME.Afternoon
 TIME.LowTide = [TIME.Evening]
 TIME.HighTide = [TIME.Sunrise]
+# how many turns each time of day lasts (see TideClock)
+TURNS_PER_TIME = 10
+
+for _n, _time in enumerate(TIME.All):
+    _time.ordinal = _n
+    _time.bit = 1 << _n
+
+def timeMask(times: Iterable[TimeState]) -> int:
+
+    """
+    Packs a list of TimeStates into an int with one bit per time, used for Path.accessMask.
+
+    ex. timeMask(TIME.LowTide) == TIME.Evening.bit, timeMask(TIME.All) == 0b11111111
+    """
+
+    mask = 0
+    for t in times:
+        mask |= t.bit
+    return mask
+
+class TideClock:
+
+    """
+    Keeps the time for one game by counting turns - every turnsPerTime turns the time moves on to the next TimeState in TIME.All,
+    wrapping back around after the last one. Everything is worked out from the turn number, so nothing has to be stepped through.
+
+    time, tideLevel - the current TimeState and its tide level
+    phase - how far into the day it is, in turns from the start of the first TimeState in TIME.All
+    at(turn) - the TimeState at any turn
+    advance(k) - moves k turns ahead
+    turnsUntil(times) - how many turns until it's one of the given times (ex. TIME.LowTide), 0 if it already is
+    waitUntil(times) - moves ahead to the next turn that's one of the given times
+    """
+
+    __slots__ = ('turn', 'startIndex', 'turnsPerTime')
+
+    # time mask => for each TimeState index, how many TimeStates until the next one in the mask
+    _distances: Dict[int, List[int]] = dict()
+
+    def __init__(self, start: TimeState = TIME.START, turnsPerTime: int = 1, turn: int = 0) -> None:
+        self.turn: int = turn
+        self.startIndex: int = start.ordinal
+        self.turnsPerTime: int = turnsPerTime
+
+    def _index(self, turn: int) -> int:
+        return (self.startIndex + turn // self.turnsPerTime) % len(TIME.All)
+
+    def at(self, turn: int) -> TimeState:
+        return TIME.All[self._index(turn)]
+
+    @property
+    def time(self) -> TimeState:
+        return TIME.All[self._index(self.turn)]
+
+    @property
+    def phase(self) -> int:
+        return (self.startIndex * self.turnsPerTime + self.turn) % (len(TIME.All) * self.turnsPerTime)
+
+    @property
+    def tideLevel(self) -> TideLevel:
+        return self.time.tideLevel
+
+    def advance(self, k: int = 1) -> TimeState:
+        self.turn += k
+        return self.time
+
+    def turnsUntil(self, times: Iterable[TimeState]) -> int:
+        mask = timeMask(times)
+        if (distances := TideClock._distances.get(mask)) is None:
+            size = len(TIME.All)
+            distances = TideClock._distances[mask] = [
+                next((k for k in range(size) if TIME.All[(n + k) % size].bit & mask), None) for n in range(size)
+            ]
+        if (k := distances[self._index(self.turn)]) is None:
+            return None
+        if k == 0:
+            return 0
+        # the start of the TimeState k states from now
+        return (self.turn // self.turnsPerTime + k) * self.turnsPerTime - self.turn
+
+    def waitUntil(self, times: Iterable[TimeState]) -> TimeState:
+        if (k := self.turnsUntil(times)) is not None:
+            self.turn += k
+        return self.time
+
+    __str__ = __repr__ = lambda s: f'TideClock(turn {s.turn}, {s.time})'
 
                                                             ### ------- MISC ------- ###
 
@@ -244,6 +454,35 @@ FORMATTING: Collection[str] = Collection(
     bold = _term.bold
 )
 
+# the value at the given quantile (0-1) of a sorted list, ex. quantile(latencies, 0.99) for the p99
+def quantile(ordered: List[float], q: float) -> float:
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+# the process' umask, so files written through replacing() get the permissions open() would have given them
+_UMASK = os.umask(0o022)
+os.umask(_UMASK)
+
+# a file to write that replaces path when the with block is done, ex. with replacing('tides.save') as f: f.write(data)
+# it's written under a name of its own next to path (so writers in other threads and processes never share one) and then moved
+# over path, so readers only ever see the old file or the whole new one - if the block fails, path is left as it was
+@contextmanager
+def replacing(path: str, fsync: bool = False) -> Iterator[BinaryIO]:
+    fd, tmp = tempfile.mkstemp(prefix=f'{os.path.basename(path)}.', suffix='.tmp', dir=os.path.dirname(path) or '.')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            yield f
+            if fsync:
+                f.flush()
+                os.fsync(f.fileno())
+        os.chmod(tmp, 0o666 & ~_UMASK)
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+
 class ReturnToMenu(Exception):
 
     """
@@ -266,22 +505,145 @@ def collect(*options: List[str]) -> RegexStr:
 
     return '(' + ('|'.join([f'({o})' for o in options])) + ')'
 
+class PatternCache:
+
+    """
+    Process-wide cache of compiled patterns used by compile(), so that identical patterns (every Game builds the same item and
+    character patterns) share one compiled object instead of being compiled again.
+
+    Holds at most maxSize patterns - past that, the least recently used one is thrown away.
+
+    hits, misses, evictions - counters for seeing how well the cache is doing, also returned together by stats()
+    """
+
+    def __init__(self, maxSize: int = 4096) -> None:
+        self.maxSize: int = maxSize
+        self.patterns: OrderedDict[Tuple[RegexStr, int], RegexPattern] = OrderedDict()
+        self.hits: int = 0
+        self.misses: int = 0
+        self.evictions: int = 0
+
+    def get(self, pattern: RegexStr, flags: int = 0) -> RegexPattern:
+        key = (pattern, flags)
+        if (compiled := self.patterns.get(key)) is not None:
+            self.hits += 1
+            self.patterns.move_to_end(key)
+            return compiled
+        self.misses += 1
+        compiled = self.patterns[key] = re.compile(pattern, flags)
+        if len(self.patterns) > self.maxSize:
+            self.patterns.popitem(last=False)
+            self.evictions += 1
+        return compiled
+
+    def stats(self) -> Dict[str, int]:
+        return dict(size=len(self.patterns), hits=self.hits, misses=self.misses, evictions=self.evictions)
+
+    def clear(self) -> None:
+        self.patterns.clear()
+        self.hits = self.misses = self.evictions = 0
+
+PATTERNS: PatternCache = PatternCache()
+
+class LazyPattern:
+
+    """
+    Stands in for a compiled pattern and only compiles it (through PATTERNS) the first time it's used. Compiled levels are
+    loaded with these instead of compiled patterns (see level.py), so loading one doesn't compile anything.
+
+    The first use puts the compiled pattern's methods on the instance, so calling them after that costs the same as on the
+    compiled pattern itself.
+    """
+
+    def __init__(self, pattern: RegexStr, flags: int = 0) -> None:
+        self.pattern: RegexStr = pattern
+        self.flags: int = flags
+
+    def __getattr__(self, name: str) -> Any:
+        compiled = PATTERNS.get(self.pattern, self.flags)
+        for k in ('match', 'fullmatch', 'search', 'sub', 'subn', 'split', 'findall', 'finditer', 'groups', 'groupindex'):
+            setattr(self, k, getattr(compiled, k))
+        return getattr(compiled, name)
+
+    def __reduce__(self):
+        return (LazyPattern, (self.pattern, self.flags))
+
+    __str__ = __repr__ = lambda s: f'LazyPattern({s.pattern!r})'
+
 def compile(pattern: RegexStr) -> RegexPattern:
     
     """
     A wrapper around re.compile that provides some small improvements (like making spaces optional)
+
+    Compiled patterns are shared through PATTERNS, so compiling the same pattern twice gives back the same object.
     """
 
-    #return re.compile(re.sub(r' ', r'( )*', pattern), re.IGNORECASE)
-    return re.compile(pattern, re.IGNORECASE)
+    #return PATTERNS.get(re.sub(r' ', r'( )*', pattern), re.IGNORECASE)
+    return PATTERNS.get(pattern, re.IGNORECASE)
 
 KEYWORDS: Collection[RegexStr] = Collection(
     **{name: collect(*_set) for name, _set in STR_KEYWORDS.__dict__.items() if _set is not None}
 )
 KEYWORDS.__dict__.pop('resetValue')
 
+class KeywordTrie:
+
+    """
+    A character trie over every keyword phrase in STR_KEYWORDS and every direction word in DIRS (with and without "go ").
+
+    Keywords only count at the start of the input, so one walk from the root finds all of them at once instead of every command
+    pattern re-checking its own keyword alternation. See parse().
+    """
+
+    def __init__(self) -> None:
+        # char => child trie
+        self.children: Dict[str, KeywordTrie] = dict()
+        # names of the keywords that end here, ex. ['TakeItem'] at the end of 'pick up'
+        self.keywords: List[str] = []
+        # name of the direction that ends here, only counts if the input ends here too
+        self.direction: str = None
+
+    def add(self, phrase: str) -> KeywordTrie:
+        node = self
+        for ch in phrase:
+            node = node.children.setdefault(ch, KeywordTrie())
+        return node
+
+_TRIE: KeywordTrie = KeywordTrie()
+for _name, _set in STR_KEYWORDS.items():
+    for _phrase in (_set or ()):
+        _TRIE.add(_phrase).keywords.append(_name)
+for _dir in DIRS.values():
+    for _alias in (_dir.aliases if _dir is not None else ()):
+        _TRIE.add(_alias).direction = _TRIE.add(f'go {_alias}').direction = _dir.name
+
+def parse(text: str) -> Intent:
+
+    """
+    Breaks up the (stripped) input into an Intent in one pass over it, using the keyword trie above - the keywords it starts
+    with, which is what the dispatcher routes on (see command.CommandIndex).
+
+    ex. 'pick up rock' -> Intent(keys={'TakeItem'}), 'look at lamp' -> Intent(keys={'LookAround', 'InspectItem'}),
+    'go ne' -> Intent(keys={'Move', 'Northeast'})
+
+    Like the patterns, this ignores case and does not care about word boundaries ('user' starts with 'use').
+    """
+
+    node = _TRIE
+    keys = set()
+    for ch in text.lower():
+        if (node := node.children.get(ch)) is None:
+            break
+        keys.update(node.keywords)
+    else:
+        # the whole input was walked, so it might be a direction
+        if node.direction:
+            keys.add(node.direction)
+    return Intent(text, keys)
+
 if __name__ == '__main__':
     # pprint(KEYWORDS.__dict__, sort_dicts=False)
+    _clock = TideClock()
     while True:
         __import__('time').sleep(1)
-        print(TIME.advance())
\ No newline at end of file
+        print(_clock.advance())
\ No newline at end of file
@@ -0,0 +1,244 @@
+# pyright: reportMissingImports=false
+from __future__ import annotations
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, BinaryIO, Deque, Dict, Iterable, List, Set, Tuple
+import asyncio
+import os
+import tempfile
+import time
+import tracemalloc
+
+from game import Game
+import savefile
+from sessions import LocalSessions
+from world import World
+from gametypes import *
+import globals
+
+"""
+Puts idle sessions to sleep on disk so a server can hold many more of them than fit in memory.
+
+    python server.py --memory-budget 64000000
+
+"""
+
+# a few turns of moving things around and talking, so a measured game is closer to what a server holds
+PLAYED = ('look', 'take dull rock', 'inventory', 'drop dull rock', 'look at dull rock', 'talk to old man', 'how are you doing',
+    'where am i', 'what\'s for sale', 'bye', 'nw', 'look around', 'se', 'do nothing')
+
+# what one game in memory costs in this process, in bytes - the average over n games that have each played PLAYED, measured with
+# tracemalloc (everything allocated for them and still alive, so the shared World and cached patterns aren't counted)
+def measureSessionBytes(n: int = 20) -> int:
+    # the first game builds the shared World and fills the pattern cache
+    first = Game(start=False)
+    for text in PLAYED:
+        first.step(text)
+    games: List[Game] = []
+    tracing = tracemalloc.is_tracing()
+    if not tracing:
+        tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    for _ in range(n):
+        g = Game(start=False)
+        for text in PLAYED:
+            g.step(text)
+        games.append(g)
+    after = tracemalloc.get_traced_memory()[0]
+    if not tracing:
+        tracemalloc.stop()
+    return max(1, (after - before) // n)
+
+class SessionFile:
+
+    """
+    An append-only file of blobs by session id - put() writes the new blob at the end and forgets where the old one was, and
+    once more of the file is old blobs than live ones it's rewritten with only the live ones (compact()).
+
+    It's a temporary file by default, deleted when it's closed.
+    """
+
+    # don't bother compacting files smaller than this
+    MIN_COMPACT = 1 << 20
+
+    __slots__ = ('file', 'index', 'end', 'live')
+
+    def __init__(self, file: BinaryIO = None) -> None:
+        self.file: BinaryIO = file if file is not None else tempfile.TemporaryFile()
+        # session id => (offset, length)
+        self.index: Dict[int, Tuple[int, int]] = dict()
+        self.end: int = 0
+        self.live: int = 0
+
+    def put(self, sessionId: int, blob: bytes) -> None:
+        self.pop(sessionId)
+        os.pwrite(self.file.fileno(), blob, self.end)
+        self.index[sessionId] = (self.end, len(blob))
+        self.end += len(blob)
+        self.live += len(blob)
+        if self.end >= SessionFile.MIN_COMPACT and self.end > 2 * self.live:
+            self.compact()
+
+    def get(self, sessionId: int) -> bytes:
+        offset, length = self.index[sessionId]
+        return os.pread(self.file.fileno(), length, offset)
+
+    def pop(self, sessionId: int) -> None:
+        if (entry := self.index.pop(sessionId, None)):
+            self.live -= entry[1]
+
+    def compact(self) -> None:
+        other = SessionFile(tempfile.TemporaryFile())
+        for sessionId in self.index:
+            other.put(sessionId, self.get(sessionId))
+        self.file.close()
+        self.file, self.index, self.end, self.live = other.file, other.index, other.end, other.live
+
+    def close(self) -> None:
+        self.file.close()
+
+    def __contains__(self, sessionId: int) -> bool:
+        return sessionId in self.index
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+class HibernatingSessions(LocalSessions):
+
+    """
+    LocalSessions that keeps at most memoryBudget bytes of games in memory (at sessionBytes each, measured when it's made unless
+    it's given, see measureSessionBytes). When there are more, the least
+    recently played ones are put to sleep: they're saved to a SessionFile (see savefile.py) and dropped. The next input for a
+    sleeping session wakes it back up with Game.restore() before it's stepped, so players never notice. Putting sessions to sleep
+    also throws away the command tables of the items no awake game can see.
+
+    The file is only ever read and written on a background thread (like journal.Journals does), and so is the encoding and
+    decoding - waking a session up only holds up that session, never the event loop.
+
+    games - the sessions in memory, least recently played first
+    sleeping - the ids of the others / asleep - the SessionFile they're in
+    hits - inputs for sessions that were in memory / misses - inputs that had to wake their session up
+    report() - hit rate and wake-up (restore) latency, for sizing the budget
+    stop() - waits for the background thread and deletes the file, call when the server shuts down
+    """
+
+    RESTORE_TIMES = 10000
+
+    def __init__(self, memoryBudget: int = 64 * 2**20, sessionBytes: int = None, file: BinaryIO = None) -> None:
+        super().__init__()
+        self.games: OrderedDict[int, Game] = OrderedDict()
+        self.memoryBudget: int = memoryBudget
+        self.sessionBytes: int = sessionBytes or measureSessionBytes()
+        self.asleep: SessionFile = SessionFile(file)
+        self.sleeping: Set[int] = set()
+        self.hits: int = 0
+        self.misses: int = 0
+        self.evictions: int = 0
+        # how long the last RESTORE_TIMES wake-ups took, in seconds
+        self.restoreTimes: Deque[float] = deque(maxlen=HibernatingSessions.RESTORE_TIMES)
+        # one thread, so the file's work happens in the order it was asked for (a session is always written before it's read back)
+        self._io: ThreadPoolExecutor = ThreadPoolExecutor(1, thread_name_prefix='hibernate')
+        # session id => done once it's awake again, for inputs that come in while it's waking up
+        self._waking: Dict[int, asyncio.Future] = dict()
+
+    @property
+    def maxAwake(self) -> int:
+        return max(1, self.memoryBudget // self.sessionBytes)
+
+    async def open(self, sessionId: int) -> str:
+        text = await super().open(sessionId)
+        self._evict()
+        return text
+
+    async def step(self, sessionId: int, text: str) -> Tuple[str, bool]:
+        if sessionId in self.games:
+            self.hits += 1
+            self.games.move_to_end(sessionId)
+        else:
+            self.misses += 1
+            # it can go back to sleep while another input for it is waiting on the same wake-up
+            while sessionId not in self.games:
+                await self._wake(sessionId)
+        return await super().step(sessionId, text)
+
+    async def close(self, sessionId: int) -> None:
+        await super().close(sessionId)
+        if sessionId in self.sleeping:
+            self.sleeping.discard(sessionId)
+            self._io.submit(self.asleep.pop, sessionId)
+
+    async def stop(self) -> None:
+        await asyncio.get_running_loop().run_in_executor(None, self._io.shutdown)
+        self.asleep.close()
+
+    def __len__(self) -> int:
+        return len(self.games) + len(self.sleeping)
+
+    async def _wake(self, sessionId: int) -> None:
+        if (waking := self._waking.get(sessionId)) is not None:
+            await asyncio.shield(waking)
+            return
+        if sessionId not in self.sleeping:
+            raise KeyError(f'there\'s no session {sessionId}, it was never opened or it\'s already been closed')
+        start = time.perf_counter()
+        self.sleeping.discard(sessionId)
+        waking = self._waking[sessionId] = asyncio.get_running_loop().create_future()
+        try:
+            state = await asyncio.wrap_future(self._io.submit(self._read, sessionId))
+            self.games[sessionId] = Game.restore(state)
+        finally:
+            del self._waking[sessionId]
+            waking.set_result(None)
+        self.restoreTimes.append(time.perf_counter() - start)
+
+    # on the background thread
+    def _read(self, sessionId: int) -> Dict[str, Any]:
+        state = savefile.loads(self.asleep.get(sessionId))
+        self.asleep.pop(sessionId)
+        return state
+
+    def _write(self, sessionId: int, state: Dict[str, Any]) -> None:
+        self.asleep.put(sessionId, savefile.dumps(state))
+
+    def _stepBatch(self) -> None:
+        super()._stepBatch()
+        # only once the batch is done, a game that's waiting to be stepped can't be put to sleep
+        self._evict()
+
+    def _evict(self) -> None:
+        if (excess := len(self.games) - self.maxAwake) <= 0:
+            return
+        waiting = {id(g) for g, _, _ in self._batch}
+        sleepy = []
+        for sessionId, g in self.games.items():
+            if len(sleepy) == excess:
+                break
+            if id(g) not in waiting:
+                sleepy.append(sessionId)
+        worlds = {id(g.world): g.world for g in self.games.values()}
+        for sessionId in sleepy:
+            # the snapshot is plain data of its own, the game can go right away
+            self._io.submit(self._write, sessionId, self.games.pop(sessionId).snapshot())
+            self.sleeping.add(sessionId)
+        self.evictions += len(sleepy)
+        self._releaseCommands(worlds.values())
+
+    # throws away the command tables of every item no awake game can see, they're built again when one shows up (see
+    # item.Item._buildCommands) - items are shared by every game using the world, so only the sessions together know which are idle
+    def _releaseCommands(self, worlds: Iterable[World]) -> None:
+        seen: Set[ItemName] = set()
+        for g in self.games.values():
+            seen |= g.visibleItems()
+        for w in worlds:
+            for name, i in w.items.items():
+                if name not in seen:
+                    i.releaseCommands()
+
+    def report(self) -> str:
+        inputs = self.hits + self.misses
+        s = (f'sessions: {len(self.games)} awake, {len(self.sleeping)} asleep ({self.asleep.live} bytes on disk)  '
+            f'hit rate: {self.hits / inputs if inputs else 1:.1%}  evictions: {self.evictions}')
+        if (times := sorted(self.restoreTimes)):
+            s += (f'  restore latency  p50: {globals.quantile(times, 0.5) * 1e6:.0f}us  '
+                f'p99: {globals.quantile(times, 0.99) * 1e6:.0f}us  max: {times[-1] * 1e6:.0f}us')
+        return s
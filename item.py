@@ -11,13 +11,21 @@ TODO
 
 """
 
+# every item has these attrs, see Item.exampleAttrs
+ItemAttrs = globals.schema('ItemAttrs',
+    taken = False,
+    canCarry = True,
+    canUse = True,
+    alwaysUsable = False # if false, must be picked up before using
+)
+
 class Item:
 
     """
     An item in the game. Has parameters for whether it can be picked up/dropped, or used.
     """
 
-    exampleAttrs = globals.Collection(
+    exampleAttrs = ItemAttrs(
         taken = False,
         canCarry = True,
         canUse = True,
@@ -28,18 +36,19 @@ class Item:
             onTake = 'You took the {name}.',
             onDrop = 'You dropped the {name}.',
             onUse = 'You used the {name}.',
-            onInspect = 'This {name} appears to be a regular {name}'
+            onInspect = 'This {name} appears to be a regular {name}',
+            invalidUse = 'You can\'t use the {name} that way.'
         )
 
     exampleOnCalls = {
-        '_writeline': 'pass in the writeline function here',
-        'use': lambda: 'this will run when an item is used on its own',
-        'Lamp': lambda: 'this will run when an item is used on an item with the name Lamp',
+        # every one of these is called with the Game, see Command
+        'use': lambda g: 'this will run when an item is used on its own',
+        'Lamp': lambda g: 'this will run when an item is used on an item with the name Lamp',
         # and so on
-        'take': lambda: 'this will run when an item is taken',
-        'drop': lambda: 'this will run when an item is dropped',
-        'inspect': lambda: 'this will run when an item is looked at',
-        'invalid': lambda: 'this will run when an item is used in a wrong way'
+        'take': lambda g: 'this will run when an item is taken',
+        'drop': lambda g: 'this will run when an item is dropped',
+        'inspect': lambda g: 'this will run when an item is looked at',
+        'invalid': lambda g: 'this will run when an item is used in a wrong way'
     }
 
     # NOTE - targets is redundant sadly, you have to supply the targets[] into the list and also into the onCalls
@@ -47,13 +56,15 @@ class Item:
     # must pass in messages - will throw an error otherwise
     # only verbose message is onInspectVerbose in self.messages
     # generally stick to this order when making items
+    __slots__ = ('name', 'aliases', 'repr', 'attrs', 'targets', 'specialCommands', 'messages', 'onCalls', '_commandTables')
+
     def __init__(self, name: ItemName, *,
             # contains a list of regex strings like r'(lamp|light)' - the same as that item's aliases
             targets: Dict[ItemName] = {},
             aliases: RegexStr,
             repr: str = None,
-            # BUG possibly, every item copies the default one, so if you change exampleAttrs.taken you're gonna have problems
-            attrs: globals.Collection[Any] = exampleAttrs,
+            # defaults to a fresh ItemAttrs() so items don't share the same attrs
+            attrs: ItemAttrs = None,
             specialCommands: List[Command] = [],
             messages: globals.Collection[str] = None,
             onCalls: Dict[str, Callable] = dict()) -> None:
@@ -63,52 +74,69 @@ class Item:
         # how the name will be displayed in game
         self.repr: str = repr
         # redeclaring this so no mutability issues happen
-        self.attrs: globals.Collection[Any] = attrs
-
-        self.commands: Dict[CommandName, Command] = {
-            # if this is unreadable i'm sorry, it's just a long list comprehension
-            c.name: c for c in ([
-                # use this
-                # don't remove the self in self.aliases here
-                Command(f'Inspect {name}', pattern=fr'{globals.KEYWORDS.InspectItem} ({self.aliases})', onCall=lambda: onCalls['inspect']())
-            ] +
-                # special commands that were passed in
-            [
-                x for x in specialCommands
-            ])
-        }
-
-        self.useCommands: Dict[CommandName, Command] = {
-            c.name: c for c in [
-                Command(f'Use {name}', pattern=fr'{globals.KEYWORDS.UseItem} ({self.aliases})', onCall=onCalls['use']),
-            ]
-        }
-
-        self.carryCommands: Dict[CommandName, Command] = {
-            c.name: c for c in [
-                Command(f'Take {name}', pattern=fr'{globals.KEYWORDS.TakeItem} ({self.aliases})', onCall=onCalls['take']),
-                Command(f'Drop {name}', pattern=fr'{globals.KEYWORDS.DropItem} ({self.aliases})', onCall=onCalls['drop']),
-            ]
-        }
-
-        self.targetCommands: Dict[CommandName, Command] = {
-            c.name: c for c in
-                # use this on [target]
-                # "for target in targets" this gives you a string not an Item btw
-            [
-                Command(f'Use {name} on {t_name}', pattern=fr'{globals.KEYWORDS.UseItem} ({self.aliases}) on ({t_regex})', onCall=onCalls[t_name]) for t_name, t_regex in targets.items()
-            ]
-        }
-
-        self.failsafeCommands: Dict[CommandName, Command] = {
-            c.name: c for c in 
-            [
-                Command(f'Invalid Use of {name}', pattern=fr'{globals.KEYWORDS.UseItem} ({self.aliases}) on .*', onCall=onCalls['invalid'])
-            ]
-        }
+        self.attrs: ItemAttrs = attrs if attrs is not None else ItemAttrs()
 
+        self.targets: Dict[ItemName, RegexStr] = targets
+        self.specialCommands: List[Command] = specialCommands
         self.messages: globals.Collection[str] = messages
         self.onCalls: globals.Collection[Callable] = onCalls
+
+        # the command tables below are built the first time one of them is used (usually when the item first shows up in the
+        # current room or the inventory), and can be thrown away again with releaseCommands() - see _buildCommands
+        self._commandTables: globals.Collection[Dict[CommandName, Command]] = None
+
+    commands = property(lambda s: (s._commandTables or s._buildCommands()).commands)
+    useCommands = property(lambda s: (s._commandTables or s._buildCommands()).useCommands)
+    carryCommands = property(lambda s: (s._commandTables or s._buildCommands()).carryCommands)
+    targetCommands = property(lambda s: (s._commandTables or s._buildCommands()).targetCommands)
+    failsafeCommands = property(lambda s: (s._commandTables or s._buildCommands()).failsafeCommands)
+
+    def _buildCommands(self) -> globals.Collection[Dict[CommandName, Command]]:
+        name, onCalls = self.name, self.onCalls
+        self._commandTables = globals.Collection(
+            commands = {
+                # if this is unreadable i'm sorry, it's just a long list comprehension
+                c.name: c for c in ([
+                    # use this
+                    # don't remove the self in self.aliases here
+                    Command(f'Inspect {name}', pattern=fr'{globals.KEYWORDS.InspectItem} ({self.aliases})', onCall=lambda g: onCalls['inspect'](g), keys=['InspectItem'], passesTime=False)
+                ] +
+                    # special commands that were passed in
+                [
+                    x for x in self.specialCommands
+                ])
+            },
+            useCommands = {
+                c.name: c for c in [
+                    Command(f'Use {name}', pattern=fr'{globals.KEYWORDS.UseItem} ({self.aliases})', onCall=onCalls['use'], keys=['UseItem']),
+                ]
+            },
+            carryCommands = {
+                c.name: c for c in [
+                    Command(f'Take {name}', pattern=fr'{globals.KEYWORDS.TakeItem} ({self.aliases})', onCall=onCalls['take'], keys=['TakeItem']),
+                    Command(f'Drop {name}', pattern=fr'{globals.KEYWORDS.DropItem} ({self.aliases})', onCall=onCalls['drop'], keys=['DropItem']),
+                ]
+            },
+            targetCommands = {
+                c.name: c for c in
+                    # use this on [target]
+                    # "for target in targets" this gives you a string not an Item btw
+                [
+                    Command(f'Use {name} on {t_name}', pattern=fr'{globals.KEYWORDS.UseItem} ({self.aliases}) on ({t_regex})', onCall=onCalls[t_name], keys=['UseItem'], target=t_name) for t_name, t_regex in self.targets.items()
+                ]
+            },
+            failsafeCommands = {
+                c.name: c for c in 
+                [
+                    Command(f'Invalid Use of {name}', pattern=fr'{globals.KEYWORDS.UseItem} ({self.aliases}) on .*', onCall=onCalls['invalid'], keys=['UseItem'], passesTime=False)
+                ]
+            }
+        )
+        return self._commandTables
+
+    # frees the command tables, they get built again the next time they're needed
+    def releaseCommands(self) -> None:
+        self._commandTables = None
     
     __str__ = __repr__ = lambda s, f='short': s.repr if s.repr else (('an ' if s.name[0] in 'aeiou' else 'a ') + s.name.lower()) # if f == 'game' else f'Item({s.name})'
 
@@ -0,0 +1,202 @@
+# pyright: reportMissingImports=false
+from __future__ import annotations
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, BinaryIO, Dict, List, Optional, Tuple
+import asyncio
+import os
+
+import globals
+import savefile
+
+"""
+Journals every input a session plays, so a game that crashes can be picked back up where it was (see game.Game.recover).
+
+    python game.py --journal tides.journal
+    python server.py --journal journals/
+
+A journal file is a snapshot of the game (in the save format, see savefile.py) followed by every input played since, as records:
+
+    record      a tag byte (S for the snapshot, I for an input), the length (varint), then that many bytes
+
+Every snapshotEvery inputs the file is started over from a new snapshot, so it never gets long. Nothing is written during a turn -
+the records are kept in memory and written and fsync'd in one go every fsyncEvery seconds, so a crash loses at most that much.
+
+"""
+
+# how many inputs between snapshots
+SNAPSHOT_EVERY = 50
+# how often journals are written out and fsync'd, in seconds
+FSYNC_EVERY = 1.0
+
+_SNAPSHOT, _INPUT = b'S', b'I'
+
+def _record(out: bytearray, tag: bytes, data: bytes) -> None:
+    out += tag
+    savefile.varint(out, len(data))
+    out += data
+
+# the last snapshot in a journal file and the inputs after it
+# a record that was cut off by a crash (the last one) is left out
+def read(path: str) -> Tuple[Dict[str, Any], List[str]]:
+    with open(path, 'rb') as f:
+        data = f.read()
+    state, inputs = None, []
+    r = savefile.Reader(data, 0)
+    while r.pos < len(data):
+        start = r.pos
+        try:
+            tag = data[r.pos:r.pos + 1]
+            r.pos += 1
+            n = r.varint()
+        except IndexError:
+            break
+        if r.pos + n > len(data):
+            break
+        record = data[r.pos:r.pos + n]
+        r.pos += n
+        if tag == _SNAPSHOT:
+            state, inputs = savefile.loads(record), []
+        elif tag == _INPUT:
+            inputs.append(record.decode())
+        else:
+            raise savefile.SaveError(f'{path}: unknown record {tag!r} at byte {start}')
+    if state is None:
+        raise savefile.SaveError(f'{path}: no snapshot')
+    return state, inputs
+
+class Journal:
+
+    """
+    One session's journal file. The game calls record() after every input, write() does the actual writing - only ever one
+    write() at a time per journal, but it can be on another thread than record() (see Journals).
+
+    start(game) - starts the file over from a snapshot of the game (call when the session starts, record() calls it after that)
+    take() - everything recorded since the last take(), for write()
+    flush() - take() and write() right here
+    close(remove) - flushes, or deletes the file if remove is True (ex. when the game's over)
+    """
+
+    __slots__ = ('path', 'snapshotEvery', 'snapshot', 'pending', 'played', 'file')
+
+    def __init__(self, path: str, snapshotEvery: int = SNAPSHOT_EVERY) -> None:
+        self.path: str = path
+        self.snapshotEvery: int = snapshotEvery
+        # a newer snapshot to start the file over from, and the input records after it (or after what's in the file)
+        self.snapshot: Optional[bytes] = None
+        self.pending: bytearray = bytearray()
+        # inputs since the last snapshot
+        self.played: int = 0
+        self.file: BinaryIO = None
+
+    def start(self, game) -> None:
+        self.snapshot = savefile.dumps(game.snapshot())
+        self.pending = bytearray()
+        self.played = 0
+
+    # call after the input has been stepped
+    def record(self, game, text: str) -> None:
+        self.played += 1
+        if self.played >= self.snapshotEvery:
+            self.start(game)
+        else:
+            _record(self.pending, _INPUT, text.encode())
+
+    @property
+    def dirty(self) -> bool:
+        return self.snapshot is not None or bool(self.pending)
+
+    def take(self) -> Tuple[Optional[bytes], bytes]:
+        work = (self.snapshot, bytes(self.pending))
+        self.snapshot, self.pending = None, bytearray()
+        return work
+
+    def write(self, work: Tuple[Optional[bytes], bytes]) -> None:
+        snapshot, inputs = work
+        if snapshot is not None:
+            # a new file from the snapshot, swapped in whole so there's always a good one on disk
+            data = bytearray()
+            _record(data, _SNAPSHOT, snapshot)
+            with globals.replacing(self.path, fsync=True) as f:
+                f.write(data + inputs)
+            if self.file:
+                self.file.close()
+            self.file = open(self.path, 'ab')
+        elif inputs:
+            if self.file is None:
+                self.file = open(self.path, 'ab')
+            self.file.write(inputs)
+            self.file.flush()
+            os.fsync(self.file.fileno())
+
+    def flush(self) -> None:
+        if self.dirty:
+            self.write(self.take())
+
+    def close(self, remove: bool = False) -> None:
+        if not remove:
+            self.flush()
+        if self.file:
+            self.file.close()
+            self.file = None
+        if remove and os.path.exists(self.path):
+            os.remove(self.path)
+
+class Journals:
+
+    """
+    The journals of every game in a server, kept in directory as <key>.journal (the key is a file name, ex. the resume token
+    sessions.JournaledSessions gives each game). Every fsyncEvery seconds run() hands everything recorded since the last time to
+    a background thread, which writes and fsyncs it - so no turn ever waits on the disk.
+
+    open(key, game) - starts a game's journal / get(key) - its journal
+    close(key, remove) - flushes and closes it (or deletes it) on the background thread
+    """
+
+    def __init__(self, directory: str, fsyncEvery: float = FSYNC_EVERY, snapshotEvery: int = SNAPSHOT_EVERY) -> None:
+        self.directory: str = directory
+        self.fsyncEvery: float = fsyncEvery
+        self.snapshotEvery: int = snapshotEvery
+        self.journals: Dict[str, Journal] = dict()
+        # one thread, so one journal is never written by two at once
+        self._io: ThreadPoolExecutor = ThreadPoolExecutor(1, thread_name_prefix='journal')
+        os.makedirs(directory, exist_ok=True)
+
+    def pathOf(self, key: str) -> str:
+        return os.path.join(self.directory, f'{key}.journal')
+
+    def open(self, key: str, game) -> Journal:
+        j = self.journals[key] = Journal(self.pathOf(key), self.snapshotEvery)
+        j.start(game)
+        return j
+
+    def get(self, key: str) -> Journal:
+        return self.journals[key]
+
+    def close(self, key: str, remove: bool = False) -> Future:
+        j = self.journals.pop(key)
+        work = j.take()
+        def finish() -> None:
+            if not remove:
+                j.write(work)
+            j.close(remove)
+        return self._io.submit(finish)
+
+    # writes out every journal with something new in it, on the background thread
+    def flush(self) -> Future:
+        work = [(j, j.take()) for j in self.journals.values() if j.dirty]
+        def writeAll() -> None:
+            for j, w in work:
+                j.write(w)
+        return self._io.submit(writeAll)
+
+    async def run(self) -> None:
+        while True:
+            await asyncio.sleep(self.fsyncEvery)
+            await asyncio.wrap_future(self.flush())
+
+    # writes out everything and waits for the background thread to finish
+    def shutdown(self) -> None:
+        self.flush()
+        for key in list(self.journals):
+            self.close(key)
+        self._io.shutdown(wait=True)
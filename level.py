@@ -0,0 +1,581 @@
+# pyright: reportMissingImports=false
+from __future__ import annotations
+from typing import Any, Callable, Dict, List, Set, Tuple
+import glob
+import hashlib
+import json
+import os
+import pickle
+import re
+import sys
+import warnings
+
+from character import Character, CharacterAttrs, DialogOption
+from command import Command
+from item import Item, ItemAttrs
+from messages import ItemMessages, Message, RoomMessages
+from room import Room, RoomFlags
+from world import World
+from gametypes import *
+import character
+import command
+import gametypes
+import globals
+import item
+import messages
+import room
+import routes
+import world
+
+"""
+Levels - everything a World is made of that's particular to one game (rooms and how they're linked at which tides, items,
+characters and their dialogue, messages) in a data file, ex. levels/The Uneven Tides.json:
+
+    name, start     the level's name and the room the player starts in
+    rooms           room name => items, characters (the names of what starts there), flags, messages (none at all, or at
+                    least onEnter, onLook and onStay)
+                    a message is either text or {"if": test, "then": text, "else": text} (see messages.Template), where the
+                    test is "visited", ["itemInRoom", item] or ["anyInRoom", [item, ...]] (onEnter is shown before the room
+                    counts as visited, so it can tell if it's the first time)
+                    playerWent<Direction> and playerTried<Direction> messages replace the default ones (see RoomMessages)
+    links           [room, direction, room] (both ways), then optionally when it's open - a TIME name like "LowTide" or a list
+                    of them, null for always - and false for a link that only goes one way
+    items           item name => aliases, repr, attrs, messages, targets (item name => aliases), onCalls
+    characters      character name => messages, attrs, itemsForSale, startingOptions, options, failsafes, commands (name,
+                    pattern, keys, onCall, and passesTime: false for ones that don't take a turn, see command.Command)
+
+Patterns are regexes where {Keyword} stands for globals.KEYWORDS.Keyword, and a list of them is globals.collect()'ed into one.
+What commands and dialogue options do is an Action, ex. ["give", "Dull Rock", "Old Man"], and items take, drop, inspect, use
+and fail (invalid) the usual way unless their onCalls say otherwise.
+
+    python level.py "levels/The Uneven Tides.json"    (checks a level and compiles it)
+
+load(path) checks the level - LevelError lists everything that's wrong with it - and builds the World. The World is then
+pickled next to the level as <level>.<hash>.compiled, the hash covering the level file and the code of every class in it,
+so every later load() of the same level (in any process, ex. pool workers) just unpickles it: the objects, the dialogue
+states and the routes are all already built. Its patterns come back as globals.LazyPatterns, so nothing is compiled until
+it's matched against.
+
+"""
+
+class LevelError(Exception):
+
+    """
+    A level file that can't be loaded - the message lists every problem found in it.
+    """
+
+def _listWares(g, charName: CharName, header: str, whenEmpty: str) -> None:
+    npc = g.npcState(charName)
+    g.writeline(f'{header}\n {npc.listWares()}' if npc.itemsForSale else whenEmpty)
+
+class Action:
+
+    """
+    Something a level makes happen, ex. Action('say', 'Hello') or Action('give', 'Dull Rock', 'Old Man'). It's called with
+    the Game like any other onCall (see Command), and unlike a lambda it can be pickled into a compiled level.
+
+    KINDS - name => (what each arg is, what it does) - 'text' args can be anything, 'item' and 'character' ones are checked, and
+    'message' ones have to be one of the messages the item before them has (see messages.ItemMessages)
+    """
+
+    KINDS: Dict[str, Tuple[Tuple[str, ...], Callable[..., Any]]] = {
+        'say': (('text',), lambda g, text: g.writeline(text)),
+        'itemMessage': (('item', 'message'), lambda g, i, message: g.writeline(g.getItemMessage(i, message))),
+        'take': (('item',), lambda g, i: g.takeItem(i)),
+        'drop': (('item',), lambda g, i: g.dropItem(i)),
+        'talkTo': (('character',), lambda g, c: g.talkToCharacter(c)),
+        'give': (('item', 'character'), lambda g, i, c: g._giveItemToCharacter(i, c)),
+        # ex. ["listWares", "Old Man", "Here's what I have:", "Nothing for sale."]
+        'listWares': (('character', 'text', 'text'), _listWares),
+        'goodbye': ((), lambda g: Character.sayGoodbye()),
+    }
+
+    __slots__ = ('name', 'args', '_run')
+
+    def __init__(self, name: str, *args: Any) -> None:
+        self.name: str = name
+        self.args: Tuple[Any, ...] = args
+        self._run: Callable[..., Any] = Action.KINDS[name][1]
+
+    def __call__(self, g) -> Any:
+        return self._run(g, *self.args)
+
+    def __reduce__(self):
+        return (Action, (self.name, *self.args))
+
+    __str__ = __repr__ = lambda s: f'Action({s.name}' + ''.join(f', {a!r}' for a in s.args) + ')'
+
+# ------- PATTERNS, TIMES, DIRECTIONS ------- #
+
+_KEYWORD = re.compile(r'\{([A-Za-z]\w*)\}')
+_KEYWORDS: Dict[str, RegexStr] = {k: v for k, v in globals.KEYWORDS.items() if k != 'resetValue'}
+_DIRECTIONS: Dict[str, globals.Direction] = {d.name.lower(): d for d in globals.DIR_LIST}
+_TIMES: Dict[str, Any] = {k: v for k, v in globals.TIME.items() if k != 'resetValue'}
+
+def expand(pattern: Any) -> RegexStr:
+    if isinstance(pattern, list):
+        return globals.collect(*(expand(p) for p in pattern))
+    return _KEYWORD.sub(lambda m: _KEYWORDS.get(m.group(1), m.group(0)), pattern)
+
+def _times(when: Any) -> List[globals.TimeState]:
+    times = []
+    for name in (when if isinstance(when, list) else [when]):
+        t = _TIMES[name]
+        times += t if isinstance(t, list) else [t]
+    return times
+
+# (room, direction, room, times, both ways) for a link
+def _link(link: List[Any]) -> Tuple[RoomName, globals.Direction, RoomName, List[globals.TimeState], bool]:
+    a, d, b, *rest = link
+    when = rest[0] if rest else None
+    return a, _DIRECTIONS[d.lower()], b, _times(when) if when is not None else globals.TIME.All, rest[1] if len(rest) > 1 else True
+
+# ------- CHECKING ------- #
+
+_TOP = {'name', 'start', 'rooms', 'links', 'items', 'characters'}
+_ROOM = {'items', 'characters', 'flags', 'messages'}
+_ITEM = {'aliases', 'repr', 'attrs', 'messages', 'targets', 'onCalls'}
+_CHARACTER = {'messages', 'attrs', 'itemsForSale', 'startingOptions', 'options', 'failsafes', 'commands'}
+_OPTION = {'name', 'hidden', 'unchanged', 'repr', 'pattern', 'response', 'newOptions', 'onCall'}
+_COMMAND = {'name', 'pattern', 'keys', 'onCall', 'passesTime'}
+# a room either has no messages at all (it's quiet, see RoomMessages.get) or at least these
+_REQUIRED_ROOM_MESSAGES = ('onEnter', 'onLook', 'onStay')
+_ROOM_MESSAGES = {*_REQUIRED_ROOM_MESSAGES, *RoomMessages.DEFAULTS}
+_ITEM_ONCALLS = {'use', 'take', 'drop', 'inspect', 'invalid'}
+_TESTS = {'visited': 0, 'itemInRoom': 1, 'anyInRoom': 1}
+
+class _Checker:
+
+    """
+    Goes through a level's data and collects everything wrong with it in problems, each one starting with where it is
+    (ex. 'characters.Old Man.options[2].pattern').
+    """
+
+    def __init__(self, data: Dict[str, Any]) -> None:
+        self.data: Dict[str, Any] = data
+        self.problems: List[str] = []
+        self.rooms: Dict[RoomName, Any] = dict()
+        self.items: Dict[ItemName, Any] = dict()
+        self.characters: Dict[CharName, Any] = dict()
+
+    def problem(self, where: str, text: str) -> None:
+        self.problems.append(f'{where}: {text}')
+
+    def expect(self, value: Any, types: Any, where: str) -> bool:
+        types = types if isinstance(types, tuple) else (types,)
+        # bools are ints to python, but not to a level
+        if isinstance(value, types) and (bool in types or not isinstance(value, bool)):
+            return True
+        self.problem(where, f'should be a {" or ".join(t.__name__ for t in types)}, not {json.dumps(value)}')
+        return False
+
+    def keys(self, d: Dict[str, Any], allowed: set, where: str, required: Tuple[str, ...] = ()) -> None:
+        for k in d:
+            if k not in allowed:
+                self.problem(where, f'unknown field {k!r}')
+        for k in required:
+            if k not in d:
+                self.problem(where, f'{k!r} is missing')
+
+    # a schema's fields (ex. ItemAttrs), bool ones can only be true or false
+    def attrs(self, d: Any, schema: type, where: str) -> None:
+        if not self.expect(d, dict, where):
+            return
+        self.keys(d, set(schema._fields), where)
+        defaults = schema()
+        for k, v in d.items():
+            if k in schema._fields and isinstance(defaults[k], bool):
+                self.expect(v, bool, f'{where}.{k}')
+
+    def names(self, names: Any, known: Dict[str, Any], kind: str, where: str) -> List[str]:
+        if not self.expect(names, list, where):
+            return []
+        for n in names:
+            if n not in known:
+                self.problem(where, f'there\'s no {kind} {n!r}')
+        return [n for n in names if n in known]
+
+    def section(self, key: str) -> Dict[str, Any]:
+        d = self.data.get(key, {})
+        return d if self.expect(d, dict, key) else {}
+
+    def check(self) -> List[str]:
+        if not self.expect(self.data, dict, 'level'):
+            return self.problems
+        self.keys(self.data, _TOP, 'level', ('name', 'start', 'rooms'))
+        self.rooms, self.items, self.characters = self.section('rooms'), self.section('items'), self.section('characters')
+        if 'start' in self.data and self.data['start'] not in self.rooms:
+            self.problem('start', f'there\'s no room {self.data["start"]!r}')
+        self.checkRooms()
+        self.checkLinks()
+        for name, i in self.items.items():
+            self.checkItem(name, i, f'items.{name}')
+        for name, c in self.characters.items():
+            self.checkCharacter(name, c, f'characters.{name}')
+        self.checkPlaces()
+        return self.problems
+
+    def checkRooms(self) -> None:
+        for name, r in self.rooms.items():
+            where = f'rooms.{name}'
+            if not self.expect(r, dict, where):
+                continue
+            self.keys(r, _ROOM, where)
+            self.names(r.get('items', []), self.items, 'item', f'{where}.items')
+            self.names(r.get('characters', []), self.characters, 'character', f'{where}.characters')
+            if 'flags' in r:
+                self.attrs(r['flags'], RoomFlags, f'{where}.flags')
+            if 'messages' in r and self.expect(r['messages'], dict, f'{where}.messages'):
+                for k, m in r['messages'].items():
+                    if k not in _ROOM_MESSAGES:
+                        self.problem(f'{where}.messages', f'unknown message {k!r}')
+                    self.checkMessage(m, f'{where}.messages.{k}')
+                for k in _REQUIRED_ROOM_MESSAGES:
+                    if k not in r['messages']:
+                        self.problem(f'{where}.messages', f'{k!r} is missing')
+
+    def checkMessage(self, m: Any, where: str) -> None:
+        if isinstance(m, str) or not self.expect(m, (str, dict), where):
+            return
+        self.keys(m, {'if', 'then', 'else'}, where, ('if', 'then', 'else'))
+        self.expect(m.get('then', ''), str, f'{where}.then')
+        self.expect(m.get('else', ''), str, f'{where}.else')
+        test = m.get('if')
+        test, *args = test if isinstance(test, list) and test else [test]
+        if test not in _TESTS:
+            self.problem(f'{where}.if', f'unknown test {test!r}, should be one of {", ".join(_TESTS)}')
+        elif len(args) != _TESTS[test]:
+            self.problem(f'{where}.if', f'{test} takes {_TESTS[test]} argument(s)')
+        elif test == 'itemInRoom':
+            self.names(args, self.items, 'item', f'{where}.if')
+        elif test == 'anyInRoom':
+            self.names(args[0], self.items, 'item', f'{where}.if')
+
+    def checkLinks(self) -> None:
+        exits: Dict[Tuple[RoomName, int], int] = dict()
+        for n, link in enumerate(self.data.get('links', [])):
+            where = f'links[{n}]'
+            if not self.expect(link, list, where):
+                continue
+            if not 3 <= len(link) <= 5:
+                self.problem(where, 'should be [room, direction, room] and optionally when it\'s open and whether it goes both ways')
+                continue
+            a, d, b, *rest = link
+            ok = True
+            for r in (a, b):
+                if r not in self.rooms:
+                    self.problem(where, f'there\'s no room {r!r}')
+                    ok = False
+            if not isinstance(d, str) or d.lower() not in _DIRECTIONS:
+                self.problem(where, f'unknown direction {d!r}')
+                ok = False
+            if rest and rest[0] is not None:
+                for t in (rest[0] if isinstance(rest[0], list) else [rest[0]]):
+                    if t not in _TIMES:
+                        self.problem(where, f'unknown time {t!r}, should be one of {", ".join(_TIMES)}')
+                        ok = False
+            if len(rest) > 1 and not self.expect(rest[1], bool, where):
+                ok = False
+            if not ok:
+                continue
+            a, d, b, _, bothways = _link(link)
+            for exit in [(a, d)] + ([(b, d.reverse)] if bothways else []):
+                if (other := exits.setdefault((exit[0], exit[1].ordinal), n)) != n:
+                    self.problem(where, f'{exit[0]} already has a {exit[1].name.lower()} exit (links[{other}])')
+
+    def checkPattern(self, pattern: Any, where: str) -> None:
+        for p in (pattern if isinstance(pattern, list) else [pattern]):
+            if not self.expect(p, str, where):
+                return
+            for k in _KEYWORD.findall(p):
+                if k not in _KEYWORDS:
+                    self.problem(where, f'unknown keyword {{{k}}}')
+        try:
+            globals.compile(expand(pattern))
+        except re.error as e:
+            self.problem(where, f'bad pattern ({e})')
+
+    def checkAction(self, action: Any, where: str) -> None:
+        if not self.expect(action, list, where) or not action:
+            return
+        name, *args = action
+        if name not in Action.KINDS:
+            self.problem(where, f'unknown action {name!r}, should be one of {", ".join(Action.KINDS)}')
+            return
+        kinds = Action.KINDS[name][0]
+        if len(args) != len(kinds):
+            self.problem(where, f'{name} takes {len(kinds)} argument(s) ({", ".join(kinds)})')
+            return
+        item = None
+        for kind, a in zip(kinds, args):
+            if kind == 'item':
+                item = a if self.names([a], self.items, 'item', where) else None
+            elif kind == 'message':
+                if self.expect(a, str, where) and item is not None and a not in (names := self.itemMessages(item)):
+                    self.problem(where, f'{item} has no {a!r} message, it has {", ".join(sorted(names))}')
+            elif kind == 'character':
+                self.names([a], self.characters, 'character', where)
+            else:
+                self.expect(a, str, where)
+
+    # the messages an item ends up with - its own, and the ones ItemMessages fills in for it
+    def itemMessages(self, name: ItemName) -> Set[str]:
+        i = self.items[name]
+        names = set(i['messages']) if isinstance(i, dict) and isinstance(i.get('messages'), dict) else set()
+        try:
+            attrs = ItemAttrs(**i['attrs'])
+        except (AttributeError, KeyError, TypeError, ValueError):
+            # no attrs, or bad ones (which are a problem of their own)
+            attrs = ItemAttrs()
+        return names | set(ItemMessages.required(attrs))
+
+    def checkItem(self, name: ItemName, i: Any, where: str) -> None:
+        if not self.expect(i, dict, where):
+            return
+        self.keys(i, _ITEM, where, ('aliases',))
+        if 'aliases' in i:
+            self.checkPattern(i['aliases'], f'{where}.aliases')
+        if 'attrs' in i:
+            self.attrs(i['attrs'], ItemAttrs, f'{where}.attrs')
+        if 'messages' in i and self.expect(i['messages'], dict, f'{where}.messages'):
+            for k, m in i['messages'].items():
+                self.expect(m, str, f'{where}.messages.{k}')
+        targets = i.get('targets', {})
+        if self.expect(targets, dict, f'{where}.targets'):
+            self.names(list(targets), self.items, 'item', f'{where}.targets')
+            for t, p in targets.items():
+                self.checkPattern(p, f'{where}.targets.{t}')
+        onCalls = i.get('onCalls', {})
+        if self.expect(onCalls, dict, f'{where}.onCalls'):
+            for k, action in onCalls.items():
+                if k not in _ITEM_ONCALLS and k not in targets:
+                    self.problem(f'{where}.onCalls', f'{k!r} is neither one of {", ".join(sorted(_ITEM_ONCALLS))} nor a target')
+                self.checkAction(action, f'{where}.onCalls.{k}')
+            for t in targets:
+                if t not in onCalls:
+                    self.problem(f'{where}.onCalls', f'nothing happens when it\'s used on its target {t!r}')
+
+    def checkCharacter(self, name: CharName, c: Any, where: str) -> None:
+        if not self.expect(c, dict, where):
+            return
+        self.keys(c, _CHARACTER, where, ('options', 'failsafes', 'startingOptions'))
+        if 'messages' in c and self.expect(c['messages'], dict, f'{where}.messages'):
+            for k, m in c['messages'].items():
+                self.expect(m, str, f'{where}.messages.{k}')
+        if 'attrs' in c:
+            self.attrs(c['attrs'], CharacterAttrs, f'{where}.attrs')
+        forSale = c.get('itemsForSale', {})
+        if self.expect(forSale, dict, f'{where}.itemsForSale'):
+            self.names(list(forSale), self.items, 'item', f'{where}.itemsForSale')
+            self.names(list(forSale.values()), self.items, 'item', f'{where}.itemsForSale')
+        options = dict()
+        for key in ('options', 'failsafes'):
+            if not self.expect(c.get(key, []), list, f'{where}.{key}'):
+                continue
+            for n, o in enumerate(c.get(key, [])):
+                w = f'{where}.{key}[{n}]'
+                if not self.expect(o, dict, w):
+                    continue
+                self.keys(o, _OPTION, w, ('name', 'repr', 'pattern', 'response', 'newOptions'))
+                if 'pattern' in o:
+                    self.checkPattern(o['pattern'], f'{w}.pattern')
+                if o.get('response') is not None:
+                    self.expect(o['response'], str, f'{w}.response')
+                if 'onCall' in o:
+                    self.checkAction(o['onCall'], f'{w}.onCall')
+                if key == 'options':
+                    if o.get('name') in options:
+                        self.problem(w, f'there\'s already an option called {o.get("name")!r}')
+                    options[o.get('name')] = o
+        self.names(c.get('startingOptions', []), options, 'option', f'{where}.startingOptions')
+        for key in ('options', 'failsafes'):
+            for n, o in enumerate(c.get(key, []) if isinstance(c.get(key, []), list) else []):
+                if isinstance(o, dict) and 'newOptions' in o:
+                    self.names(o['newOptions'], options, 'option', f'{where}.{key}[{n}].newOptions')
+        if not self.expect(c.get('commands', []), list, f'{where}.commands'):
+            return
+        for n, cmd in enumerate(c.get('commands', [])):
+            w = f'{where}.commands[{n}]'
+            if not self.expect(cmd, dict, w):
+                continue
+            self.keys(cmd, _COMMAND, w, ('name', 'pattern', 'onCall'))
+            if 'pattern' in cmd:
+                self.checkPattern(cmd['pattern'], f'{w}.pattern')
+            if 'keys' in cmd:
+                self.names(cmd['keys'], _KEYWORDS, 'keyword', f'{w}.keys')
+            if 'onCall' in cmd:
+                self.checkAction(cmd['onCall'], f'{w}.onCall')
+            if 'passesTime' in cmd:
+                self.expect(cmd['passesTime'], bool, f'{w}.passesTime')
+
+    # every item and character can only start in one place
+    def checkPlaces(self) -> None:
+        places: Dict[str, str] = dict()
+        def place(thing: str, where: str) -> None:
+            if (other := places.setdefault(thing, where)) != where:
+                self.problem(where, f'{thing} already starts in {other}')
+        for name, r in self.rooms.items():
+            if isinstance(r, dict):
+                for i in r.get('items', []) if isinstance(r.get('items', []), list) else []:
+                    place(f'item {i!r}', f'rooms.{name}.items')
+                for c in r.get('characters', []) if isinstance(r.get('characters', []), list) else []:
+                    place(f'character {c!r}', f'rooms.{name}.characters')
+        for name, c in self.characters.items():
+            if isinstance(c, dict) and isinstance(c.get('itemsForSale'), dict):
+                for i in c['itemsForSale'].values():
+                    place(f'item {i!r}', f'characters.{name}.itemsForSale')
+
+# everything wrong with a level's data, [] if it can be built
+def check(data: Any) -> List[str]:
+    return _Checker(data).check()
+
+# ------- BUILDING ------- #
+
+def _message(m: Any) -> Message:
+    if isinstance(m, str):
+        return m
+    test, *args = m['if'] if isinstance(m['if'], list) else [m['if']]
+    return getattr(messages, test)(*args, m['then'], m['else'])
+
+def _option(o: Dict[str, Any]) -> DialogOption:
+    return DialogOption(o['name'],
+        hidden=o.get('hidden', False),
+        unchanged=o.get('unchanged', False),
+        repr=o['repr'],
+        pattern=expand(o['pattern']),
+        response=o['response'],
+        newOptions=o['newOptions'],
+        onCall=Action(*o['onCall']) if 'onCall' in o else DialogOption.DO_NOTHING)
+
+def _item(name: ItemName, i: Dict[str, Any]) -> Item:
+    onCalls = {
+        'use': Action('itemMessage', name, 'onUse'),
+        'take': Action('take', name),
+        'drop': Action('drop', name),
+        'inspect': Action('itemMessage', name, 'onInspect'),
+        'invalid': Action('itemMessage', name, 'invalidUse'),
+    }
+    onCalls.update({k: Action(*a) for k, a in i.get('onCalls', {}).items()})
+    return Item(name,
+        aliases=expand(i['aliases']),
+        repr=i.get('repr'),
+        attrs=ItemAttrs(**i['attrs']) if 'attrs' in i else None,
+        messages=globals.Collection(**i['messages']) if 'messages' in i else None,
+        targets={t: expand(p) for t, p in i.get('targets', {}).items()},
+        onCalls=onCalls)
+
+def _character(name: CharName, c: Dict[str, Any]) -> Character:
+    return Character(name,
+        messages=globals.Collection(**c.get('messages', {})),
+        attrs=CharacterAttrs(**c.get('attrs', {})),
+        options=[_option(o) for o in c['options']],
+        failsafes=[_option(o) for o in c['failsafes']],
+        startingOptions=c['startingOptions'],
+        commands=[
+            Command(cmd['name'], pattern=expand(cmd['pattern']), onCall=Action(*cmd['onCall']), keys=cmd.get('keys'),
+                passesTime=cmd.get('passesTime', True))
+            for cmd in c.get('commands', [])
+        ],
+        itemsForSale=c.get('itemsForSale', {}))
+
+# the World for a level's data, which has to check() out
+def build(data: Dict[str, Any]) -> World:
+    w = World()
+    w.rooms.update({
+        name: Room(name, flags=RoomFlags(**r['flags']) if 'flags' in r else None) for name, r in data['rooms'].items()
+    })
+    for link in data.get('links', []):
+        a, d, b, times, bothways = _link(link)
+        mask = globals.timeMask(times)
+        w.rooms[a].dirs[d.ordinal] = Path(w.rooms[b], mask)
+        if bothways:
+            w.rooms[b].dirs[d.reverse.ordinal] = Path(w.rooms[a], mask)
+
+    w.items.update({name: _item(name, i) for name, i in data.get('items', {}).items()})
+    w.itemMessages = ItemMessages(w.items)
+    w.characters.update({name: _character(name, c) for name, c in data.get('characters', {}).items()})
+
+    for name, r in data['rooms'].items():
+        for i in r.get('items', []):
+            w.itemLocations[i] = Location('room', name)
+            w.rooms[name].items[i] = w.items[i]
+        w.rooms[name].characters += [w.characters[c] for c in r.get('characters', [])]
+    # characters are holding the items they sell until they're traded away
+    for c in w.characters.values():
+        w.itemLocations.update({i: Location('character', c.name) for i in c.itemsForSale.values()})
+
+    # rooms without messages aren't in the table at all, see RoomMessages.get
+    w.roomMessages = RoomMessages({
+        name: {k: _message(m) for k, m in r['messages'].items()} for name, r in data['rooms'].items() if 'messages' in r
+    })
+    w.startRoom = data['start']
+    w.rooms[w.startRoom].flags.playerHasVisited = True
+    w.finish()
+    return w
+
+# ------- LOADING ------- #
+
+# the modules whose classes end up in a compiled level, a change to any of them means the level has to be compiled again
+_PICKLED = (character, command, gametypes, globals, item, messages, room, routes, world, sys.modules[__name__])
+
+def _hash(source: bytes) -> str:
+    h = hashlib.sha256(source)
+    h.update(sys.version.encode())
+    for m in _PICKLED:
+        with open(m.__file__, 'rb') as f:
+            h.update(f.read())
+    return h.hexdigest()[:16]
+
+def compiledPath(path: str, source: bytes) -> str:
+    return f'{os.path.splitext(path)[0]}.{_hash(source)}.compiled'
+
+def parse(path: str, source: bytes) -> Dict[str, Any]:
+    try:
+        data = json.loads(source)
+    except ValueError as e:
+        raise LevelError(f'{path} isn\'t valid JSON ({e})') from None
+    if (problems := check(data)):
+        raise LevelError(f'{path} has {len(problems)} problem(s):\n  ' + '\n  '.join(problems))
+    return data
+
+# the World for the level at path - from its compiled file if there's one for this version of it, otherwise it's checked,
+# built and compiled (which only warns if it can't be written, ex. in a read-only install)
+def load(path: str) -> World:
+    with open(path, 'rb') as f:
+        source = f.read()
+    compiled = compiledPath(path, source)
+    try:
+        with open(compiled, 'rb') as f:
+            return pickle.load(f)
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        warnings.warn(f'couldn\'t load {compiled} ({e}), building the level again')
+    w = build(parse(path, source))
+    try:
+        with globals.replacing(compiled) as f:
+            pickler = pickle.Pickler(f, pickle.HIGHEST_PROTOCOL)
+            pickler.dispatch_table = {re.Pattern: lambda p: (globals.LazyPattern, (p.pattern, p.flags))}
+            pickler.dump(w)
+        # the versions compiled from older level files or code
+        for old in glob.glob(f'{glob.escape(os.path.splitext(path)[0])}.*.compiled'):
+            if old != compiled:
+                # another process may have just removed it
+                try:
+                    os.remove(old)
+                except FileNotFoundError:
+                    pass
+    except OSError as e:
+        warnings.warn(f'couldn\'t write {compiled} ({e})')
+    return w
+
+if __name__ == '__main__':
+    # run as a script this module is __main__, and what it pickles would be __main__.Action etc., which no other process can
+    # unpickle - so it goes through the importable level module instead
+    import level
+    for path in sys.argv[1:]:
+        try:
+            w = level.load(path)
+        except level.LevelError as e:
+            sys.exit(str(e))
+        print(f'{path}: {len(w.rooms)} rooms, {len(w.items)} items, {len(w.characters)} characters')
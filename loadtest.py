@@ -0,0 +1,90 @@
+# pyright: reportMissingImports=false
+from __future__ import annotations
+from typing import List
+import argparse
+import asyncio
+import signal
+import subprocess
+import sys
+import time
+
+from globals import quantile
+from server import PROMPT_END
+
+"""
+Load generator for server.py - opens N sessions at once, plays the same script in each, and reports per-turn latency.
+
+    python loadtest.py --sessions 1000 --turns 30 --spawn
+
+--spawn starts its own server in another process (so the clients don't share its event loop), otherwise it connects to
+--host/--port. --workers, --memory-budget and --journal are passed on to the spawned server (see pool.py, hibernate.py,
+journal.py), which prints its own report when it's stopped. Thousands of sessions need a high enough open file limit (ulimit -n) on both sides.
+
+"""
+
+# stays around the starting room so every command does something, and talks to the old man on the way
+SCRIPT = [
+    'look', 'take dull rock', 'inventory', 'drop dull rock', 'look at dull rock',
+    'talk to old man', 'how are you doing', 'where am i', 'what\'s for sale', 'bye',
+    'nw', 'look around', 'se', 'help', 'do nothing'
+]
+
+async def session(host: str, port: int, turns: int, connecting: asyncio.Semaphore, latencies: List[float]) -> None:
+    async with connecting:
+        reader, writer = await asyncio.open_connection(host, port)
+    try:
+        await reader.readuntil(PROMPT_END)
+        for n in range(turns):
+            start = time.perf_counter()
+            writer.write(f'{SCRIPT[n % len(SCRIPT)]}\n'.encode())
+            await reader.readuntil(PROMPT_END)
+            latencies.append(time.perf_counter() - start)
+    finally:
+        writer.close()
+
+async def run(host: str, port: int, sessions: int, turns: int, connectRate: int) -> List[float]:
+    latencies: List[float] = []
+    # don't open every connection at the same time, the listen backlog would overflow
+    connecting = asyncio.Semaphore(connectRate)
+    results = await asyncio.gather(*[session(host, port, turns, connecting, latencies) for _ in range(sessions)], return_exceptions=True)
+    if (errors := [r for r in results if isinstance(r, Exception)]):
+        print(f'{len(errors)} sessions failed, first error: {errors[0]!r}')
+    return latencies
+
+def report(sessions: int, latencies: List[float], seconds: float) -> None:
+    ordered = sorted(latencies)
+    print(f'sessions: {sessions}  turns: {len(ordered)}  time: {seconds:.2f}s  turns/s: {len(ordered) / seconds:.0f}')
+    if ordered:
+        print(f'per-turn latency  p50: {quantile(ordered, 0.5) * 1000:.2f}ms  p99: {quantile(ordered, 0.99) * 1000:.2f}ms  '
+            f'max: {ordered[-1] * 1000:.2f}ms')
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Load test server.py.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=4000)
+    parser.add_argument('--sessions', type=int, default=100)
+    parser.add_argument('--turns', type=int, default=len(SCRIPT), help='inputs sent by every session')
+    parser.add_argument('--connect-rate', type=int, default=100, help='how many connections can be opening at once')
+    parser.add_argument('--spawn', action='store_true', help='start a server on --port for the test')
+    parser.add_argument('--workers', type=int, default=0, help='worker processes for the spawned server')
+    parser.add_argument('--memory-budget', type=int, default=0, help='memory budget for the spawned server')
+    parser.add_argument('--journal', metavar='DIR', help='journal directory for the spawned server')
+    args = parser.parse_args()
+
+    server = None
+    if args.spawn:
+        server = subprocess.Popen([sys.executable, 'server.py', '--host', args.host, '--port', str(args.port),
+            '--workers', str(args.workers), '--memory-budget', str(args.memory_budget)]
+            + (['--journal', args.journal] if args.journal else []),
+            cwd=sys.path[0] or '.', stdout=subprocess.PIPE, text=True)
+        # wait for it to be listening, it says which port it got (for --port 0)
+        args.port = int(server.stdout.readline().rsplit(':', 1)[1])
+    try:
+        start = time.perf_counter()
+        latencies = asyncio.run(run(args.host, args.port, args.sessions, args.turns, args.connect_rate))
+        report(args.sessions, latencies, time.perf_counter() - start)
+    finally:
+        if server:
+            # like ctrl+c, so it gets to print its report
+            server.send_signal(signal.SIGINT)
+            print(server.communicate()[0], end='')
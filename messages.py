@@ -0,0 +1,366 @@
+# pyright: reportMissingImports=false
+from __future__ import annotations
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Tuple, Union
+import hashlib
+import mmap
+import struct
+import warnings
+
+from gametypes import *
+import globals
+
+"""
+TODO
+
+"""
+
+class Template:
+
+    """
+    A message that depends on the game state. Both versions of the text are written out up front and test(game, room) picks one,
+    so rendering never builds a new string.
+
+    Use the helpers below (visited, itemInRoom, anyInRoom) to make these.
+    """
+
+    __slots__ = ('test', 'whenTrue', 'whenFalse')
+
+    def __init__(self, test: Callable[[Any, Any], bool], whenTrue: str, whenFalse: str) -> None:
+        self.test: Callable[[Any, Any], bool] = test
+        self.whenTrue: str = whenTrue
+        self.whenFalse: str = whenFalse
+
+    def render(self, game, room) -> str:
+        return _text(self.whenTrue if self.test(game, room) else self.whenFalse)
+
+class CatalogText:
+
+    """
+    A message whose text is in a MessageCatalog, only read (and decoded) when it's shown. Made by MessageCatalog.ref().
+    """
+
+    __slots__ = ('catalog', 'offset', 'length')
+
+    def __init__(self, catalog: MessageCatalog, offset: int, length: int) -> None:
+        self.catalog: MessageCatalog = catalog
+        self.offset: int = offset
+        self.length: int = length
+
+    def render(self, game=None, room=None) -> str:
+        return self.catalog.text(self.offset, self.length)
+
+# a message is either plain text, a Template, or text that's in a MessageCatalog
+Message = Union[str, Template, CatalogText]
+
+# texts shorter than this stay in memory when a catalog is loaded - a CatalogText takes about as much room as one
+INLINE_UNDER = 64
+
+# the text of a plain or catalog message
+def _text(m: Union[str, CatalogText]) -> str:
+    return m if m.__class__ is str else m.render()
+
+# what to keep for a text once the catalog is loaded, the text itself if it's short and otherwise where it is in the catalog
+def _fromCatalog(catalog: MessageCatalog, key: str, m: Union[str, CatalogText]) -> Union[str, CatalogText]:
+    return m if m.__class__ is str and len(m) < INLINE_UNDER else catalog.ref(key)
+
+# the tests are classes rather than lambdas so Templates can go in a compiled level (see level.py)
+
+class _Visited:
+
+    """ Whether the player has been to the room before """
+
+    __slots__ = ()
+
+    def __call__(self, game, room) -> bool:
+        return game.roomFlagsOf(room.name).playerHasVisited
+
+class _InRoom:
+
+    """ Whether any of the items is lying in the room """
+
+    __slots__ = ('itemNames',)
+
+    def __init__(self, itemNames: Tuple[ItemName, ...]) -> None:
+        self.itemNames: Tuple[ItemName, ...] = itemNames
+
+    def __call__(self, game, room) -> bool:
+        here = Location('room', room.name)
+        return any(game.itemLocations.get(i) == here for i in self.itemNames)
+
+def visited(whenTrue: str, whenFalse: str) -> Template:
+    """ whenTrue if the player has been to the room before (onEnter is shown before playerHasVisited is set) """
+    return Template(_Visited(), whenTrue, whenFalse)
+
+def itemInRoom(itemName: ItemName, whenTrue: str, whenFalse: str) -> Template:
+    """ whenTrue if the item is lying in the room """
+    return Template(_InRoom((itemName,)), whenTrue, whenFalse)
+
+def anyInRoom(itemNames: Iterable[ItemName], whenTrue: str, whenFalse: str) -> Template:
+    """ whenTrue if any of the items are lying in the room """
+    return Template(_InRoom(tuple(itemNames)), whenTrue, whenFalse)
+
+class RoomMessages:
+
+    """
+    Every room's messages, compiled once into one table: room name => message name => Message.
+
+    Message names are onEnter, onLook, onStay, playerWent<Direction> and playerTried<Direction>. The playerWent/playerTried
+    messages default to "You went <direction>." and "You can't go that way.", so rooms only have to list the ones they change.
+
+    get(game, roomName, message) - the text to show, '' for rooms that don't have any messages
+    """
+
+    __slots__ = ('table',)
+
+    # shared by every room, built once
+    DEFAULTS: Dict[str, Message] = {
+        **{f'playerWent{d.name}': f'You went {d.name.lower()}.' for d in globals.DIR_LIST},
+        **{f'playerTried{d.name}': 'You can\'t go that way.' for d in globals.DIR_LIST},
+    }
+
+    def __init__(self, rooms: Dict[RoomName, Dict[str, Message]]) -> None:
+        self.table: Dict[RoomName, Dict[str, Message]] = {
+            name: {**RoomMessages.DEFAULTS, **messages} for name, messages in rooms.items()
+        }
+
+    def get(self, game, roomName: RoomName, message: str) -> str:
+        if (messages := self.table.get(roomName)) is None:
+            return ''
+        if (m := messages[message]).__class__ is str:
+            return m
+        return m.render(game, game.rooms[roomName])
+
+    # catalog key => text for every message a room sets itself (the shared defaults stay in memory), see MessageCatalog
+    def entries(self) -> Dict[str, str]:
+        d: Dict[str, str] = dict()
+        for name, messages in self.table.items():
+            for k, m in messages.items():
+                if m is RoomMessages.DEFAULTS.get(k):
+                    continue
+                if m.__class__ is Template:
+                    d[f'room/{name}/{k}/true'], d[f'room/{name}/{k}/false'] = _text(m.whenTrue), _text(m.whenFalse)
+                else:
+                    d[f'room/{name}/{k}'] = _text(m)
+        return d
+
+    # swaps every long text in entries() for the same text in the catalog
+    def useCatalog(self, catalog: MessageCatalog) -> None:
+        for name, messages in self.table.items():
+            for k, m in messages.items():
+                if m is RoomMessages.DEFAULTS.get(k):
+                    continue
+                if m.__class__ is Template:
+                    messages[k] = Template(m.test,
+                        _fromCatalog(catalog, f'room/{name}/{k}/true', m.whenTrue), _fromCatalog(catalog, f'room/{name}/{k}/false', m.whenFalse))
+                else:
+                    messages[k] = _fromCatalog(catalog, f'room/{name}/{k}', m)
+
+class ItemMessages:
+
+    """
+    Looks up item messages by (item name, message name) in each Item.messages - those are where the texts are kept, this only
+    makes sure every item has the ones the game asks for, once when the game is set up.
+
+    Message names are onInspect and invalidUse for every item, onTake and onDrop for items that can be carried, and onUse for
+    items that can be used (see required). Any of those an item doesn't have are listed in missing and warned about right away,
+    and filled into its messages from Item.exampleMessages so the game doesn't crash on them later.
+
+    get(itemName, message) - the text to show
+    """
+
+    __slots__ = ('items', 'missing')
+
+    def __init__(self, items: Dict[ItemName, Any]) -> None:
+        self.items: Dict[ItemName, Any] = items
+        self.missing: List[Tuple[ItemName, str]] = []
+        for i in items.values():
+            if i.messages is None:
+                i.messages = globals.Collection()
+            for k in ItemMessages.required(i.attrs):
+                if k not in i.messages.keys():
+                    self.missing.append((i.name, k))
+                    i.messages[k] = i.exampleMessages[k].format(name=i.name.lower())
+        for name, k in self.missing:
+            warnings.warn(f'item {name!r} has no {k} message')
+
+    # the messages every item with these attrs has (see item.ItemAttrs)
+    @staticmethod
+    def required(attrs: Any) -> List[str]:
+        return ['onInspect', 'invalidUse'] + (['onTake', 'onDrop'] if attrs.canCarry else []) + (['onUse'] if attrs.canUse else [])
+
+    def get(self, itemName: ItemName, message: str) -> str:
+        return _text(self.items[itemName].messages[message])
+
+    # (item name, message name, text) for every item message
+    def _messages(self) -> Iterator[Tuple[ItemName, str, Union[str, CatalogText]]]:
+        for name, i in self.items.items():
+            for k, m in i.messages.items():
+                if k != 'resetValue':
+                    yield name, k, m
+
+    # catalog key => text for every item message, see MessageCatalog
+    def entries(self) -> Dict[str, str]:
+        return {f'item/{name}/{k}': _text(m) for name, k, m in self._messages()}
+
+    # swaps every long text in the items' messages for the same text in the catalog
+    def useCatalog(self, catalog: MessageCatalog) -> None:
+        for name, k, m in list(self._messages()):
+            self.items[name].messages[k] = _fromCatalog(catalog, f'item/{name}/{k}', m)
+
+class CatalogMessages:
+
+    """
+    Stands in for a character's messages Collection once its texts are in a MessageCatalog - messages.onTalk etc. still work,
+    the text is just read from the catalog when it's asked for (or kept as it was if it's short, see INLINE_UNDER).
+    """
+
+    __slots__ = ('refs',)
+
+    def __init__(self, refs: Dict[str, Union[str, CatalogText]]) -> None:
+        self.refs: Dict[str, Union[str, CatalogText]] = refs
+
+    def __getattr__(self, name: str) -> str:
+        try:
+            return _text(self.refs[name])
+        except KeyError:
+            raise AttributeError(name) from None
+
+    def __getitem__(self, item: str) -> str:
+        return _text(self.refs[item])
+
+    def __iter__(self):
+        return iter(self.refs)
+
+    def keys(self):
+        return self.refs.keys()
+
+    def values(self) -> List[str]:
+        return [_text(r) for r in self.refs.values()]
+
+    def items(self) -> List[Tuple[str, str]]:
+        return [(k, _text(r)) for k, r in self.refs.items()]
+
+# catalog key => text for every character's messages and dialogue responses, see MessageCatalog
+def characterEntries(characters: Iterable[Any]) -> Dict[str, str]:
+    d: Dict[str, str] = dict()
+    for c in characters:
+        d.update({f'npc/{c.name}/{k}': _text(m) for k, m in c.messages.items() if k != 'resetValue'})
+        d.update({f'npc/{c.name}/option/{o.name}': _text(o.response) for o in c.options.values() if o.response is not None})
+        d.update({f'npc/{c.name}/failsafe/{o.name}': _text(o.response) for o in c.failsafes if o.response is not None})
+    return d
+
+# swaps every long text in characterEntries() for the same text in the catalog
+def useCatalogForCharacters(characters: Iterable[Any], catalog: MessageCatalog) -> None:
+    for c in characters:
+        c.messages = CatalogMessages({k: _fromCatalog(catalog, f'npc/{c.name}/{k}', m) for k, m in c.messages.items() if k != 'resetValue'})
+        for o in c.options.values():
+            if o.response is not None:
+                o.response = _fromCatalog(catalog, f'npc/{c.name}/option/{o.name}', o.response)
+        for o in c.failsafes:
+            if o.response is not None:
+                o.response = _fromCatalog(catalog, f'npc/{c.name}/failsafe/{o.name}', o.response)
+
+class MessageCatalog:
+
+    """
+    Every message in the game compiled into one read-only file, which is mapped into memory instead of read. Processes that open
+    the same file share its pages, and a text is only paged in and decoded when it's shown.
+
+    Made by writeCatalog() from the entries() of the message tables (keys look like room/<room>/<message>, item/<item>/<message>,
+    npc/<character>/<message>). The tables' useCatalog() then swap their texts for CatalogTexts pointing into the file - all but the
+short ones, see INLINE_UNDER.
+
+    File layout, all little-endian:
+    header - magic, version, number of entries, digest of the entries it was made from (see entriesDigest)
+    index - (key offset, key length, text offset, text length) for every entry, sorted by key so it can be binary searched
+    then the keys and the texts, as utf-8
+
+    get(key) - the text for a key, KeyError if it's not there
+    ref(key) - a CatalogText for a key, which is what the message tables hold
+    """
+
+    MAGIC = b'UTMC'
+    VERSION = 2
+    HEADER = struct.Struct('<4sHI32s')
+    RECORD = struct.Struct('<IIII')
+
+    __slots__ = ('path', 'count', 'digest', '_file', '_map')
+
+    def __init__(self, path: str) -> None:
+        self.path: str = path
+        self._file = open(path, 'rb')
+        self._map: mmap.mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.count, self.digest = MessageCatalog.HEADER.unpack_from(self._map, 0)
+        if magic != MessageCatalog.MAGIC or version != MessageCatalog.VERSION:
+            self.close()
+            raise ValueError(f'{path} is not a version {MessageCatalog.VERSION} message catalog')
+
+    # (text offset, text length) for a key, None if it's not in the catalog
+    def find(self, key: str):
+        k = key.encode()
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            keyOffset, keyLength, textOffset, textLength = MessageCatalog.RECORD.unpack_from(
+                self._map, MessageCatalog.HEADER.size + mid * MessageCatalog.RECORD.size)
+            probe = self._map[keyOffset:keyOffset + keyLength]
+            if probe < k:
+                lo = mid + 1
+            elif probe > k:
+                hi = mid
+            else:
+                return textOffset, textLength
+        return None
+
+    def text(self, offset: int, length: int) -> str:
+        return self._map[offset:offset + length].decode()
+
+    def ref(self, key: str) -> CatalogText:
+        if (found := self.find(key)) is None:
+            raise KeyError(key)
+        return CatalogText(self, *found)
+
+    def get(self, key: str) -> str:
+        return self.ref(key).render()
+
+    def __contains__(self, key: str) -> bool:
+        return self.find(key) is not None
+
+    def __len__(self) -> int:
+        return self.count
+
+    def keys(self) -> List[str]:
+        keys = []
+        for n in range(self.count):
+            keyOffset, keyLength, _, _ = MessageCatalog.RECORD.unpack_from(self._map, MessageCatalog.HEADER.size + n * MessageCatalog.RECORD.size)
+            keys.append(self._map[keyOffset:keyOffset + keyLength].decode())
+        return keys
+
+    def close(self) -> None:
+        self._map.close()
+        self._file.close()
+
+# sha256 of every key and text in entries - a catalog is only used by a world whose messages have the same digest, so a
+# change to the level or to the texts filled in from code (ex. Item.exampleMessages) makes it out of date
+def entriesDigest(entries: Dict[str, str]) -> bytes:
+    h = hashlib.sha256()
+    for k, v in sorted(entries.items()):
+        for s in (k.encode(), v.encode()):
+            h.update(len(s).to_bytes(4, 'little'))
+            h.update(s)
+    return h.digest()
+
+# writes entries (key => text) to a catalog file at path
+# it's replaced whole (see globals.replacing), so processes that still have the old one open keep working
+def writeCatalog(path: str, entries: Dict[str, str]) -> None:
+    encoded = sorted((k.encode(), v.encode()) for k, v in entries.items())
+    offset = MessageCatalog.HEADER.size + len(encoded) * MessageCatalog.RECORD.size
+    index, blobs = [], []
+    for k, v in encoded:
+        index.append(MessageCatalog.RECORD.pack(offset, len(k), offset + len(k), len(v)))
+        blobs += [k, v]
+        offset += len(k) + len(v)
+    with globals.replacing(path) as f:
+        f.write(MessageCatalog.HEADER.pack(MessageCatalog.MAGIC, MessageCatalog.VERSION, len(encoded), entriesDigest(entries)))
+        f.write(b''.join(index))
+        f.write(b''.join(blobs))
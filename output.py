@@ -0,0 +1,130 @@
+# pyright: reportMissingImports=false
+from __future__ import annotations
+from typing import List, TextIO
+import socket
+import sys
+
+"""
+TODO
+
+"""
+
+class Output:
+
+    """
+    Where the Game's text goes. write() only adds to a buffer, and flush() sends everything written since the last flush in one go
+    - the Game flushes once at the end of every turn and before it waits for input.
+
+    Subclasses decide where the text ends up by overriding _send().
+
+    write(text) - buffers text as is (no newline added)
+    clear() - buffers the escape sequence that clears the screen
+    flush() - sends the buffer
+    take() - the text sent since the last take(), for outputs that keep it ('' for the ones that send it somewhere else)
+    """
+
+    # reset the terminal, then blank out the start of the line in case the reset didn't go through
+    CLEAR_SCREEN = '\033c\r                        \r'
+    # nothing written to this output is ever shown, so the Game doesn't bother rendering its messages (see NullOutput)
+    discards = False
+
+    __slots__ = ('buffer',)
+
+    def __init__(self) -> None:
+        self.buffer: List[str] = []
+
+    def write(self, text: str) -> None:
+        self.buffer.append(text)
+
+    def clear(self) -> None:
+        self.buffer.append(Output.CLEAR_SCREEN)
+
+    def flush(self) -> None:
+        if self.buffer:
+            text = ''.join(self.buffer)
+            self.buffer.clear()
+            self._send(text)
+
+    def take(self) -> str:
+        return ''
+
+    def _send(self, text: str) -> None:
+        raise NotImplementedError
+
+class TerminalOutput(Output):
+
+    """
+    Writes to a text stream, sys.stdout by default (looked up on every flush, so redirecting sys.stdout still works).
+    """
+
+    __slots__ = ('stream',)
+
+    def __init__(self, stream: TextIO = None) -> None:
+        super().__init__()
+        self.stream: TextIO = stream
+
+    def _send(self, text: str) -> None:
+        stream = self.stream or sys.stdout
+        stream.write(text)
+        stream.flush()
+
+class StringOutput(Output):
+
+    """
+    Keeps everything in memory, for tests and servers.
+
+    getvalue() - everything flushed since the last take()
+    take() - everything flushed since the last take(), and forgets it (Game.step returns this)
+    """
+
+    __slots__ = ('sent',)
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.sent: List[str] = []
+
+    def _send(self, text: str) -> None:
+        self.sent.append(text)
+
+    def getvalue(self) -> str:
+        return ''.join(self.sent)
+
+    def take(self) -> str:
+        text = ''.join(self.sent)
+        self.sent.clear()
+        return text
+
+class NullOutput(Output):
+
+    """
+    Throws everything away, for stepping a game nobody is watching (see Game.replay).
+    """
+
+    discards = True
+
+    __slots__ = ()
+
+    def write(self, text: str) -> None:
+        pass
+
+    def clear(self) -> None:
+        pass
+
+    def _send(self, text: str) -> None:
+        pass
+
+class SocketOutput(Output):
+
+    """
+    Sends to a connected socket, encoded as utf-8.
+    """
+
+    __slots__ = ('sock', 'encoding')
+
+    def __init__(self, sock: socket.socket, encoding: str = 'utf-8') -> None:
+        super().__init__()
+        self.sock: socket.socket = sock
+        self.encoding: str = encoding
+
+    def _send(self, text: str) -> None:
+        self.sock.sendall(text.encode(self.encoding))
@@ -0,0 +1,363 @@
+# pyright: reportMissingImports=false
+from __future__ import annotations
+from collections import deque
+from multiprocessing.connection import Connection
+from typing import Any, Deque, Dict, List, Optional, Set, Tuple
+import asyncio
+import multiprocessing
+import os
+import pickle
+
+from game import Game
+import sessions
+
+"""
+Runs a server's games in a pool of worker processes, so every core plays some of them (one process only ever uses one).
+
+    python server.py --workers 4
+
+Each worker owns the games of some sessions. A session's home worker is picked from its id, and every input for it goes to
+whichever worker owns it right now. Sessions move between workers as a snapshot of their game (see Game.snapshot) - to make room
+for a worker that's restarting, and back home afterwards (SessionPool.rebalance).
+
+"""
+
+# how many inputs a session plays between checkpoints, see SessionPool
+CHECKPOINT_EVERY = 20
+# how long a worker gets to exit once its pipe is closed before it's killed, in seconds
+EXIT_TIMEOUT = 5.0
+
+# requests and replies are (op, session id, arg) and (text, ended, state) - see _work
+Request = Tuple[str, int, Any]
+Reply = Tuple[Optional[str], bool, Optional[bytes]]
+
+class SessionError(Exception):
+
+    """
+    A session's game raised an exception in its worker - the game is thrown away, the worker and every other session carry on.
+    """
+
+def _snapshot(g: Game) -> bytes:
+    return pickle.dumps(g.snapshot(), pickle.HIGHEST_PROTOCOL)
+
+# a worker process - answers every batch of requests from the pool with one batch of replies, in the same order
+#   open - starts a new game, replies with its opening text
+#   restore - arg is (state or None for a new game, inputs to play after it): picks up a game from another worker or from
+#             its last checkpoint, replies with nothing
+#   step - arg is one input, replies with the text and whether the game ended, plus a checkpoint every checkpointEvery inputs
+#   export - replies with the game's state and forgets it (it's moving to another worker)
+#   close - forgets the game
+# a request whose game raises gets a SessionError back instead (see SessionError)
+def _work(conn: Connection, checkpointEvery: int) -> None:
+    games: Dict[int, Game] = dict()
+    # session id => inputs since its last checkpoint
+    played: Dict[int, int] = dict()
+    while True:
+        try:
+            batch: List[Request] = conn.recv()
+        except (EOFError, OSError):
+            return
+        replies: List[Reply] = [None] * len(batch)
+        # runs of steps are stepped together (see sessions.stepTexts), everything else one by one in order
+        steps: List[int] = []
+        for n, (op, sessionId, arg) in enumerate(batch + [('end', None, None)]):
+            if op == 'step' and sessionId in games:
+                steps.append(n)
+                continue
+            if steps:
+                outs = sessions.stepTexts([(games[batch[k][1]], batch[k][2]) for k in steps])
+                for k, out in zip(steps, outs):
+                    replies[k] = _stepped(games, played, checkpointEvery, batch[k][1], out)
+                steps = []
+            if op == 'end':
+                break
+            try:
+                replies[n] = _answer(games, played, checkpointEvery, op, sessionId, arg)
+            except Exception as e:
+                replies[n] = _failed(games, played, op, sessionId, e)
+        conn.send(replies)
+
+def _failed(games: Dict[int, Game], played: Dict[int, int], op: str, sessionId: int, e: Exception) -> SessionError:
+    games.pop(sessionId, None)
+    played.pop(sessionId, None)
+    return SessionError(f'session {sessionId}: {op} failed with {e!r}')
+
+# the reply to a step that was stepped with sessions.stepTexts
+def _stepped(games: Dict[int, Game], played: Dict[int, int], checkpointEvery: int, sessionId: int, out: Any) -> Reply:
+    if isinstance(out, Exception):
+        return _failed(games, played, 'step', sessionId, out)
+    text, ended = out
+    state = None
+    if ended:
+        # it may have been stepped more than once in this batch
+        games.pop(sessionId, None)
+        played.pop(sessionId, None)
+    elif (n := played[sessionId] + 1) >= checkpointEvery:
+        state, played[sessionId] = _snapshot(games[sessionId]), 0
+    else:
+        played[sessionId] = n
+    return (text, ended, state)
+
+def _answer(games: Dict[int, Game], played: Dict[int, int], checkpointEvery: int, op: str, sessionId: int, arg: Any) -> Reply:
+    if op == 'step':
+        # only a session that isn't here gets this far, see _work
+        raise KeyError(sessionId)
+    elif op == 'open':
+        g = games[sessionId] = Game(start=False)
+        played[sessionId] = 0
+        return (sessions.openText(g), False, None)
+    elif op == 'restore':
+        state, inputs = arg
+        g = games[sessionId] = Game.restore(pickle.loads(state)) if state else Game(start=False)
+        if not state:
+            sessions.openText(g)
+        for text in inputs:
+            g.step(text)
+        played[sessionId] = len(inputs)
+        return (None, False, None)
+    elif op == 'export':
+        state = _snapshot(games.pop(sessionId))
+        del played[sessionId]
+        return (None, False, state)
+    elif op == 'close':
+        if games.pop(sessionId, None):
+            del played[sessionId]
+        return (None, False, None)
+    raise ValueError(f'unknown request {op!r}')
+
+class _Worker:
+
+    """
+    The pool's end of one worker process.
+
+    pending - every request sent and not answered yet, with the future its reply goes to (the worker answers in order)
+    outbox - requests waiting to be sent - only one batch is out at a time, everything asked for while it's out goes in the next
+    one (so the batches get bigger as the worker gets busier, and neither side can block on a full pipe while the other does)
+    """
+
+    __slots__ = ('index', 'process', 'conn', 'pending', 'outbox', 'busy')
+
+    def __init__(self, index: int, process: multiprocessing.Process, conn: Connection) -> None:
+        self.index: int = index
+        self.process: multiprocessing.Process = process
+        self.conn: Connection = conn
+        self.pending: Deque[Tuple[asyncio.Future, Request]] = deque()
+        self.outbox: List[Request] = []
+        self.busy: bool = False
+
+class SessionPool:
+
+    """
+    Plays sessions on a pool of worker processes (see _work), for GameServer - same methods as sessions.LocalSessions.
+
+    The pool keeps a checkpoint of every session (its state as of a while ago, from the worker) and the inputs it played since,
+    so when a worker dies its sessions are picked up from there on the worker that replaces it, and the inputs that were waiting
+    on it are sent again - players don't notice anything but the wait.
+
+    size - how many workers, os.cpu_count() by default
+    owners - session id => index of the worker that has its game
+    restarts - how many times a worker had to be replaced
+    restartWorker(n) - replaces worker n without losing any session, ex. to give its memory back
+    rebalance() - moves every session back to its home worker
+    """
+
+    def __init__(self, size: int = None, checkpointEvery: int = CHECKPOINT_EVERY) -> None:
+        self.size: int = size or os.cpu_count() or 1
+        self.checkpointEvery: int = checkpointEvery
+        self.workers: List[_Worker] = []
+        self.owners: Dict[int, int] = dict()
+        # session id => its last checkpoint (None if it hasn't got one yet, it's replayed from the start) / inputs played since
+        self.checkpoints: Dict[int, Optional[bytes]] = dict()
+        self.tails: Dict[int, List[str]] = dict()
+        # a session's inputs can't be sent while it's moving between workers
+        self._locks: Dict[int, asyncio.Lock] = dict()
+        # workers that are being restarted, new sessions go elsewhere
+        self._draining: Set[int] = set()
+        self.restarts: int = 0
+        self._loop: asyncio.AbstractEventLoop = None
+        # spawn, not fork: a forked worker would get a copy of the server's event loop and sockets
+        self._context = multiprocessing.get_context('spawn')
+
+    async def start(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        self.workers = [self._spawn(n) for n in range(self.size)]
+
+    async def stop(self) -> None:
+        for w in self.workers:
+            self._loop.remove_reader(w.conn.fileno())
+            w.conn.close()
+            # nothing's going to answer these anymore
+            for future, _ in w.pending:
+                if not future.done():
+                    future.set_exception(ConnectionError('the session pool was stopped'))
+            w.pending.clear()
+        await asyncio.gather(*[self._join(w) for w in self.workers])
+        self.workers = []
+
+    def home(self, sessionId: int) -> int:
+        return sessionId % self.size
+
+    # ------- SESSIONS ------- #
+
+    async def open(self, sessionId: int) -> str:
+        n = self.home(sessionId)
+        while n in self._draining and len(self._draining) < self.size:
+            n = (n + 1) % self.size
+        self.owners[sessionId] = n
+        self.checkpoints[sessionId], self.tails[sessionId] = None, []
+        self._locks[sessionId] = asyncio.Lock()
+        text, _, _ = await self._request(self.owners[sessionId], ('open', sessionId, None))
+        return text
+
+    async def step(self, sessionId: int, text: str) -> Tuple[str, bool]:
+        async with self._locks[sessionId]:
+            out, ended, _ = await self._request(self.owners[sessionId], ('step', sessionId, text))
+        if ended:
+            self._forget(sessionId)
+        return out, ended
+
+    async def close(self, sessionId: int) -> None:
+        if sessionId not in self.owners:
+            return
+        async with self._locks[sessionId]:
+            await self._request(self.owners[sessionId], ('close', sessionId, None))
+        self._forget(sessionId)
+
+    def __len__(self) -> int:
+        return len(self.owners)
+
+    def _forget(self, sessionId: int) -> None:
+        for d in (self.owners, self.checkpoints, self.tails, self._locks):
+            d.pop(sessionId, None)
+
+    # moves a session's game to another worker
+    async def migrate(self, sessionId: int, to: int) -> None:
+        if sessionId not in self.owners:
+            return
+        async with self._locks[sessionId]:
+            if sessionId not in self.owners or self.owners[sessionId] == to:
+                return
+            _, _, state = await self._request(self.owners[sessionId], ('export', sessionId, None))
+            self.owners[sessionId] = to
+            self.checkpoints[sessionId], self.tails[sessionId] = state, []
+            await self._request(to, ('restore', sessionId, (state, [])))
+
+    async def rebalance(self) -> None:
+        await asyncio.gather(*[self.migrate(s, self.home(s)) for s, n in list(self.owners.items()) if n != self.home(s)],
+            return_exceptions=True)
+
+    async def restartWorker(self, n: int) -> None:
+        # its sessions keep playing on the other workers while it restarts
+        self._draining.add(n)
+        others = [m for m in range(self.size) if m != n]
+        moving = [s for s, m in self.owners.items() if m == n] if others else []
+        await asyncio.gather(*[self.migrate(s, others[k % len(others)]) for k, s in enumerate(moving)], return_exceptions=True)
+        # anything still on its way finishes first, then the new worker takes over in one go
+        old = self.workers[n]
+        while old.pending:
+            await asyncio.gather(*[f for f, _ in old.pending], return_exceptions=True)
+        # if it died in the meantime, _workerDied has already replaced it
+        if self.workers[n] is old:
+            self._loop.remove_reader(old.conn.fileno())
+            old.conn.close()
+            self.workers[n] = self._spawn(n)
+            self.restarts += 1
+            # whatever it still had (everything, if it's the only worker) is picked up from the checkpoints
+            self._restoreSessions(self.workers[n])
+            await self._join(old)
+        self._draining.discard(n)
+        await self.rebalance()
+
+    # ------- TALKING TO THE WORKERS ------- #
+
+    # waits for a worker whose pipe was closed to exit, and kills it if it hasn't after EXIT_TIMEOUT
+    async def _join(self, w: _Worker) -> None:
+        await self._loop.run_in_executor(None, w.process.join, EXIT_TIMEOUT)
+        if w.process.is_alive():
+            w.process.kill()
+            await self._loop.run_in_executor(None, w.process.join)
+
+    def _spawn(self, n: int) -> _Worker:
+        conn, child = self._context.Pipe()
+        process = self._context.Process(target=_work, args=(child, self.checkpointEvery), daemon=True, name=f'game worker {n}')
+        process.start()
+        child.close()
+        w = _Worker(n, process, conn)
+        self._loop.add_reader(conn.fileno(), self._onReplies, w)
+        return w
+
+    def _request(self, n: int, request: Request) -> asyncio.Future:
+        w = self.workers[n]
+        future = self._loop.create_future()
+        w.pending.append((future, request))
+        self._send(w, request)
+        return future
+
+    def _send(self, w: _Worker, request: Request) -> None:
+        if not (w.outbox or w.busy):
+            self._loop.call_soon(self._flush, w)
+        w.outbox.append(request)
+
+    def _flush(self, w: _Worker) -> None:
+        if w is not self.workers[w.index] or w.busy or not w.outbox:
+            return
+        batch, w.outbox, w.busy = w.outbox, [], True
+        try:
+            w.conn.send(batch)
+        except OSError:
+            self._workerDied(w)
+
+    def _onReplies(self, w: _Worker) -> None:
+        try:
+            replies: List[Reply] = w.conn.recv()
+        except (EOFError, OSError):
+            self._workerDied(w)
+            return
+        w.busy = False
+        for reply in replies:
+            future, (op, sessionId, arg) = w.pending.popleft()
+            if isinstance(reply, SessionError):
+                self._forget(sessionId)
+                if not future.done():
+                    future.set_exception(reply)
+                continue
+            if op == 'step' and sessionId in self.tails:
+                if (state := reply[2]) is not None:
+                    self.checkpoints[sessionId], self.tails[sessionId] = state, []
+                elif not reply[1]:
+                    self.tails[sessionId].append(arg)
+            if not future.done():
+                future.set_result(reply)
+        self._flush(w)
+
+    # starts another worker in its place, picks its sessions up from their checkpoints there and sends it everything the old one
+    # didn't answer
+    def _workerDied(self, w: _Worker) -> None:
+        self._loop.remove_reader(w.conn.fileno())
+        w.conn.close()
+        w.process.kill()
+        w.process.join()
+        lost = list(w.pending)
+        w.pending.clear()
+        new = self.workers[w.index] = self._spawn(w.index)
+        self.restarts += 1
+        self._restoreSessions(new, skip={sessionId for _, (op, sessionId, _) in lost if op == 'open'})
+        for future, request in lost:
+            # restores were just sent again, for every session it had
+            if request[0] == 'restore':
+                if not future.done():
+                    future.set_result((None, False, None))
+            else:
+                new.pending.append((future, request))
+                self._send(new, request)
+
+    # sends every session owned by w's index to w, from its last checkpoint and the inputs played since
+    def _restoreSessions(self, w: _Worker, skip: Set[int] = frozenset()) -> None:
+        for sessionId, n in self.owners.items():
+            if n == w.index and sessionId not in skip:
+                request = ('restore', sessionId, (self.checkpoints[sessionId], list(self.tails[sessionId])))
+                future = self._loop.create_future()
+                # nobody waits on these, a session that fails to restore fails its next input instead
+                future.add_done_callback(lambda f: f.exception())
+                w.pending.append((future, request))
+                self._send(w, request)
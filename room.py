@@ -14,6 +14,11 @@ TODO
 
 """
 
+# every room has these flags - rooms that need more can pass in their own Collection/schema with playerHasVisited in it
+RoomFlags = globals.schema('RoomFlags',
+    playerHasVisited = False
+)
+
 class Room:
 
     """
@@ -33,6 +38,11 @@ class Room:
         crateIsOpen = False
     )
 
+    # where an exit that doesn't lead anywhere points - Paths can't be changed, so every room shares this one
+    NO_EXIT: Path = Path()
+
+    __slots__ = ('name', 'items', 'characters', 'dirs', 'specialCommands', 'flags')
+
     # playerHasVisited is a REQUIRED flag for every room
     def __init__(self, name: ItemName, *,
         items: List[Item] = None,
@@ -41,29 +51,22 @@ class Room:
         specialCommands: List[Command] = []) -> None:
         
         self.name: ItemName = name
-        self.items: List[Item] = items or []
+        # item ID => item obj for the items the room starts with - what's in it during a game is in Game.roomItems
+        self.items: Dict[ItemName, Item] = {i.name: i for i in items or []}
         self.characters: List[Character] = characters or []
-        # dict comp does not work here SMH
-        # needs to be a dict not a Collection so it can be indexed with directions
-        self.dirs: Dict[Direction, Path] = {
-            globals.DIRS.NORTH: Path(),
-            globals.DIRS.SOUTH: Path(),
-            globals.DIRS.EAST: Path(),
-            globals.DIRS.WEST: Path(),
-            globals.DIRS.NORTHEAST: Path(),
-            globals.DIRS.NORTHWEST: Path(),
-            globals.DIRS.SOUTHEAST: Path(),
-            globals.DIRS.SOUTHWEST: Path(),
-        }
+        # one exit per direction, indexed by Direction.ordinal (ex. self.dirs[globals.DIRS.WEST.ordinal])
+        # a game that opens or closes exits changes its own copy of these, see Game._ownRoutes
+        self.dirs: List[Path] = [Room.NO_EXIT] * len(globals.DIR_LIST)
         
         # these are special things not covered by basic commands like "open toolbox" which might add a few tool related items to the room - make them available
         self.specialCommands: List[Command] = specialCommands
-        self.flags: globals.Collection[Any] = flags if flags else globals.Collection(playerHasVisited=False)
+        # what every game starts with, see Game.roomFlagsOf
+        self.flags: globals.Collection[Any] = flags if flags else RoomFlags()
     
     __str__ = __repr__ = lambda s, f='short': f'Room({s.name})'
 
 if __name__ == '__main__':
     k = Room('Kitchen')
     print(
-        k.dirs[globals.DIRS.WEST]
+        k.dirs[globals.DIRS.WEST.ordinal]
     )
\ No newline at end of file
@@ -0,0 +1,168 @@
+# pyright: reportMissingImports=false
+from __future__ import annotations
+from collections import deque
+from typing import Dict, List, Tuple
+
+from room import Room
+from gametypes import *
+import globals
+
+"""
+Getting around an island whose paths open and close with the tide - RoutePlanner has the exits every Game moves through, and
+plans the routes the "way to <room>" hint gives (see game.Game.showWay).
+
+"""
+
+# a step in a route that waits a turn instead of moving
+WAIT = 'wait'
+
+# what the route tables hold for each room at each point in the day: the Direction ordinal to go in, or one of these
+_WAIT, _HERE, _NOWHERE = 8, 9, 255
+
+class RoutePlanner:
+
+    """
+    Answers "how do I get from this room to that one, and when" for a set of rooms linked by tide-dependent Paths.
+
+    Every move and every wait takes a turn, and the exits open during a turn are the ones for the time of day it is (see
+    globals.TideClock), so routes are planned over every (room, turn of the day) - there are turnsPerTime turns in each of the
+    TimeStates in TIME.All. For every room there's a table of the first step to take towards it from every room at every turn
+    of the day, worked out backwards from it, so asking for a step is a lookup. Routes take the fewest turns.
+
+    snapshots[time.ordinal] - the layer for one time: room name => the 8 rooms its exits lead to at that time (None if closed),
+    indexed by Direction.ordinal. The Game swaps in the one for the current time, so moving is a lookup.
+    openDirs[time.ordinal] - room name => the Directions that are open at that time
+
+    step(fromRoom, toRoom, clock) - the first step from one room towards another as of clock's turn (a Direction or WAIT), None
+    if the player is already there - raises KeyError if it can't be reached
+    steps(fromRoom, toRoom, clock) - the whole list of steps, None if it can't be reached
+    roomChanged(roomName) - call after changing a room's exits, only the tables of the rooms it can get to get recomputed
+    copy() - a planner with its own copy of every room's exits, for a game that changes them (the World's is shared)
+
+    dirs[roomName] - the exits the planner works from, every Room.dirs to begin with
+    """
+
+    def __init__(self, rooms: Dict[RoomName, Room], turnsPerTime: int = globals.TURNS_PER_TIME) -> None:
+        self.rooms: Dict[RoomName, Room] = rooms
+        self.turnsPerTime: int = turnsPerTime
+        self.dirs: Dict[RoomName, List[Path]] = {name: r.dirs for name, r in rooms.items()}
+        self.names: List[RoomName] = list(rooms.keys())
+        self.index: Dict[RoomName, int] = {r: n for n, r in enumerate(self.names)}
+        self.snapshots: List[Dict[RoomName, List[Room]]] = [
+            {r: self._exitsOf(r, t) for r in self.names} for t in globals.TIME.All
+        ]
+        self.openDirs: List[Dict[RoomName, List[globals.Direction]]] = [
+            {r: [globals.DIR_LIST[n] for n, dst in enumerate(exits) if dst] for r, exits in snapshot.items()}
+            for snapshot in self.snapshots
+        ]
+        # layer => room index => [(direction ordinal, room index), ...] for every exit open at that time
+        self.layers: List[List[List[Tuple[int, int]]]] = [
+            [self._layerExits(snapshot[r]) for r in self.names] for snapshot in self.snapshots
+        ]
+        # room index => its table: for every turn of the day and every room (at [turn * len(names) + room index]), the first step
+        # towards it - a Direction ordinal, _WAIT, _HERE or _NOWHERE
+        entrances = self._entrances()
+        self.tables: List[bytearray] = [self._table(x, entrances) for x in range(len(self.names))]
+
+    def _exitsOf(self, roomName: RoomName, time: globals.TimeState) -> List[Room]:
+        return [p.room if p.accessMask & time.bit else None for p in self.dirs[roomName]]
+
+    def _layerExits(self, exits: List[Room]) -> List[Tuple[int, int]]:
+        return [(n, self.index[dst.name]) for n, dst in enumerate(exits) if dst]
+
+    # the layers the other way around: layer => room index => [(direction ordinal, room index), ...] for every exit into it
+    def _entrances(self) -> List[List[List[Tuple[int, int]]]]:
+        entrances = [[[] for _ in self.names] for _ in self.layers]
+        for t, layer in enumerate(self.layers):
+            for src, exits in enumerate(layer):
+                for dirOrdinal, dst in exits:
+                    entrances[t][dst].append((dirOrdinal, src))
+        return entrances
+
+    # the table for one room - a BFS backwards from it at every turn of the day, each step going back one turn, either through an
+    # exit that's open at that time or by waiting in place. That gives how many turns it takes to get there from anywhere; then
+    # going through them nearest first, each one takes whichever step gets one turn closer with the fewest moves after it
+    # (waiting if it's a tie), so routes don't walk back and forth when they could just wait
+    def _table(self, x: int, entrances: List[List[List[Tuple[int, int]]]]) -> bytearray:
+        size, turnsPerTime = len(self.names), self.turnsPerTime
+        turns = len(self.layers) * turnsPerTime
+        dist: List[int] = [None] * (turns * size)
+        order = [turn * size + x for turn in range(turns)]
+        for s in order:
+            dist[s] = 0
+        for s in order:
+            turn, r = divmod(s, size)
+            before = (turn - 1) % turns
+            for src in [r] + [src for _, src in entrances[before // turnsPerTime][r]]:
+                if dist[b := before * size + src] is None:
+                    dist[b] = dist[s] + 1
+                    order.append(b)
+        table = bytearray([_NOWHERE]) * (turns * size)
+        moves: List[int] = [0] * (turns * size)
+        for s in order:
+            if dist[s] == 0:
+                table[s] = _HERE
+                continue
+            turn, r = divmod(s, size)
+            row = (turn + 1) % turns * size
+            table[s], moves[s] = _WAIT, moves[row + r] if dist[row + r] == dist[s] - 1 else None
+            for dirOrdinal, dst in self.layers[turn // turnsPerTime][r]:
+                if dist[row + dst] == dist[s] - 1 and (moves[s] is None or moves[row + dst] + 1 < moves[s]):
+                    table[s], moves[s] = dirOrdinal, moves[row + dst] + 1
+        return table
+
+    def _first(self, src: int, x: int, turn: int) -> int:
+        return self.tables[x][turn * len(self.names) + src]
+
+    def step(self, fromRoom: RoomName, toRoom: RoomName, clock: globals.TideClock) -> object:
+        s = self._first(self.index[fromRoom], self.index[toRoom], clock.phase)
+        if s == _NOWHERE:
+            raise KeyError(f'{toRoom} can\'t be reached from {fromRoom}')
+        return None if s == _HERE else WAIT if s == _WAIT else globals.DIR_LIST[s]
+
+    def steps(self, fromRoom: RoomName, toRoom: RoomName, clock: globals.TideClock) -> List[object]:
+        src, x = self.index[fromRoom], self.index[toRoom]
+        turn, turns = clock.phase, len(self.layers) * self.turnsPerTime
+        steps = []
+        while (s := self._first(src, x, turn)) != _HERE:
+            if s == _NOWHERE:
+                return None
+            if s == _WAIT:
+                steps.append(WAIT)
+            else:
+                steps.append(globals.DIR_LIST[s])
+                src = self.index[self.snapshots[turn // self.turnsPerTime][self.names[src]][s].name]
+            turn = (turn + 1) % turns
+        return steps
+
+    def roomChanged(self, roomName: RoomName) -> None:
+        n, changed = self.index[roomName], False
+        starts = {n}
+        for t, time in enumerate(globals.TIME.All):
+            if (exits := self._exitsOf(roomName, time)) != self.snapshots[t][roomName]:
+                # the snapshot lists are changed in place, so a Game holding on to one sees the change
+                self.snapshots[t][roomName][:] = exits
+                self.openDirs[t][roomName][:] = [globals.DIR_LIST[d] for d, dst in enumerate(exits) if dst]
+                self.layers[t][n] = self._layerExits(exits)
+                starts.update(dst for _, dst in self.layers[t][n])
+                changed = True
+        if not changed:
+            return
+        # a route only goes through this room's exits if it goes somewhere this room can get to - before the change, or through
+        # its new exits - so only those rooms' tables change (a room that can get somewhere at one turn of the day can at every
+        # other, by waiting, so turn 0 says it all). They're replaced rather than changed in place, since a copy() may share them.
+        entrances = self._entrances()
+        for x, table in enumerate(self.tables):
+            if any(table[s] != _NOWHERE for s in starts):
+                self.tables[x] = self._table(x, entrances)
+
+    def copy(self) -> RoutePlanner:
+        other = RoutePlanner.__new__(RoutePlanner)
+        other.rooms, other.names, other.index, other.turnsPerTime = self.rooms, self.names, self.index, self.turnsPerTime
+        other.dirs = {r: list(d) for r, d in self.dirs.items()}
+        other.snapshots = [{r: list(exits) for r, exits in snapshot.items()} for snapshot in self.snapshots]
+        other.openDirs = [{r: list(dirs) for r, dirs in openDirs.items()} for openDirs in self.openDirs]
+        # roomChanged replaces the rooms' exit lists and the tables rather than changing them, so those can be shared
+        other.layers = [list(layer) for layer in self.layers]
+        other.tables = list(self.tables)
+        return other
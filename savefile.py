@@ -0,0 +1,162 @@
+# pyright: reportMissingImports=false
+from __future__ import annotations
+from typing import Any, Callable, Dict, List
+
+import globals
+
+"""
+The save format - a game's Game.snapshot() (only what changed on top of the World: where the player is, the inventory, where
+items are, room and character flags, what's for sale, where conversations are, the time) in a small binary encoding.
+
+    game.Game.save(path) / game.Game.load(path)
+
+    header      b'UTSV', then the version (varint)
+    strings     how many (varint), then each one as its utf-8 length (varint) and bytes
+    state       one value: a tag byte, then
+                    None, False, True       nothing
+                    int                     zigzag varint
+                    str                     its index in the strings (varint)
+                    list, tuple, dict       how many (varint), then the values (dicts: key, value, key, value...)
+
+Every name is only stored once, so a save is a few hundred bytes. When snapshot() changes, bump VERSION and add a migration
+that turns the old version's state into the new one's - old saves are migrated one version at a time when they're loaded.
+
+Saves from before this format (pickled Game objects, like the ones in levels/) aren't supported anymore, loading one raises
+SaveError.
+
+"""
+
+MAGIC = b'UTSV'
+VERSION = 1
+
+# version n => turns a version n state into a version n + 1 one
+MIGRATIONS: Dict[int, Callable[[Dict[str, Any]], Dict[str, Any]]] = dict()
+
+class SaveError(Exception):
+
+    """
+    The data isn't a save this version of the game can read.
+    """
+
+_NONE, _FALSE, _TRUE, _INT, _STR, _LIST, _TUPLE, _DICT = range(8)
+
+# ------- WRITING ------- #
+
+def varint(out: bytearray, n: int) -> None:
+    while n > 0x7f:
+        out.append(n & 0x7f | 0x80)
+        n >>= 7
+    out.append(n)
+
+def _value(out: bytearray, strings: Dict[str, int], v: Any) -> None:
+    if v is None:
+        out.append(_NONE)
+    elif v is True or v is False:
+        out.append(_TRUE if v else _FALSE)
+    elif (t := type(v)) is str:
+        out.append(_STR)
+        if (n := strings.get(v)) is None:
+            n = strings[v] = len(strings)
+        varint(out, n)
+    elif t is int:
+        out.append(_INT)
+        varint(out, v << 1 if v >= 0 else (-v << 1) - 1)
+    elif t is dict:
+        out.append(_DICT)
+        varint(out, len(v))
+        for k, x in v.items():
+            _value(out, strings, k)
+            _value(out, strings, x)
+    elif t is list or t is tuple:
+        out.append(_LIST if t is list else _TUPLE)
+        varint(out, len(v))
+        for x in v:
+            _value(out, strings, x)
+    else:
+        raise TypeError(f'can\'t save a {t.__name__}: {v!r}')
+
+def dumps(state: Dict[str, Any]) -> bytes:
+    strings: Dict[str, int] = dict()
+    body = bytearray()
+    _value(body, strings, state)
+    out = bytearray(MAGIC)
+    varint(out, VERSION)
+    varint(out, len(strings))
+    for s in strings:
+        b = s.encode()
+        varint(out, len(b))
+        out += b
+    return bytes(out + body)
+
+# replaces the file whole (see globals.replacing) so a crash halfway through never leaves a broken save behind
+def write(path: str, state: Dict[str, Any]) -> None:
+    with globals.replacing(path) as f:
+        f.write(dumps(state))
+
+# ------- READING ------- #
+
+class Reader:
+
+    """
+    Reads what dumps() wrote, starting at pos.
+    """
+
+    __slots__ = ('data', 'pos', 'strings')
+
+    def __init__(self, data: bytes, pos: int) -> None:
+        self.data: bytes = data
+        self.pos: int = pos
+        self.strings: List[str] = []
+
+    def varint(self) -> int:
+        n, shift = 0, 0
+        while True:
+            b = self.data[self.pos]
+            self.pos += 1
+            n |= (b & 0x7f) << shift
+            if b < 0x80:
+                return n
+            shift += 7
+
+    def value(self) -> Any:
+        tag = self.data[self.pos]
+        self.pos += 1
+        if tag == _STR:
+            return self.strings[self.varint()]
+        if tag == _INT:
+            n = self.varint()
+            return -((n + 1) >> 1) if n & 1 else n >> 1
+        if tag == _DICT:
+            return {self.value(): self.value() for _ in range(self.varint())}
+        if tag == _LIST:
+            return [self.value() for _ in range(self.varint())]
+        if tag == _TUPLE:
+            return tuple(self.value() for _ in range(self.varint()))
+        if tag <= _TRUE:
+            return (None, False, True)[tag]
+        raise SaveError(f'unknown tag {tag} at byte {self.pos - 1}')
+
+def loads(data: bytes) -> Dict[str, Any]:
+    if data[:len(MAGIC)] != MAGIC:
+        # saves used to be pickled Game objects, there's nothing in those worth migrating
+        raise SaveError('not a save file (or an old pickled one, those can\'t be loaded anymore)')
+    try:
+        r = Reader(data, len(MAGIC))
+        version = r.varint()
+        if version > VERSION:
+            raise SaveError(f'save is version {version}, this game only knows up to {VERSION}')
+        for _ in range(r.varint()):
+            n = r.varint()
+            r.strings.append(data[r.pos:r.pos + n].decode())
+            r.pos += n
+        state = r.value()
+    except (IndexError, UnicodeDecodeError) as e:
+        raise SaveError(f'save is cut off or corrupted ({e})') from e
+    while version < VERSION:
+        state = MIGRATIONS[version](state)
+        version += 1
+    return state
+
+def read(path: str) -> Dict[str, Any]:
+    with open(path, 'rb') as f:
+        return loads(f.read())
@@ -0,0 +1,150 @@
+# pyright: reportMissingImports=false
+from __future__ import annotations
+from typing import Set
+import argparse
+import asyncio
+
+from hibernate import HibernatingSessions
+from journal import Journals
+import journal
+from pool import SessionPool
+from sessions import JournaledSessions, LocalSessions
+
+"""
+Hosts games over TCP, one game per connection, all on one asyncio event loop.
+
+    python server.py --port 4000
+    python server.py --port 4000 --workers 4    (games run in 4 worker processes, see pool.py)
+    python server.py --port 4000 --memory-budget 64000000    (idle games past 64MB sleep on disk, see hibernate.py)
+    python server.py --port 4000 --journal journals/    (every game is journaled so it can be resumed, see journal.py)
+
+The protocol is plain lines: the server sends the prompt, the client sends one line of input, the server answers with the text
+that input wrote followed by the next prompt (which always ends with "\\n> "). When the game ends the connection is closed.
+
+"""
+
+# what every prompt ends with, clients can read up to this to get one whole turn
+PROMPT_END = b'\n> '
+
+class GameServer:
+
+    """
+    A line-based TCP server where every connection gets its own Game, stepped with Game.step() so no session ever waits on
+    another one's input.
+
+    sessions - runs the games, in this process by default (see sessions.py)
+    turns - how many inputs have been stepped so far
+    """
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 4000, sessions=None) -> None:
+        self.host: str = host
+        self.port: int = port
+        self.sessions = sessions if sessions is not None else LocalSessions()
+        self.turns: int = 0
+        self._nextId: int = 0
+        # the tasks handling every open connection, stop() ends them before the sessions go away
+        self._handlers: Set[asyncio.Task] = set()
+        self._server: asyncio.base_events.Server = None
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        sessionId = self._nextId
+        self._nextId += 1
+        self._handlers.add(handler := asyncio.current_task())
+        ended = False
+        try:
+            writer.write((await self.sessions.open(sessionId)).encode())
+            await writer.drain()
+            while not ended:
+                try:
+                    line = await reader.readline()
+                except ValueError:
+                    # the line was too long
+                    break
+                if not line:
+                    break
+                text, ended = await self.sessions.step(sessionId, line.decode(errors='replace').rstrip('\r\n'))
+                self.turns += 1
+                writer.write(text.encode())
+                await writer.drain()
+        except (ConnectionError, asyncio.CancelledError):
+            # CancelledError - the server is stopping
+            pass
+        finally:
+            if not ended:
+                await self.sessions.close(sessionId)
+            writer.close()
+            self._handlers.discard(handler)
+
+    async def start(self) -> None:
+        self._server = await asyncio.start_server(self.handle, self.host, self.port, backlog=4096)
+        # port 0 picks a free one
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def serveForever(self) -> None:
+        if self._server is None:
+            await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def stop(self) -> None:
+        self._server.close()
+        for handler in self._handlers:
+            handler.cancel()
+        await asyncio.gather(*self._handlers, return_exceptions=True)
+        await self._server.wait_closed()
+
+# prints the sessions' report() (if they have one) every this many seconds while it changes, and once more on the way out
+REPORT_EVERY = 10
+
+async def _reportEvery(sessions, seconds: float) -> None:
+    last = None
+    while True:
+        await asyncio.sleep(seconds)
+        if (r := sessions.report()) != last:
+            print(r, flush=True)
+            last = r
+
+async def serve(host: str, port: int, workers: int = 0, memoryBudget: int = 0, journalDir: str = None,
+        fsyncEvery: float = journal.FSYNC_EVERY) -> None:
+    sessions = None
+    if workers:
+        sessions = SessionPool(workers)
+        await sessions.start()
+    elif memoryBudget:
+        sessions = HibernatingSessions(memoryBudget)
+    elif journalDir:
+        sessions = JournaledSessions(Journals(journalDir, fsyncEvery))
+    server = GameServer(host, port, sessions)
+    await server.start()
+    print(f'serving on {server.host}:{server.port}', flush=True)
+    reporting = asyncio.create_task(_reportEvery(sessions, REPORT_EVERY)) if hasattr(sessions, 'report') else None
+    try:
+        await server.serveForever()
+    finally:
+        await server.stop()
+        if reporting:
+            reporting.cancel()
+            print(sessions.report(), flush=True)
+        if workers or memoryBudget or journalDir:
+            await sessions.stop()
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Host The Uneven Tides over TCP.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=4000, help='0 picks a free port')
+    parser.add_argument('--workers', type=int, default=0, help='run the games in this many worker processes (0 runs them here)')
+    parser.add_argument('--memory-budget', type=int, default=0,
+        help='bytes of games to keep in memory, idle ones past that sleep on disk (see hibernate.py)')
+    parser.add_argument('--journal', metavar='DIR',
+        help='journal every game to this directory so players can resume them after a crash (see journal.py)')
+    parser.add_argument('--fsync-every', type=float, default=journal.FSYNC_EVERY,
+        help='seconds between writing the journals out, a crash loses at most this much of every game')
+    args = parser.parse_args()
+    if args.workers and args.memory_budget:
+        parser.error('--memory-budget only works without --workers')
+    if args.journal and (args.workers or args.memory_budget):
+        parser.error('--journal only works without --workers and --memory-budget')
+    try:
+        asyncio.run(serve(args.host, args.port, args.workers, args.memory_budget, args.journal, args.fsync_every))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,177 @@
+# pyright: reportMissingImports=false
+from __future__ import annotations
+from typing import Any, Dict, List, Optional, Set, Tuple
+import asyncio
+import os
+import re
+import secrets
+
+import game
+from game import Game, Mode
+from journal import Journals
+
+"""
+Where a server's games are run. GameServer only talks to a sessions object - this module's LocalSessions runs them in the
+server process, pool.SessionPool spreads them over worker processes - and both have the same (async) methods:
+
+    open(sessionId) - starts a game, returns its opening text up to and including the first prompt
+    step(sessionId, text) - one input, returns (what it wrote plus the next prompt, whether the game ended)
+    close(sessionId) - throws a game away, ex. when the player disconnects
+
+JournaledSessions is LocalSessions that journals every game, so players can pick them back up after a crash.
+
+"""
+
+# the text a new game starts with, followed by its first prompt
+def openText(g: Game) -> str:
+    if not (game.DEBUGGING or game.SKIP_INTRO):
+        g.title()
+    g.output.flush()
+    return g.output.take() + g.prompt()
+
+# steps g, returns what it wrote plus the next prompt (just a newline once it's over) and whether it's over
+def stepText(g: Game, text: str) -> Tuple[str, bool]:
+    out = g.step(text)
+    if g.mode is Mode.ENDED:
+        return out + '\n', True
+    return out + g.prompt(), False
+
+# stepText for many games at once, see game.stepMany - an input that raises gets the exception instead
+def stepTexts(inputs: List[Tuple[Game, str]]) -> List[Any]:
+    outs: List[Any] = [None] * len(inputs)
+    pending = range(len(inputs))
+    while pending:
+        # the prompt comes from the state right after each input, so a game's next input waits for the next stepMany
+        wave, later, seen = [], [], set()
+        for n in pending:
+            g = inputs[n][0]
+            (later if id(g) in seen else wave).append(n)
+            seen.add(id(g))
+        pending = later
+        for n, out in zip(wave, game.stepMany([inputs[n] for n in wave], returnExceptions=True)):
+            g = inputs[n][0]
+            if isinstance(out, Exception):
+                outs[n] = out
+            else:
+                outs[n] = (out + '\n', True) if g.mode is Mode.ENDED else (out + g.prompt(), False)
+    return outs
+
+class LocalSessions:
+
+    """
+    Runs every game in this process, on the server's event loop. The inputs that come in during one pass of the loop are
+    stepped together (see stepTexts).
+
+    games - session id => Game
+    """
+
+    def __init__(self) -> None:
+        self.games: Dict[int, Game] = dict()
+        # (game, input, the future its output goes to) for every input waiting to be stepped
+        self._batch: List[Tuple[Game, str, asyncio.Future]] = []
+
+    async def open(self, sessionId: int) -> str:
+        g = self.games[sessionId] = Game(start=False)
+        return openText(g)
+
+    async def step(self, sessionId: int, text: str) -> Tuple[str, bool]:
+        loop = asyncio.get_running_loop()
+        if not self._batch:
+            loop.call_soon(self._stepBatch)
+        future = loop.create_future()
+        self._batch.append((self.games[sessionId], text, future))
+        out, ended = await future
+        if ended:
+            self.games.pop(sessionId, None)
+        return out, ended
+
+    def _stepBatch(self) -> None:
+        batch, self._batch = self._batch, []
+        for (_, _, future), out in zip(batch, stepTexts([(g, text) for g, text, _ in batch])):
+            if future.done():
+                continue
+            if isinstance(out, Exception):
+                future.set_exception(out)
+            else:
+                future.set_result(out)
+
+    async def close(self, sessionId: int) -> None:
+        self.games.pop(sessionId, None)
+
+    def __len__(self) -> int:
+        return len(self.games)
+
+class JournaledSessions(LocalSessions):
+
+    """
+    LocalSessions that journals every game to a Journals directory (see journal.py). Each game gets a resume token of its own
+    - a random one, only ever shown to its player - and sending "resume <token>" as the first input picks that game back up
+    instead (ex. after the player lost their connection, or the server crashed), as long as no other session is playing it.
+    The journal is kept under its token, so tokens still work after the server restarts.
+
+    A journal is deleted when its game ends, and kept when the player disconnects so it can be resumed.
+
+    stop() - writes out every journal, call when the server shuts down
+    """
+
+    RESUME = re.compile(r'resume ([A-Za-z0-9_-]+)', re.IGNORECASE)
+    # random bytes in a token, it's a third longer in text
+    TOKEN_BYTES = 12
+
+    def __init__(self, journals: Journals) -> None:
+        super().__init__()
+        self.journals: Journals = journals
+        # session id => its game's resume token, which is also its journal's key
+        self.tokens: Dict[int, str] = dict()
+        # sessions that haven't had an input yet, so can still resume
+        self._fresh: Set[int] = set()
+        self._flusher: Optional[asyncio.Task] = None
+
+    async def open(self, sessionId: int) -> str:
+        if self._flusher is None:
+            self._flusher = asyncio.get_running_loop().create_task(self.journals.run())
+        text = await super().open(sessionId)
+        token = self.tokens[sessionId] = secrets.token_urlsafe(JournaledSessions.TOKEN_BYTES)
+        self.journals.open(token, self.games[sessionId])
+        self._fresh.add(sessionId)
+        return f'(if you get disconnected, type "resume {token}" first thing to pick this game back up)\n' + text
+
+    async def step(self, sessionId: int, text: str) -> Tuple[str, bool]:
+        if sessionId in self._fresh:
+            self._fresh.discard(sessionId)
+            if (m := JournaledSessions.RESUME.fullmatch(text.strip())):
+                return await self._resume(sessionId, m.group(1))
+        out, ended = await super().step(sessionId, text)
+        token = self.tokens[sessionId]
+        if ended:
+            del self.tokens[sessionId]
+            self.journals.close(token, remove=True)
+        else:
+            self.journals.get(token).record(self.games[sessionId], text)
+        return out, ended
+
+    async def _resume(self, sessionId: int, token: str) -> Tuple[str, bool]:
+        g = self.games[sessionId]
+        path = self.journals.pathOf(token)
+        # the journal may have only just been closed, wait for it to be written out
+        await asyncio.wrap_future(self.journals.flush())
+        # unknown and in-use tokens get the same answer, so it can't be used to find out which games are being played
+        if token in self.journals.journals or not os.path.exists(path):
+            return 'There\'s no game to pick back up with that token.\n' + g.prompt(), False
+        g = self.games[sessionId] = Game.recover(path)
+        # the game carries on in the resumed journal, the new one is thrown away
+        self.journals.close(self.tokens[sessionId], remove=True)
+        self.tokens[sessionId] = token
+        self.journals.open(token, g)
+        return 'Picked your game back up.\n' + g.prompt(), False
+
+    async def close(self, sessionId: int) -> None:
+        await super().close(sessionId)
+        self._fresh.discard(sessionId)
+        if (token := self.tokens.pop(sessionId, None)) is not None:
+            self.journals.close(token)
+
+    async def stop(self) -> None:
+        if self._flusher:
+            self._flusher.cancel()
+        await asyncio.get_running_loop().run_in_executor(None, self.journals.shutdown)
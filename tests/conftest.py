@@ -0,0 +1,28 @@
+# pyright: reportMissingImports=false
+from typing import Callable, List
+import os
+import random
+import sys
+
+import pytest
+
+# the game's modules are at the top of the repo, not in a package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+"""
+Shared by the tests - run them from the top of the repo with `python -m pytest -q`.
+
+"""
+
+# what the random players pick from - everything but help, which picks its suggestions at random
+INPUTS = [
+    'n', 's', 'e', 'w', 'ne', 'nw', 'se', 'sw', 'go up', 'look', 'look around', 'wait', 'inventory', 'asdf',
+    'take dull rock', 'drop dull rock', 'take shiny rock', 'drop shiny rock', 'look at dull rock', 'use dull rock',
+    'talk to old man', 'how are you doing', 'where am i', 'where is the beach', 'what\'s for sale', 'sell dull rock', 'bye',
+    'way to northeast coast', 'way to shipwreck', 'settings', 'return',
+]
+
+# inputs(seed, n) - n inputs picked at random (but always the same ones for a seed)
+@pytest.fixture
+def inputs() -> Callable[[int, int], List[str]]:
+    return lambda seed, n: random.Random(seed).choices(INPUTS, k=n)
@@ -0,0 +1,78 @@
+# pyright: reportMissingImports=false
+import pytest
+
+from character import Character, CharacterAttrs, DialogOption
+from game import Game
+import game
+import globals
+
+MESSAGES = ['how are you doing?', 'hi', 'where am i', '  where are we  ', 'what\'s on the beach', 'what\'s for sale',
+    'sell dull rock', 'sell laptop', 'buy laptop', 'bye', ' goodbye ', 'asdf', '', 'where am i bye']
+
+# what talking did before DialogState - the first option, then failsafe, whose own pattern matches the whole message
+def firstMatch(state, message):
+    return next((n for n, c in enumerate(state.choices) if c.pattern.fullmatch(message.strip())), None)
+
+def chosen(state, message):
+    m = state.pattern.fullmatch(message.strip())
+    return state.groupIndex[m.lastgroup] if m else None
+
+def option(name, pattern, newOptions, **kwargs):
+    return DialogOption(name, repr=name, pattern=pattern, response=name, newOptions=newOptions, **kwargs)
+
+# options that overlap, with groups of their own, so the combined pattern has to back out of an option that only matches a prefix
+def sample():
+    return Character('Tester',
+        messages=globals.Collection(),
+        attrs=CharacterAttrs(),
+        options=[
+            option('A', r'(ab)(c)?', ['B'], unchanged=True),
+            option('B', r'(a)(b)cd', ['C']),
+            option('C', r'a.*', ['A'], hidden=True),
+        ],
+        failsafes=[option('Unknown', r'.*', ['A', 'C'])],
+        startingOptions=['A', 'B', 'C'],
+        commands=[],
+        itemsForSale={})
+
+@pytest.mark.parametrize('message', MESSAGES)
+def testSameChoiceAsTryingEachOption(message):
+    for state in game.buildWorld().characters['Old Man'].states.values():
+        assert chosen(state, message) == firstMatch(state, message)
+
+@pytest.mark.parametrize('message', ['ab', 'abc', 'abcd', 'abcde', 'a', 'b', ' abcd ', ''])
+def testGroupsInsideOptions(message):
+    for state in sample().states.values():
+        assert chosen(state, message) == firstMatch(state, message)
+
+def testStatesAreShared():
+    c = sample()
+    assert set(c.states) == {('A', 'B', 'C'), ('C',), ('A',), ('A', 'C')}
+    assert c.getState(['A', 'B', 'C']) is c.startState
+    for state in c.states.values():
+        assert len(state.transitions) == len(state.choices)
+        for n, next in enumerate(state.transitions):
+            assert next is None or next is c.states[tuple(state.choices[n].newOptions)]
+
+def testRendered():
+    bold, normal = globals.FORMATTING.bold, globals.FORMATTING.normal
+    c = sample()
+    assert c.startState.rendered == f'[ {bold}A{normal} / {bold}B{normal} ]'
+    assert c.states[('C',)].rendered == '[ ' + bold + normal + ' ]'
+
+def testTransitions():
+    c = sample()
+    g = Game(start=False)
+    s = c.newState()
+    assert s.talkTo(' ab ', g) == 'A'
+    # unchanged
+    assert s.state is c.startState
+    assert s.talkTo('abcd', g) == 'B'
+    assert s.currentOptions == ('C',)
+    assert s.talkTo('a', g) == 'C'
+    assert s.currentOptions == ('A',)
+    # failsafes always move on
+    assert s.talkTo('abcd', g) == 'Unknown'
+    assert s.currentOptions == ('A', 'C')
+    assert s.talkTo('abc', g) == 'A'
+    assert s.currentOptions == ('A', 'C')
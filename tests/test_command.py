@@ -0,0 +1,57 @@
+# pyright: reportMissingImports=false
+import pytest
+
+from command import Command, CommandIndex
+from game import Game, Mode
+from conftest import INPUTS
+import globals
+
+# what matching used to be: every inventory command, then every room command, then every global one, in order
+def firstMatch(g, text):
+    for commands in (g.getInvCommands(), g.getCurrRoomCommands(), g.commands):
+        for c in commands.values():
+            if c.pattern.fullmatch(text):
+                return c
+    return None
+
+EXTRA = ['take rock', 'use dull rock on shiny rock', 'use dull rock', 'pick up dull rock', 'grab the dull rock', 'look at rock',
+    'go up', 'go north', 'north', 'talk to', 'talk to sadim', 'way to', 'way to narnia', 'help me', 'check inventory', 'TAKE DULL ROCK']
+
+@pytest.mark.parametrize('seed', range(10))
+def testSameAsTryingEveryCommand(inputs, seed):
+    g = Game(start=False)
+    for text in inputs(seed, 80):
+        if g.mode is Mode.PLAY:
+            for t in INPUTS + EXTRA:
+                assert g.matchCommand(globals.parse(t)) is firstMatch(g, t), t
+        g.step(text)
+
+def testUnknownCommandIsLast():
+    g = Game(start=False)
+    assert g.matchCommand(globals.parse('asdf')).name == 'Unknown Command'
+    assert g.matchCommand(globals.parse('go up')).name == 'Unknown Direction'
+    assert g.matchCommand(globals.parse('take the moon')).name == 'Unknown Item'
+
+def testInventoryBeforeRoom():
+    g = Game(start=False)
+    g.step('take dull rock')
+    # the same pattern is in the inventory's and the room's commands, the inventory wins
+    room = Command('Room Rock', pattern='drop dull rock', onCall=lambda g: None, keys=['DropItem'])
+    g.currentRoom.specialCommands.append(room)
+    try:
+        g.commandsChanged()
+        assert g.matchCommand(globals.parse('drop dull rock')).name == 'Drop Dull Rock'
+    finally:
+        g.currentRoom.specialCommands.remove(room)
+        g.commandsChanged()
+
+def testCandidatesKeepTheOrder():
+    a = Command('A', pattern='look( around)?', onCall=None, keys=['LookAround'])
+    b = Command('B', pattern='anything', onCall=None)
+    c = Command('C', pattern='look at .*', onCall=None, keys=['InspectItem'])
+    index = CommandIndex([a, b, c])
+    assert index.candidates(set()) == [b]
+    assert index.candidates({'LookAround'}) == [a, b]
+    assert index.candidates({'InspectItem', 'LookAround'}) == [a, b, c]
+    # keys no command has still get the unkeyed ones
+    assert index.candidates({'TakeItem'}) == [b]
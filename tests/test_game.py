@@ -0,0 +1,45 @@
+# pyright: reportMissingImports=false
+import random
+
+import pytest
+
+from conftest import INPUTS
+from game import Game
+import game
+import sessions
+
+# INPUTS plus inputs that only differ in case and spaces, which are matched once for all of them
+MORE = INPUTS + ['LOOK', ' Take Dull Rock ', 'Look  ']
+# and a way to end the game
+ENDING = MORE + ['exit', 'n', 'y']
+
+GAMES = 8
+
+# n inputs in batches, each a random mix of GAMES games - the same game can be in a batch more than once
+def batches(seed, n, vocabulary=MORE):
+    r = random.Random(seed)
+    while n > 0:
+        size = min(n, r.randint(1, 3 * GAMES))
+        n -= size
+        yield [(r.randrange(GAMES), r.choice(vocabulary)) for _ in range(size)]
+
+@pytest.mark.parametrize('seed', range(10))
+def testStepManySameAsStep(seed):
+    batched = [Game(start=False) for _ in range(GAMES)]
+    single = [Game(start=False) for _ in range(GAMES)]
+    for batch in batches(seed, 1000):
+        outs = game.stepMany([(batched[n], text) for n, text in batch])
+        assert outs == [single[n].step(text) for n, text in batch]
+    for b, s in zip(batched, single):
+        assert b.snapshot() == s.snapshot()
+
+@pytest.mark.parametrize('seed', range(5))
+def testStepTextsSameAsStepText(seed):
+    batched = [Game(start=False) for _ in range(GAMES)]
+    single = [Game(start=False) for _ in range(GAMES)]
+    ended = 0
+    for batch in batches(seed, 400, ENDING):
+        outs = sessions.stepTexts([(batched[n], text) for n, text in batch])
+        assert outs == [sessions.stepText(single[n], text) for n, text in batch]
+        ended += sum(e for _, e in outs)
+    assert ended > 0
@@ -0,0 +1,78 @@
+# pyright: reportMissingImports=false
+import pytest
+
+from game import Game
+import globals
+
+@pytest.mark.parametrize('text, keys', [
+    ('pick up rock', {'TakeItem'}),
+    ('look at the dull rock', {'LookAround', 'InspectItem'}),
+    ('look', {'LookAround'}),
+    ('Go NE', {'Move', 'Northeast'}),
+    ('ne', {'Northeast'}),
+    ('go ne now', {'Move'}),
+    ('way to the cove', {'WayTo'}),
+    ('asdf', set()),
+    ('', set()),
+])
+def testParse(text, keys):
+    intent = globals.parse(text)
+    assert intent.text == text
+    assert intent.keys == keys
+
+# every keyword the input starts with is found, the same as checking each keyword pattern on its own
+@pytest.mark.parametrize('text', ['take rock', 'grab the lamp', 'use rock on lamp', 'talk to old man', 'look around', 'wait',
+    'sell rock', 'way back to cove', 'drop it', 'inspect', 'go', 'quit game'])
+def testParseFindsEveryKeyword(text):
+    expected = {name for name, phrases in globals.STR_KEYWORDS.items() if phrases and any(text.startswith(p) for p in phrases)}
+    assert globals.parse(text).keys == expected
+
+# what TideClock.turnsUntil replaced - advancing one turn at a time until it's one of the times
+def stepUntil(clock, times):
+    c = globals.TideClock(globals.TIME.All[clock.startIndex], clock.turnsPerTime, clock.turn)
+    for k in range(len(globals.TIME.All) * clock.turnsPerTime):
+        if c.time in times:
+            return k
+        c.advance()
+    return None
+
+MASKS = [[], globals.TIME.LowTide, globals.TIME.HighTide, globals.TIME.All, [globals.TIME.START],
+    [globals.TIME.All[1], globals.TIME.All[5]], globals.TIME.All[2:7]]
+
+@pytest.mark.parametrize('turnsPerTime', [1, 3, globals.TURNS_PER_TIME])
+@pytest.mark.parametrize('start', globals.TIME.All)
+def testTurnsUntil(start, turnsPerTime):
+    for turn in range(len(globals.TIME.All) * turnsPerTime * 2 + 1):
+        clock = globals.TideClock(start, turnsPerTime, turn)
+        for times in MASKS:
+            k = clock.turnsUntil(times)
+            assert k == stepUntil(clock, times)
+            assert (k == 0) == (clock.time in times)
+            time = clock.waitUntil(times)
+            assert clock.turn == turn + (k or 0)
+            if times:
+                assert time in times
+            clock.turn = turn
+
+@pytest.mark.parametrize('turnsPerTime', [1, 3, globals.TURNS_PER_TIME])
+@pytest.mark.parametrize('start', globals.TIME.All)
+def testAtAndPhase(start, turnsPerTime):
+    clock = globals.TideClock(start, turnsPerTime)
+    day = len(globals.TIME.All) * turnsPerTime
+    for turn in range(day * 2):
+        assert clock.at(turn) is clock.at(turn + day)
+        clock.turn = turn
+        assert clock.at(turn) is clock.time
+        assert 0 <= clock.phase < day
+        # the phase says where in TIME.All it is, whatever the clock started at
+        assert globals.TIME.All[clock.phase // turnsPerTime] is clock.time
+        assert clock.advance(turnsPerTime) is clock.at(turn + turnsPerTime)
+
+def testEveryGameHasItsOwnClock():
+    a, b = Game(start=False), Game(start=False)
+    assert a.clock is not b.clock
+    for _ in range(a.config.TURNS_PER_TIME):
+        a.step('wait')
+    assert a.clock.turn == a.config.TURNS_PER_TIME and b.clock.turn == 0
+    assert a.time is globals.TIME.All[globals.TIME.START.ordinal + 1]
+    assert b.time is globals.TIME.START
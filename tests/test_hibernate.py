@@ -0,0 +1,115 @@
+# pyright: reportMissingImports=false
+import asyncio
+import random
+import time
+
+import pytest
+
+from conftest import INPUTS
+from game import Game
+from hibernate import HibernatingSessions, SessionFile
+from sessions import LocalSessions
+
+def run(test):
+    asyncio.run(asyncio.wait_for(test(), 60))
+
+# a session manager where only one game fits in memory
+def tiny():
+    return HibernatingSessions(memoryBudget=1, sessionBytes=1)
+
+def testSlowDiskOnlyHoldsUpItsSession():
+    async def test():
+        sessions = tiny()
+        await sessions.open(1)
+        await sessions.open(2)
+        assert sessions.sleeping == {1}
+        read = sessions._read
+        def slowRead(sessionId):
+            time.sleep(0.5)
+            return read(sessionId)
+        sessions._read = slowRead
+        waking = asyncio.ensure_future(sessions.step(1, 'look'))
+        await asyncio.sleep(0.05)
+        start = time.perf_counter()
+        await sessions.step(2, 'look')
+        assert time.perf_counter() - start < 0.25
+        assert not waking.done()
+        await waking
+        await sessions.stop()
+    run(test)
+
+def testInputsWhileWakingUp():
+    async def test():
+        sessions, local = tiny(), LocalSessions()
+        for s in (1, 2):
+            await sessions.open(s)
+            await local.open(s)
+        inputs = ['look', 'take dull rock', 'inventory']
+        got = await asyncio.gather(*[sessions.step(1, text) for text in inputs])
+        assert got == [await local.step(1, text) for text in inputs]
+        await sessions.stop()
+    run(test)
+
+@pytest.mark.parametrize('seed', range(3))
+def testSameAsLocalSessions(seed):
+    async def test():
+        r = random.Random(seed)
+        # room for 3 of the 10 games
+        sessions, local = HibernatingSessions(memoryBudget=3, sessionBytes=1), LocalSessions()
+        for s in range(10):
+            assert await sessions.open(s) == await local.open(s)
+        assert len(sessions.games) == 3 and len(sessions) == 10
+        stepped = 0
+        for _ in range(100):
+            # some inputs on their own, some together in one batch
+            batch = [(r.randrange(10), r.choice(INPUTS)) for _ in range(r.choice([1, 1, 5]))]
+            got = await asyncio.gather(*[sessions.step(s, text) for s, text in batch])
+            assert got == [await local.step(s, text) for s, text in batch]
+            assert len(sessions.games) <= 3
+            stepped += len(batch)
+        assert sessions.hits + sessions.misses == stepped
+        # every wake-up is a miss, but inputs that wait on the same wake-up are misses too
+        wakeUps = len(sessions.restoreTimes)
+        assert 0 < wakeUps <= sessions.misses
+        assert sessions.evictions - wakeUps == len(sessions.sleeping)
+        assert 'restore latency' in sessions.report()
+        await sessions.stop()
+        # the file is only up to date once the background thread is done
+        assert len(sessions.asleep) == len(sessions.sleeping) == 7
+    run(test)
+
+def testClosingASleepingSession():
+    async def test():
+        sessions = tiny()
+        await sessions.open(1)
+        await sessions.open(2)
+        await sessions.close(1)
+        assert len(sessions) == 1 and not sessions.sleeping
+        with pytest.raises(KeyError):
+            await sessions.step(1, 'look')
+        await sessions.stop()
+        assert 1 not in sessions.asleep
+    run(test)
+
+def testSessionFile(monkeypatch):
+    monkeypatch.setattr(SessionFile, 'MIN_COMPACT', 1000)
+    f = SessionFile()
+    r = random.Random(0)
+    latest = dict()
+    for _ in range(2000):
+        sessionId = r.randrange(20)
+        if r.random() < 0.1:
+            f.pop(sessionId)
+            latest.pop(sessionId, None)
+        else:
+            blob = latest[sessionId] = r.randbytes(r.randrange(1, 100))
+            f.put(sessionId, blob)
+            # it's rewritten once it's more than half old blobs
+            assert f.end < SessionFile.MIN_COMPACT or f.end <= 2 * f.live
+        assert f.live == sum(len(b) for b in latest.values())
+    assert len(f) == len(latest)
+    assert {s: f.get(s) for s in latest} == latest
+    f.compact()
+    assert f.end == f.live
+    assert {s: f.get(s) for s in latest} == latest
+    f.close()
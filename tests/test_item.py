@@ -0,0 +1,62 @@
+# pyright: reportMissingImports=false
+import asyncio
+import json
+
+import pytest
+
+from game import Game
+from hibernate import HibernatingSessions
+import game
+import level
+
+def built(world):
+    return {name for name, i in world.items.items() if i._commandTables is not None}
+
+def testTablesAreBuiltWhenItemsShowUp():
+    world = game.buildWorld()
+    assert built(world) == set()
+    g = Game(start=False, world=world)
+    g.step('look')
+    assert built(world) == {'Dull Rock'}
+
+@pytest.mark.parametrize('seed', range(5))
+def testReleasingChangesNothing(inputs, seed):
+    plain = Game(start=False, world=game.buildWorld())
+    world = game.buildWorld()
+    released = Game(start=False, world=world)
+    for text in inputs(seed, 150):
+        for i in world.items.values():
+            i.releaseCommands()
+        released.commandsChanged()
+        assert released.step(text) == plain.step(text)
+
+def testSleepingReleasesWhatNoOneSees():
+    async def run():
+        sessions = HibernatingSessions(memoryBudget=1, sessionBytes=1)
+        await sessions.open(1)
+        for text in ['take dull rock', 'sell dull rock', 'bye']:
+            await sessions.step(1, text)
+        world = sessions.games[1].world
+        assert 'Shiny Rock' in sessions.games[1].inventory
+        # session 1 goes to sleep, and nothing session 2 can see is the shiny rock
+        await sessions.open(2)
+        assert list(sessions.games) == [2]
+        assert 'Shiny Rock' not in built(world)
+        out, _ = await sessions.step(1, 'look at shiny rock')
+        assert 'very shiny' in out
+    asyncio.run(run())
+
+def testMessagesAreTheItems():
+    world = game.buildWorld()
+    rock = world.items['Dull Rock']
+    rock.messages.onTake = 'Got it.'
+    assert world.itemMessages.get('Dull Rock', 'onTake') == 'Got it.'
+
+def testMissingMessagesAreFilledIn():
+    with open(game.LEVEL_PATH, 'rb') as f:
+        data = json.loads(f.read())
+    data['items']['Dull Rock']['messages'].pop('onInspect')
+    with pytest.warns(UserWarning, match='onInspect'):
+        world = level.build(data)
+    assert world.itemMessages.missing == [('Dull Rock', 'onInspect')]
+    assert world.items['Dull Rock'].messages.onInspect == 'This dull rock appears to be a regular dull rock'
@@ -0,0 +1,101 @@
+# pyright: reportMissingImports=false
+import asyncio
+import re
+
+import pytest
+
+from game import Game
+from journal import Journal, Journals
+from savefile import SaveError
+from sessions import JournaledSessions
+import journal
+
+def play(path, inputs, snapshotEvery):
+    g = Game(start=False)
+    j = Journal(path, snapshotEvery)
+    j.start(g)
+    for text in inputs:
+        g.step(text)
+        j.record(g, text)
+    j.flush()
+    return g, j
+
+@pytest.mark.parametrize('snapshotEvery', [1, 7, 50, 1000])
+@pytest.mark.parametrize('seed', range(5))
+def testRecoverPicksUpWhereItWas(tmp_path, inputs, seed, snapshotEvery):
+    path = str(tmp_path / 'game.journal')
+    g, j = play(path, inputs(seed, 120), snapshotEvery)
+    recovered = Game.recover(path)
+    assert recovered.snapshot() == g.snapshot()
+    for text in inputs(seed + 1000, 30):
+        assert recovered.step(text) == g.step(text)
+    j.close()
+
+def testInputsAfterTheLastSnapshot(tmp_path, inputs):
+    path = str(tmp_path / 'game.journal')
+    played = inputs(0, 17)
+    play(path, played, 5)
+    state, after = journal.read(path)
+    assert after == played[15:]
+
+def testTornTailIsLeftOut(tmp_path, inputs):
+    path = str(tmp_path / 'game.journal')
+    played = inputs(1, 10)
+    play(path, played, 1000)
+    with open(path, 'rb') as f:
+        data = f.read()
+    # everything up to the last input, and some of it
+    last = len(played[-1].encode()) + 2
+    for cut in range(1, last):
+        with open(path, 'wb') as f:
+            f.write(data[:-cut])
+        assert journal.read(path)[1] == played[:-1]
+
+def testNoSnapshot(tmp_path):
+    path = tmp_path / 'game.journal'
+    path.write_bytes(b'')
+    with pytest.raises(SaveError):
+        journal.read(str(path))
+
+def testCloseRemoves(tmp_path, inputs):
+    path = tmp_path / 'game.journal'
+    g, j = play(str(path), inputs(2, 5), 1000)
+    j.close(remove=True)
+    assert list(tmp_path.iterdir()) == []
+
+def testJournalsWriteInTheBackground(tmp_path, inputs):
+    journals = Journals(str(tmp_path), snapshotEvery=7)
+    g = Game(start=False)
+    journals.open('abc', g)
+    for text in inputs(3, 20):
+        g.step(text)
+        journals.get('abc').record(g, text)
+    journals.flush().result()
+    assert Game.recover(journals.pathOf('abc')).snapshot() == g.snapshot()
+    journals.shutdown()
+    assert [p.name for p in tmp_path.iterdir()] == ['abc.journal']
+
+def testResume(tmp_path):
+    async def run():
+        sessions = JournaledSessions(Journals(str(tmp_path), fsyncEvery=0.05))
+        opening = await sessions.open(1)
+        token = re.search(r'"resume (\S+)"', opening).group(1)
+        for text in ['look', 'take dull rock', 'n']:
+            await sessions.step(1, text)
+        before = sessions.games[1].snapshot()
+        await sessions.close(1)
+        # someone else can't pick it up with a made up token
+        await sessions.open(2)
+        out, _ = await sessions.step(2, 'resume ' + token.swapcase())
+        assert out.startswith('There\'s no game')
+        # the player can
+        await sessions.open(3)
+        out, _ = await sessions.step(3, f'resume {token}')
+        assert out.startswith('Picked your game back up.')
+        assert sessions.games[3].snapshot() == before
+        # but not twice at once
+        await sessions.open(4)
+        out, _ = await sessions.step(4, f'resume {token}')
+        assert out.startswith('There\'s no game')
+        await sessions.stop()
+    asyncio.run(run())
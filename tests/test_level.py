@@ -0,0 +1,112 @@
+# pyright: reportMissingImports=false
+import copy
+import json
+import shutil
+import warnings
+
+import pytest
+
+from level import LevelError
+import game
+import gametypes
+import level
+
+with open(game.LEVEL_PATH, 'rb') as f:
+    SHIPPED = json.loads(f.read())
+
+def testShippedLevelIsFine():
+    assert level.check(SHIPPED) == []
+
+def changed(change):
+    data = copy.deepcopy(SHIPPED)
+    change(data)
+    return level.check(data)
+
+def oldMan(data):
+    return data['characters']['Old Man']
+
+@pytest.mark.parametrize('change, problem', [
+    (lambda d: d['links'].append(['Cove', 'East', 'Atlantis']), "there's no room 'Atlantis'"),
+    (lambda d: d['links'].append(['Cove', 'Up', 'Field']), "unknown direction 'Up'"),
+    (lambda d: d['links'].append(['Cove', 'Up', 'Field', 'Teatime']), "unknown time 'Teatime'"),
+    (lambda d: d['links'].append(['Northeast Coast', 'South', 'Field']), 'already has a south exit'),
+    (lambda d: d.update(start='Atlantis'), "there's no room 'Atlantis'"),
+    (lambda d: d['rooms']['Cove'].update(messages={'onEnter': 'You reached the cove. '}), "'onLook' is missing"),
+    (lambda d: d['rooms']['Cove'].update(messages={'onSing': 'La. '}), "unknown message 'onSing'"),
+    (lambda d: d['rooms']['Cove'].update(items=['Dull Rock']), "item 'Dull Rock' already starts in"),
+    (lambda d: d['rooms']['Cove'].update(items=['Blue Rock']), "there's no item 'Blue Rock'"),
+    (lambda d: d['rooms']['Northwest Coast']['messages'].update(onLook={'if': 'raining', 'then': 'a', 'else': 'b'}),
+        "unknown test 'raining'"),
+    (lambda d: d['items']['Dull Rock'].update(aliases='dull (rock'), 'bad pattern'),
+    (lambda d: d['items']['Dull Rock'].update(aliases='{Dance} rock'), 'unknown keyword {Dance}'),
+    (lambda d: d['items']['Dull Rock']['attrs'].update(canCarry=1), 'should be a bool, not 1'),
+    (lambda d: d['items']['Dull Rock']['onCalls'].update(use=['explode']), "unknown action 'explode'"),
+    (lambda d: d['items']['Dull Rock']['onCalls'].update(use=['say']), 'say takes 1 argument(s)'),
+    (lambda d: d['items']['Dull Rock'].update(colour='grey'), "unknown field 'colour'"),
+    (lambda d: d['items']['Dull Rock']['onCalls'].update(use=['itemMessage', 'Dull Rock', 'onFly']), "Dull Rock has no 'onFly' message"),
+    (lambda d: oldMan(d)['commands'][2].update(onCall=['itemMessage', 'Shiny Rock', 'onFly']), "Shiny Rock has no 'onFly' message"),
+    (lambda d: oldMan(d)['options'].append(dict(oldMan(d)['options'][0])), "there's already an option called 'Greeting'"),
+    (lambda d: oldMan(d)['startingOptions'].append('Weather'), "there's no option 'Weather'"),
+    (lambda d: oldMan(d)['itemsForSale'].update({'Dull Rock': 'Gold Rock'}), "there's no item 'Gold Rock'"),
+    (lambda d: oldMan(d)['commands'][0].update(keys=['Yell']), "there's no keyword 'Yell'"),
+    (lambda d: oldMan(d)['commands'][2].update(passesTime='no'), 'should be a bool, not "no"'),
+    (lambda d: oldMan(d)['commands'][0].pop('onCall'), "'onCall' is missing"),
+])
+def testProblems(change, problem):
+    problems = changed(change)
+    assert any(problem in p for p in problems), problems
+
+def testItemMessagesFilledInAreFine():
+    def change(d):
+        d['items']['Dull Rock']['messages'].pop('onInspect')
+        d['items']['Dull Rock']['onCalls'].update(use=['itemMessage', 'Dull Rock', 'onInspect'])
+    assert changed(change) == []
+
+def testRoomsWithoutMessagesAreFine():
+    assert changed(lambda d: d['rooms']['Shipwreck'].pop('messages')) == []
+
+def testEveryProblemIsListed():
+    def change(d):
+        d['links'].append(['Cove', 'East', 'Atlantis'])
+        d['items']['Dull Rock']['attrs'].update(canCarry=1)
+    assert len(changed(change)) == 2
+
+def testParse():
+    with pytest.raises(LevelError, match='isn\'t valid JSON'):
+        level.parse('bad.json', b'{"name": ')
+    data = copy.deepcopy(SHIPPED)
+    data['start'] = 'Atlantis'
+    with pytest.raises(LevelError, match='1 problem'):
+        level.parse('bad.json', json.dumps(data).encode())
+
+def testLoadCompilesOnce(tmp_path):
+    path = str(tmp_path / 'tides.json')
+    shutil.copy(game.LEVEL_PATH, path)
+    first = level.load(path)
+    compiled = [p.name for p in tmp_path.iterdir() if p.name.endswith('.compiled')]
+    assert len(compiled) == 1
+    with warnings.catch_warnings():
+        warnings.simplefilter('error')
+        second = level.load(path)
+    assert sorted(second.rooms) == sorted(first.rooms)
+    assert sorted(second.items) == sorted(first.items)
+
+def testLoadReplacesOldCompiledFiles(tmp_path):
+    path = tmp_path / 'tides.json'
+    shutil.copy(game.LEVEL_PATH, path)
+    level.load(str(path))
+    data = json.loads(path.read_bytes())
+    data['name'] = 'The Even Tides'
+    path.write_text(json.dumps(data))
+    level.load(str(path))
+    compiled = [p.name for p in tmp_path.iterdir() if p.name.endswith('.compiled')]
+    assert compiled == [level.compiledPath(str(path), path.read_bytes()).rsplit('/', 1)[1]]
+
+def testCompiledPathCoversTheCode(tmp_path, monkeypatch):
+    source = b'{}'
+    before = level.compiledPath('tides.json', source)
+    # the namedtuples a compiled level holds come from gametypes
+    changed = tmp_path / 'gametypes.py'
+    changed.write_bytes(open(gametypes.__file__, 'rb').read() + b'\n# changed\n')
+    monkeypatch.setattr(gametypes, '__file__', str(changed))
+    assert level.compiledPath('tides.json', source) != before
@@ -0,0 +1,44 @@
+# pyright: reportMissingImports=false
+import json
+
+import pytest
+
+from item import Item
+import game
+import globals
+import level
+
+def levelData():
+    with open(game.LEVEL_PATH, 'rb') as f:
+        return json.loads(f.read())
+
+def testCatalogServesTheSameTexts(tmp_path):
+    path = str(tmp_path / 'tides.catalog')
+    game.buildWorld().buildCatalog(path)
+    plain, world = game.buildWorld(), game.buildWorld()
+    assert world.loadCatalog(path)
+    assert world.messageEntries() == plain.messageEntries()
+    assert world.itemMessages.get('Dull Rock', 'onInspect') == plain.itemMessages.get('Dull Rock', 'onInspect')
+    assert world.characters['Old Man'].messages.onTalk == plain.characters['Old Man'].messages.onTalk
+
+def testCatalogFromOtherMessagesIsNotUsed(tmp_path):
+    path = str(tmp_path / 'tides.catalog')
+    game.buildWorld().buildCatalog(path)
+    world = game.buildWorld()
+    world.items['Dull Rock'].messages.onTake = 'Got it.'
+    assert not world.loadCatalog(path)
+    assert world.itemMessages.get('Dull Rock', 'onTake') == 'Got it.'
+
+def testCatalogFromOtherFallbacksIsNotUsed(tmp_path, monkeypatch):
+    # the dull rock's onInspect is filled in from Item.exampleMessages, which is code rather than the level
+    data = levelData()
+    data['items']['Dull Rock']['messages'].pop('onInspect')
+    path = str(tmp_path / 'tides.catalog')
+    with pytest.warns(UserWarning):
+        level.build(data).buildCatalog(path)
+        monkeypatch.setattr(Item, 'exampleMessages', globals.Collection(**{
+            **{k: v for k, v in Item.exampleMessages.items() if k != 'resetValue'}, 'onInspect': 'It is a {name}.'
+        }))
+        world = level.build(data)
+    assert not world.loadCatalog(path)
+    assert world.itemMessages.get('Dull Rock', 'onInspect') == 'It is a dull rock.'
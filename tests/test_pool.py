@@ -0,0 +1,75 @@
+# pyright: reportMissingImports=false
+import asyncio
+import os
+import signal
+
+import pytest
+
+from pool import SessionPool
+from sessions import LocalSessions
+import pool
+
+# a pool that hangs fails its test instead of the whole run
+TIMEOUT = 60
+
+async def play(sessions, sessionId, inputs, before=None):
+    out = [await sessions.open(sessionId)]
+    for n, text in enumerate(inputs):
+        if before:
+            await before(n)
+        out.append((await sessions.step(sessionId, text))[0])
+    return out
+
+def run(test):
+    asyncio.run(asyncio.wait_for(test(), TIMEOUT))
+
+def testSameAsLocal(inputs):
+    played = [inputs(seed, 60) for seed in range(6)]
+    async def test():
+        local = LocalSessions()
+        expected = [await play(local, s, played[s]) for s in range(6)]
+        p = SessionPool(3, checkpointEvery=7)
+        await p.start()
+        try:
+            assert await asyncio.gather(*[play(p, s, played[s]) for s in range(6)]) == expected
+        finally:
+            await p.stop()
+    run(test)
+
+def testWorkersDyingAndRestarting(inputs):
+    played = [inputs(seed, 60) for seed in range(6)]
+    async def test():
+        local = LocalSessions()
+        expected = [await play(local, s, played[s]) for s in range(6)]
+        p = SessionPool(3, checkpointEvery=7)
+        await p.start()
+        async def trouble(n):
+            if n == 11:
+                os.kill(p.workers[1].process.pid, signal.SIGKILL)
+                await asyncio.sleep(0.05)
+            elif n in (23, 41):
+                await p.restartWorker(n % 3)
+        try:
+            got = await asyncio.gather(*[play(p, s, played[s], trouble if s == 0 else None) for s in range(6)])
+            assert got == expected
+            assert p.restarts == 3
+        finally:
+            await p.stop()
+    run(test)
+
+def testStopDoesNotWaitOnAStuckWorker(monkeypatch):
+    monkeypatch.setattr(pool, 'EXIT_TIMEOUT', 0.5)
+    async def test():
+        p = SessionPool(2)
+        await p.start()
+        await p.open(0)
+        await p.open(1)
+        stuck = p.workers[1].process
+        os.kill(stuck.pid, signal.SIGSTOP)
+        waiting = asyncio.ensure_future(p.step(1, 'look'))
+        await asyncio.sleep(0.1)
+        await p.stop()
+        assert not stuck.is_alive()
+        with pytest.raises(ConnectionError):
+            await waiting
+    run(test)
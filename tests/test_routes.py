@@ -0,0 +1,83 @@
+# pyright: reportMissingImports=false
+import random
+import re
+
+import pytest
+
+from game import Game
+from gametypes import Path
+from room import Room
+from routes import RoutePlanner
+import game
+import globals
+
+MOVES = ['n', 's', 'e', 'w', 'ne', 'nw', 'se', 'sw', 'wait']
+
+# the steps in a "way to" hint, as inputs
+def inputsFor(hint):
+    inputs = []
+    for part in hint.strip().rstrip('.').lower().split(', then '):
+        if (m := re.fullmatch(r'wait (once|(\d+) times)', part)):
+            inputs += ['wait'] * (1 if m.group(2) is None else int(m.group(2)))
+        else:
+            assert part.startswith('go '), hint
+            inputs.append(part)
+    return inputs
+
+@pytest.mark.parametrize('seed', range(50))
+def testFollowingTheWayGetsThere(seed):
+    r = random.Random(seed)
+    g = Game(start=False)
+    for _ in range(r.randrange(5, 120)):
+        g.step(r.choice(MOVES))
+    target = r.choice([name for name in g.rooms if g.roomFlagsOf(name).playerHasVisited])
+    hint = g.step(f'way to {target.lower()}')
+    if target == g.currentRoom.name:
+        assert 'already there' in hint
+        return
+    for text in inputsFor(hint):
+        g.step(text)
+    assert g.currentRoom.name == target
+
+def testWaitingForTheTide():
+    g = Game(start=False)
+    # the southeast island can only be reached at low tide (evening)
+    for text in ['s', 's', 'se'] + ['wait'] * 7 + ['se', 'nw']:
+        g.step(text)
+    assert g.roomFlagsOf('Southeast Island').playerHasVisited
+    for _ in range(g.config.TURNS_PER_TIME):
+        g.step('wait')
+    assert g.time is not globals.TIME.Evening
+    hint = g.step('way to southeast island')
+    assert hint.strip().startswith('Wait')
+    for text in inputsFor(hint):
+        g.step(text)
+    assert g.currentRoom.name == 'Southeast Island'
+
+def testNotVisited():
+    assert 'haven\'t been there' in Game(start=False).step('way to shipwreck')
+
+def fullRecompute(planner):
+    full = planner.copy()
+    entrances = full._entrances()
+    full.tables = [full._table(x, entrances) for x in range(len(full.names))]
+    return full
+
+def testRoomChangedSameAsFullRecompute():
+    world = game.sharedWorld()
+    # fewer turns in a day than a game has, to keep it quick - it's the same tables, only shorter
+    shared = RoutePlanner(world.rooms, turnsPerTime=2)
+    before = [bytes(t) for t in shared.tables]
+    planner = shared.copy()
+    r = random.Random(3)
+    for _ in range(300):
+        a, d = r.choice(planner.names), r.randrange(len(globals.DIR_LIST))
+        if r.random() < 0.5:
+            planner.dirs[a][d] = Path(world.rooms[r.choice(planner.names)], r.randrange(1, 256))
+        else:
+            planner.dirs[a][d] = Room.NO_EXIT
+        planner.roomChanged(a)
+        assert planner.tables == fullRecompute(planner).tables
+    # the copy had tables and exits of its own from the first change on
+    assert [bytes(t) for t in shared.tables] == before
+    assert shared.tables == fullRecompute(shared).tables
@@ -0,0 +1,62 @@
+# pyright: reportMissingImports=false
+import pickle
+
+import pytest
+
+from game import Game
+from savefile import SaveError
+import savefile
+
+def testValuesRoundTrip():
+    state = {'a': -5, 'b': [None, True, False, (1, 'x')], 'c': 300000, 'd': 'é', 'e': {'f': [], 'g': ()}, 'h': -2**40}
+    assert savefile.loads(savefile.dumps(state)) == state
+
+def testNamesAreStoredOnce():
+    data = savefile.dumps({'a': ['Northeast Coast'] * 50, 'b': {'Northeast Coast': 1}})
+    assert data.count(b'Northeast Coast') == 1
+
+def testUnknownTypes():
+    with pytest.raises(TypeError):
+        savefile.dumps({'a': object()})
+
+@pytest.mark.parametrize('seed', range(10))
+def testSavedGamesCarryOnTheSame(tmp_path, inputs, seed):
+    g = Game(start=False)
+    for text in inputs(seed, 60):
+        g.step(text)
+    path = str(tmp_path / 'game.save')
+    g.save(path)
+    loaded = Game.load(path)
+    assert loaded.snapshot() == g.snapshot()
+    for text in inputs(seed + 1000, 30):
+        assert loaded.step(text) == g.step(text)
+    assert loaded.snapshot() == g.snapshot()
+
+def testNewGame():
+    g = Game(start=False)
+    assert Game.restore(savefile.loads(savefile.dumps(g.snapshot()))).snapshot() == g.snapshot()
+
+def testBadSaves():
+    good = savefile.dumps(Game(start=False).snapshot())
+    for bad in (good[:len(good) // 2], good[:6], b'', pickle.dumps(Game), b'not a save at all'):
+        with pytest.raises(SaveError):
+            savefile.loads(bad)
+
+def testNewerVersion():
+    data = bytearray(savefile.MAGIC)
+    savefile.varint(data, savefile.VERSION + 1)
+    with pytest.raises(SaveError, match='version'):
+        savefile.loads(bytes(data))
+
+def testMigrations(monkeypatch):
+    old = savefile.dumps({'turn': 3})
+    monkeypatch.setattr(savefile, 'VERSION', savefile.VERSION + 1)
+    monkeypatch.setitem(savefile.MIGRATIONS, savefile.VERSION - 1, lambda s: {**s, 'turn': s['turn'] * 2, 'new': True})
+    assert savefile.loads(old) == {'turn': 6, 'new': True}
+
+def testWriteReplacesWhole(tmp_path):
+    path = str(tmp_path / 'game.save')
+    savefile.write(path, {'a': 1})
+    savefile.write(path, {'a': 2})
+    assert savefile.read(path) == {'a': 2}
+    assert sorted(p.name for p in tmp_path.iterdir()) == ['game.save']
@@ -0,0 +1,144 @@
+# pyright: reportMissingImports=false
+from __future__ import annotations
+from typing import Any, Dict, Generic, Iterable, Iterator, List, Tuple, TypeVar
+
+from command import Command, CommandIndex
+from item import Item
+from room import Room
+from character import Character
+from routes import RoutePlanner
+from messages import ItemMessages, RoomMessages
+from gametypes import *
+import messages
+
+"""
+TODO
+
+"""
+
+K = TypeVar('K')
+V = TypeVar('V')
+
+class Overlay(Generic[K, V]):
+
+    """
+    A dict on top of another (shared) dict that it never changes - reads fall through to the base until a key is written,
+    and only the written keys are stored. Used for the per-game state that starts out the same as the World's.
+
+    owns(k) - whether k has been written (or removed) in this overlay, ex. to copy a shared value before changing it
+    changes - everything written, with removed keys set to Overlay.REMOVED
+    """
+
+    REMOVED = object()
+
+    __slots__ = ('base', 'changes')
+
+    def __init__(self, base: Dict[K, V], changes: Dict[K, V] = None) -> None:
+        self.base: Dict[K, V] = base
+        self.changes: Dict[K, V] = changes if changes is not None else dict()
+
+    def get(self, k: K, default: V = None) -> V:
+        if (v := self.changes.get(k, self)) is self:
+            return self.base.get(k, default)
+        return default if v is Overlay.REMOVED else v
+
+    def __getitem__(self, k: K) -> V:
+        if (v := self.get(k, Overlay.REMOVED)) is Overlay.REMOVED:
+            raise KeyError(k)
+        return v
+
+    def __setitem__(self, k: K, v: V) -> None:
+        self.changes[k] = v
+
+    def __contains__(self, k: K) -> bool:
+        return self.get(k, Overlay.REMOVED) is not Overlay.REMOVED
+
+    def pop(self, k: K, default: V = None) -> V:
+        v = self.get(k, Overlay.REMOVED)
+        self.changes[k] = Overlay.REMOVED
+        return default if v is Overlay.REMOVED else v
+
+    def owns(self, k: K) -> bool:
+        return k in self.changes
+
+    def items(self) -> List[Tuple[K, V]]:
+        merged = {**self.base, **self.changes}
+        return [(k, v) for k, v in merged.items() if v is not Overlay.REMOVED]
+
+    def keys(self) -> List[K]:
+        return [k for k, _ in self.items()]
+
+    def values(self) -> List[V]:
+        return [v for _, v in self.items()]
+
+    def __iter__(self) -> Iterator[K]:
+        return iter(self.keys())
+
+    def __len__(self) -> int:
+        return len(self.items())
+
+class World:
+
+    """
+    Everything about a game that doesn't change while it's played - rooms and how they're linked, items, characters and their
+    dialogue, commands and their compiled patterns, messages, routes. It's built once and shared by every Game in the process,
+    and each Game only keeps what it changes on top of it (see Game.__init__).
+
+    Nothing in here should be changed after the world is built. The starting state lives here too: where every item starts
+    (itemLocations, and each Room.items), each Room.flags, each Character's attrs and itemsForSale.
+
+    Commands are called with the Game they're run in (see Command), so they can be shared.
+    """
+
+    def __init__(self) -> None:
+        self.rooms: Dict[RoomName, Room] = dict() # room ID => room obj
+        self.items: Dict[ItemName, Item] = dict() # item ID => item obj
+        self.characters: Dict[CharName, Character] = dict() # character ID => character obj
+        # the global game commands, and the same indexed (they never change)
+        self.commands: Dict[CommandName, Command] = dict()
+        self.commandIndex: CommandIndex = None
+        # where every item starts
+        self.itemLocations: Dict[ItemName, Location] = dict() # item ID => location
+        # room name => items that start there (each Room.items) / flags every game starts with (each Room.flags)
+        self.roomItems: Dict[RoomName, Dict[ItemName, Item]] = dict()
+        self.roomFlags: Dict[RoomName, Any] = dict()
+        self.startRoom: RoomName = None
+        self.routes: RoutePlanner = None
+        self.roomMessages: RoomMessages = None
+        self.itemMessages: ItemMessages = None
+
+    # call once every room, item and character is in, before any Game uses the world
+    def finish(self) -> None:
+        self.roomItems = {name: r.items for name, r in self.rooms.items()}
+        self.roomFlags = {name: r.flags for name, r in self.rooms.items()}
+        self.routes = RoutePlanner(self.rooms)
+
+    # the global game commands - they're part of the game rather than the level, so they're set after it's loaded
+    def setCommands(self, commands: Iterable[Command]) -> None:
+        self.commands = {c.name: c for c in commands}
+        self.commandIndex = CommandIndex(self.commands.values())
+
+    # ------- MESSAGE CATALOG ------- #
+
+    # catalog key => text for every room, item and character message
+    def messageEntries(self) -> Dict[str, str]:
+        return {**self.roomMessages.entries(), **self.itemMessages.entries(), **messages.characterEntries(self.characters.values())}
+
+    def buildCatalog(self, path: str) -> None:
+        messages.writeCatalog(path, self.messageEntries())
+
+    # switches every message over to the catalog, unless it was built from different messages than this world has (see
+    # messages.entriesDigest) - returns whether it did
+    def loadCatalog(self, path: str) -> bool:
+        try:
+            catalog = messages.MessageCatalog(path)
+        except ValueError:
+            # made by an older version of the game
+            return False
+        if catalog.digest != messages.entriesDigest(self.messageEntries()):
+            catalog.close()
+            return False
+        self.roomMessages.useCatalog(catalog)
+        self.itemMessages.useCatalog(catalog)
+        messages.useCatalogForCharacters(self.characters.values(), catalog)
+        return True